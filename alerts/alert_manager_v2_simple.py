@@ -7,13 +7,14 @@ FILOSOFÍA: Puerta cerrada = Sistema seguro (limpia TODOS los timers)
 
 import json
 import logging
+import os
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
 from dataclasses import dataclass
 from enum import Enum
 from pathlib import Path
-import threading
-import time
+import heapq
+import itertools
 import asyncio
 
 # Configurar logging
@@ -23,6 +24,16 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Limpiar temporizadores sin detección después de este tiempo (segundos)
+STALE_TIMER_SECONDS = 600
+
+# Tipos de vencimiento en el heap de deadlines
+DEADLINE_ALARM = "alarm"
+DEADLINE_STALE = "stale"
+
+# Fases del temporizador (fracción del delay) - también son tipos de vencimiento
+PHASE_THRESHOLDS = {"moderate": 0.5, "critical": 0.9}
+
 # Importar servicio de audio
 try:
     from backend.utils.simple_audio_service import simple_audio_service as audio_service
@@ -45,6 +56,14 @@ except ImportError:
     telegram_service = None
     logger.warning("⚠️ Servicio de alertas Telegram no disponible")
 
+from backend.utils.zone_registry import zone_registry
+
+# Journal durable de temporizadores
+try:
+    from alerts.timer_journal import TimerJournal, OP_CREATE, OP_TRIGGER, OP_REMOVE, OP_CLEAR
+except ImportError:
+    from timer_journal import TimerJournal, OP_CREATE, OP_TRIGGER, OP_REMOVE, OP_CLEAR
+
 
 class AlertSeverity(Enum):
     """Niveles de severidad de alertas"""
@@ -93,17 +112,70 @@ class DoorTimer:
         return self.is_active and self.time_elapsed >= self.delay_seconds and not self.alarm_triggered
 
 
+@dataclass
+class AlertMessage:
+    """Mensaje para el actor de AlertManager"""
+    kind: str
+    payload: Dict[str, Any]
+    future: Optional[asyncio.Future] = None
+    enqueued_at: float = 0.0
+
+
 class AlertManager:
-    """Gestor principal de alertas con sistema de temporizador"""
+    """
+    Gestor principal de alertas con sistema de temporizador
+    
+    Funciona como un actor: una única tarea asyncio es dueña de door_timers.
+    Todas las mutaciones llegan como mensajes por una cola y los efectos
+    secundarios (audio, Telegram, eventos) se despachan a workers asíncronos.
+    """
     
-    def __init__(self, config_path: Optional[str] = None):
-        """Inicializar el gestor de alertas"""
+    # Canales de efectos secundarios (un worker por canal preserva el orden)
+    EFFECT_CHANNELS = ("audio", "telegram", "events", "journal", "state")
+    
+    def __init__(self, config_path: Optional[str] = None, state_store=None,
+                 journal_path: Optional[str] = None):
+        """
+        Inicializar el gestor de alertas
+        
+        Args:
+            config_path: Ruta de alert_config_v2.json
+            state_store: Almacén compartido (backend.utils.state_store) donde replicar
+                         los timers para workers de API en otros procesos
+            journal_path: Base de datos del journal de timers; si no se indica se usa
+                          timer_journal.db_path de la configuración o YOMJAI_TIMER_DB,
+                          y sin ninguna de ellas el journal queda desactivado
+        """
         self.config_path = config_path
+        self.state_store = state_store
         self.config = self._load_config(config_path)
         self.door_timers: Dict[str, DoorTimer] = {}
         self.alert_history = []
         self.alarm_active = False
         
+        # Heap de vencimientos: (deadline en loop.time(), secuencia, tipo, door_id, timer)
+        # Las entradas obsoletas se descartan al extraerlas (borrado perezoso)
+        self._deadlines: List[Tuple[float, int, str, str, DoorTimer]] = []
+        self._deadline_seq = itertools.count()
+        
+        # Versionado de cambios para enviar deltas en lugar de snapshots
+        self.timer_version = 0
+        self._timer_subscribers: List[asyncio.Queue] = []
+        
+        # Estado del actor
+        self._inbox: Optional[asyncio.Queue] = None
+        self._effect_queues: Dict[str, asyncio.Queue] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._metrics = {
+            'messages_processed': 0,
+            'messages_by_kind': {},
+            'max_queue_latency_ms': 0.0,
+            'total_queue_latency_ms': 0.0,
+            'deadlines_fired': 0,
+            'effects_dispatched': 0,
+            'effects_failed': 0
+        }
+        
         # Inicializar gestor de alertas Telegram
         self.telegram_alert_manager = None
         if TELEGRAM_AVAILABLE and TelegramAlertManager and telegram_service:
@@ -111,8 +183,29 @@ class AlertManager:
             asyncio.create_task(self.telegram_alert_manager.start_monitoring())
             logger.info("📱 Gestor de alertas Telegram iniciado")
         
-        # Iniciar monitor de temporizadores
-        self._start_timer_monitor()
+        # Nombres de zona para el registro compartido
+        zone_registry.set_zone_names(self.config.get('zones', {}))
+        
+        # Journal durable: recuperar timers de antes del reinicio
+        self.timer_journal = None
+        journal_config = self.config.get('timer_journal', {})
+        journal_path = (journal_path or journal_config.get('db_path')
+                        or os.environ.get('YOMJAI_TIMER_DB'))
+        if journal_config.get('enabled', True) and not journal_path:
+            logger.info("Journal de temporizadores desactivado (sin db_path ni YOMJAI_TIMER_DB)")
+        elif journal_config.get('enabled', True):
+            try:
+                self.timer_journal = TimerJournal(
+                    db_path=journal_path,
+                    compact_every=journal_config.get('compact_every', 500)
+                )
+                self._restore_timers(journal_config.get('max_restore_age_seconds', 3600))
+            except Exception as e:
+                logger.error(f"Error iniciando journal de temporizadores: {e}")
+                self.timer_journal = None
+        
+        # Iniciar actor y monitor de temporizadores
+        self._start_actor()
         
         logger.info("AlertManager V2 inicializado - Filosofía: Puerta cerrada = Sistema seguro")
     
@@ -131,7 +224,12 @@ class AlertManager:
             "timer_units": "seconds",
             "sound_enabled": True,
             "visual_alerts": True,
-            "clean_all_on_close": True  # NUEVO: Limpiar todo cuando se cierra cualquier puerta
+            "clean_all_on_close": True,  # NUEVO: Limpiar todo cuando se cierra cualquier puerta
+            "timer_journal": {
+                "enabled": True,
+                "compact_every": 500,
+                "max_restore_age_seconds": 3600
+            }
         }
         
         if config_path and Path(config_path).exists():
@@ -151,119 +249,417 @@ class AlertManager:
     
     def _get_zone_name(self, door_id: str) -> str:
         """Obtener nombre amigable de la zona"""
-        zone_names = {
-            "door_1": "Entrada Principal",
-            "door_2": "Área de Carga",
-            "door_3": "Salida de Emergencia",
-            "cam1_door_0": "Cámara 1",
-            "cam2_door_0": "Cámara 2",
-            "cam3_door_0": "Cámara 3"
-        }
-        return zone_names.get(door_id, door_id)
+        return zone_registry.get_zone_name(door_id)
+    
+    def _restore_timers(self, max_age_seconds: float):
+        """Reconstruir door_timers desde el journal (antes de iniciar el actor)"""
+        now = datetime.now()
+        for record in self.timer_journal.load():
+            first_detected = datetime.fromtimestamp(record['first_detected'])
+            if (now - first_detected).total_seconds() > max_age_seconds:
+                continue
+            # last_detected = ahora: la puerta se confirmará o limpiará con las próximas detecciones.
+            # alarm_triggered se re-evalúa para reactivar audio y Telegram tras el reinicio.
+            self.door_timers[record['door_id']] = DoorTimer(
+                door_id=record['door_id'],
+                first_detected=first_detected,
+                last_detected=now,
+                delay_seconds=record['delay_seconds'],
+                camera_id=record['camera_id'] or "default"
+            )
+            zone_registry.add_timer(record['door_id'], record['camera_id'] or "default")
+        if self.door_timers:
+            logger.info(f"♻️ {len(self.door_timers)} temporizadores restaurados del journal")
     
-    def _start_timer_monitor(self):
-        """Iniciar thread monitor de temporizadores"""
-        monitor_thread = threading.Thread(target=self._monitor_timers, daemon=True)
-        monitor_thread.start()
+    def _journal(self, op: str, door_id: Optional[str] = None, timer: Optional[DoorTimer] = None):
+        """Registrar una transición en el journal (escritura asíncrona en lote)"""
+        if self.timer_journal is None:
+            return
+        record = {'op': op, 'door_id': door_id, 'recorded_at': datetime.now().timestamp()}
+        if timer is not None:
+            record.update(
+                camera_id=timer.camera_id,
+                first_detected=timer.first_detected.timestamp(),
+                delay_seconds=timer.delay_seconds
+            )
+        self._dispatch("journal", op, record=record)
+    
+    # ==================== ACTOR ====================
+    
+    def _start_actor(self):
+        """Iniciar la tarea del actor y los workers de efectos en el loop actual"""
+        if self._inbox is not None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # Sin loop activo (p.ej. scripts): se inicia con el primer mensaje
+            logger.debug("Actor de alertas diferido hasta tener event loop")
+            return
+        
+        self._inbox = asyncio.Queue()
+        self._effect_queues = {channel: asyncio.Queue() for channel in self.EFFECT_CHANNELS}
+        self._tasks = [loop.create_task(self._run_actor())]
+        for channel, queue in self._effect_queues.items():
+            self._tasks.append(loop.create_task(self._run_effect_worker(channel, queue)))
+        
+        # Programar vencimientos de los timers restaurados
+        for door_id, timer in self.door_timers.items():
+            self._schedule_timer(door_id, timer)
+        
+        # Sincronizar el almacén compartido con el estado inicial
+        if self.state_store is not None:
+            self._emit_timer_change('cleared')
+            for door_id, timer in self.door_timers.items():
+                self._emit_timer_change('created', door_id, timer)
         logger.info("Monitor de temporizadores iniciado")
     
-    def _monitor_timers(self):
-        """Thread que monitorea los temporizadores activos"""
+    def _send(self, kind: str, **payload) -> asyncio.Future:
+        """Encolar un mensaje para el actor y devolver un future con el resultado"""
+        self._start_actor()
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._inbox.put_nowait(AlertMessage(kind, payload, future, loop.time()))
+        return future
+    
+    async def _run_actor(self):
+        """Tarea única dueña del estado: procesa mensajes y vencimientos"""
+        loop = asyncio.get_running_loop()
+        handlers = {
+            'detection': self._handle_detection,
+            'acknowledge': self._handle_acknowledge,
+            'stop_all': self._handle_stop_all,
+        }
+        
         while True:
             try:
-                current_time = datetime.now()
-                
-                # Lista para timers a eliminar
-                timers_to_remove = []
+                self._process_due_deadlines(loop.time())
                 
-                # Verificar cada temporizador
-                for door_id, timer in list(self.door_timers.items()):
-                    if not timer.is_active:
-                        continue
-                    
-                    # Verificar si debe activar alarma
-                    if timer.should_trigger_alarm:
-                        logger.warning(f"⏰ ALARMA ACTIVADA - Puerta {door_id} abierta por {timer.time_elapsed:.0f} segundos")
-                        timer.alarm_triggered = True
-                        self.alarm_active = True
-                        
-                        # Activar alarma sonora si está disponible
-                        if AUDIO_AVAILABLE and audio_service:
-                            try:
-                                zone_name = self._get_zone_name(door_id)
-                                # Llamada síncrona directa
-                                audio_service.start_alarm(
-                                    zone_id=door_id, 
-                                    zone_name=zone_name, 
-                                    timer_seconds=timer.delay_seconds
-                                )
-                                logger.info(f"🔊 Alarma sonora activada para {zone_name}")
-                            except Exception as e:
-                                logger.error(f"Error activando alarma sonora: {e}")
-                        
-                        # Activar alerta persistente de Telegram
-                        if self.telegram_alert_manager and telegram_service.enabled:
-                            try:
-                                zone_name = self._get_zone_name(door_id)
-                                
-                                # Intentar capturar imagen de la cámara si está disponible
-                                image = None
-                                try:
-                                    # Acceder al camera_manager global a través del módulo backend.main
-                                    import backend.main
-                                    if hasattr(backend.main, 'camera_manager') and backend.main.camera_manager:
-                                        camera_manager = backend.main.camera_manager
-                                        if timer.camera_id in camera_manager.cameras:
-                                            camera = camera_manager.cameras[timer.camera_id]
-                                            frame = camera.get_frame()
-                                            if frame is not None:
-                                                image = frame
-                                                logger.info(f"📸 Imagen capturada de cámara {timer.camera_id}")
-                                        else:
-                                            # Si no hay cámara específica, buscar por zona
-                                            camera = camera_manager.get_camera_by_zone(door_id)
-                                            if camera:
-                                                frame = camera.get_frame()
-                                                if frame is not None:
-                                                    image = frame
-                                                    logger.info(f"📸 Imagen capturada de zona {door_id}")
-                                except Exception as e:
-                                    logger.warning(f"No se pudo capturar imagen: {e}")
-                                
-                                # Usar call_soon_threadsafe para ejecutar en el loop principal
-                                loop = asyncio.new_event_loop()
-                                asyncio.set_event_loop(loop)
-                                loop.run_until_complete(
-                                    self.telegram_alert_manager.create_alert(
-                                        zone_id=door_id,
-                                        zone_name=zone_name,
-                                        camera_id=timer.camera_id,
-                                        image=image
-                                    )
-                                )
-                                loop.close()
-                                logger.info(f"📱 Alerta Telegram iniciada para {zone_name}")
-                            except Exception as e:
-                                logger.error(f"Error iniciando alerta Telegram: {e}")
-                    
-                    # Limpiar temporizadores muy antiguos (más de 10 minutos)
-                    if (current_time - timer.last_detected).total_seconds() > 600:
-                        logger.info(f"🧹 Limpiando temporizador antiguo: {door_id} (más de 10 minutos)")
-                        timers_to_remove.append(door_id)
-                
-                # Eliminar timers marcados
-                for door_id in timers_to_remove:
-                    if door_id in self.door_timers:
-                        del self.door_timers[door_id]
+                # Esperar un mensaje o hasta el próximo vencimiento
+                timeout = max(0.0, self._deadlines[0][0] - loop.time()) if self._deadlines else None
+                try:
+                    message = await asyncio.wait_for(self._inbox.get(), timeout)
+                except asyncio.TimeoutError:
+                    continue
                 
-                # Actualizar estado global
-                self.alarm_active = any(t.alarm_triggered for t in self.door_timers.values())
+                latency_ms = (loop.time() - message.enqueued_at) * 1000
+                try:
+                    result = handlers[message.kind](**message.payload)
+                    if message.future and not message.future.done():
+                        message.future.set_result(result)
+                except Exception as e:
+                    logger.error(f"Error procesando mensaje {message.kind}: {e}")
+                    if message.future and not message.future.done():
+                        message.future.set_exception(e)
                 
-                time.sleep(0.5)
+                # Métricas de throughput y latencia de cola
+                metrics = self._metrics
+                metrics['messages_processed'] += 1
+                metrics['messages_by_kind'][message.kind] = metrics['messages_by_kind'].get(message.kind, 0) + 1
+                metrics['total_queue_latency_ms'] += latency_ms
+                metrics['max_queue_latency_ms'] = max(metrics['max_queue_latency_ms'], latency_ms)
                 
+            except asyncio.CancelledError:
+                break
             except Exception as e:
                 logger.error(f"Error en monitor: {e}")
-                time.sleep(1)
+                await asyncio.sleep(1)
+    
+    def _dispatch(self, channel: str, effect: str, **kwargs):
+        """Despachar un efecto secundario a su worker (no bloquea al actor)"""
+        queue = self._effect_queues.get(channel)
+        if queue is None:
+            return
+        queue.put_nowait((effect, kwargs))
+        self._metrics['effects_dispatched'] += 1
+    
+    async def _run_effect_worker(self, channel: str, queue: asyncio.Queue):
+        """Worker asíncrono que ejecuta los efectos de un canal en orden"""
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                effect, kwargs = await queue.get()
+                try:
+                    if channel == "journal":
+                        # Agrupar todo lo pendiente en una sola transacción
+                        records = [kwargs['record']]
+                        while not queue.empty():
+                            records.append(queue.get_nowait()[1]['record'])
+                        await loop.run_in_executor(None, self.timer_journal.append_many, records)
+                    elif channel == "audio":
+                        # El servicio de audio es síncrono (stop_alarm hace join): usar executor
+                        await loop.run_in_executor(None, lambda: getattr(audio_service, effect)(**kwargs))
+                    elif channel == "telegram":
+                        result = getattr(self.telegram_alert_manager, effect)(**kwargs)
+                        if asyncio.iscoroutine(result):
+                            await result
+                    elif channel == "state":
+                        await loop.run_in_executor(None, lambda: self.state_store.apply_timer_change(**kwargs))
+                    elif channel == "events":
+                        await loop.run_in_executor(None, lambda: self._log_alarm_event(**kwargs))
+                except Exception as e:
+                    self._metrics['effects_failed'] += 1
+                    logger.error(f"Error ejecutando efecto {channel}.{effect}: {e}")
+            except asyncio.CancelledError:
+                break
+    
+    def get_actor_metrics(self) -> Dict:
+        """Métricas del actor: throughput, latencia de cola y efectos pendientes"""
+        metrics = self._metrics
+        processed = metrics['messages_processed']
+        return {
+            'messages_processed': processed,
+            'messages_by_kind': dict(metrics['messages_by_kind']),
+            'inbox_depth': self._inbox.qsize() if self._inbox else 0,
+            'avg_queue_latency_ms': metrics['total_queue_latency_ms'] / processed if processed else 0.0,
+            'max_queue_latency_ms': metrics['max_queue_latency_ms'],
+            'deadlines_pending': len(self._deadlines),
+            'deadlines_fired': metrics['deadlines_fired'],
+            'effects_dispatched': metrics['effects_dispatched'],
+            'effects_pending': {c: q.qsize() for c, q in self._effect_queues.items()},
+            'effects_failed': metrics['effects_failed']
+        }
+    
+    async def shutdown(self):
+        """Detener el actor, vaciar el journal pendiente y compactarlo"""
+        if not self._tasks:
+            return
+        self._tasks[0].cancel()
+        
+        journal_queue = self._effect_queues.get("journal")
+        for _ in range(40):
+            if journal_queue is None or journal_queue.empty():
+                break
+            await asyncio.sleep(0.05)
+        
+        if self.timer_journal:
+            try:
+                await asyncio.get_running_loop().run_in_executor(None, self.timer_journal.compact)
+            except Exception as e:
+                logger.error(f"Error compactando journal de temporizadores: {e}")
+        
+        for task in self._tasks[1:]:
+            task.cancel()
+        logger.info("AlertManager detenido")
+    
+    # ==================== CAMBIOS VERSIONADOS ====================
+    
+    def subscribe_timer_changes(self) -> asyncio.Queue:
+        """Suscribirse a los cambios de temporizadores (created/cancelled/phase/triggered/cleared)"""
+        queue = asyncio.Queue()
+        self._timer_subscribers.append(queue)
+        return queue
+    
+    def unsubscribe_timer_changes(self, queue: asyncio.Queue):
+        """Cancelar una suscripción de cambios"""
+        if queue in self._timer_subscribers:
+            self._timer_subscribers.remove(queue)
+    
+    def _emit_timer_change(self, event: str, door_id: Optional[str] = None,
+                           timer: Optional[DoorTimer] = None, phase: Optional[str] = None):
+        """Incrementar la versión y publicar el cambio (solo desde el actor)"""
+        self.timer_version += 1
+        if not self._timer_subscribers and self.state_store is None:
+            return
+        change = {
+            'event': event,
+            'version': self.timer_version,
+            'door_id': door_id,
+            'timer': self.timer_to_dict(door_id, timer, phase) if timer else None,
+            'alarm_active': self.alarm_active
+        }
+        for queue in self._timer_subscribers:
+            queue.put_nowait(change)
+        
+        # Replicar en el almacén compartido (copia: los suscriptores pueden enriquecer el timer)
+        if self.state_store is not None:
+            self._dispatch("state", "apply_timer_change",
+                           change=dict(change, timer=dict(change['timer']) if change['timer'] else None))
+    
+    def timer_to_dict(self, door_id: str, timer: DoorTimer, phase: Optional[str] = None) -> Dict:
+        """Datos estáticos de un timer: el cliente calcula la cuenta atrás localmente"""
+        return {
+            'door_id': door_id,
+            'camera_id': timer.camera_id,
+            'delay_seconds': timer.delay_seconds,
+            'first_detected': timer.first_detected.isoformat(),
+            'first_detected_ts': timer.first_detected.timestamp(),
+            'alarm_triggered': timer.alarm_triggered,
+            'current_phase': phase or self.get_audio_phase_name(timer.time_elapsed, timer.delay_seconds)
+        }
+    
+    def get_timer_snapshot(self) -> Dict:
+        """Estado completo versionado (al conectar un cliente o al resincronizar)"""
+        return {
+            'version': self.timer_version,
+            'timers': [
+                self.timer_to_dict(door_id, timer)
+                for door_id, timer in self.door_timers.items() if timer.is_active
+            ],
+            'alarm_active': self.alarm_active,
+            'server_time': datetime.now().timestamp()
+        }
+    
+    def get_timer_tick(self) -> Dict:
+        """Tick compacto: versión, hora del servidor y estado Telegram de alarmas activas"""
+        telegram = {}
+        if self.alarm_active and self.telegram_alert_manager:
+            telegram = {
+                door_id: {
+                    'send_count': info.get('send_count', 0),
+                    'next_in': info.get('next_interval', 0)
+                }
+                for door_id, info in self.telegram_alert_manager.get_active_alerts().items()
+            }
+        return {
+            'version': self.timer_version,
+            'server_time': datetime.now().timestamp(),
+            'alarm_active': self.alarm_active,
+            'telegram': telegram
+        }
+    
+    # ==================== VENCIMIENTOS ====================
+    
+    def _schedule_deadline(self, when: datetime, kind: str, door_id: str, timer: DoorTimer):
+        """Registrar un vencimiento en el heap - O(log n)"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + (when - datetime.now()).total_seconds()
+        heapq.heappush(self._deadlines, (deadline, next(self._deadline_seq), kind, door_id, timer))
+        
+        # Compactar si se acumularon muchas entradas de timers ya eliminados
+        if len(self._deadlines) > 64 and len(self._deadlines) > 4 * (2 * len(self.door_timers) + 1):
+            self._deadlines = [
+                e for e in self._deadlines if self.door_timers.get(e[3]) is e[4]
+            ]
+            heapq.heapify(self._deadlines)
+    
+    def _schedule_timer(self, door_id: str, timer: DoorTimer):
+        """Programar alarma y limpieza de un temporizador nuevo"""
+        self._schedule_deadline(
+            timer.first_detected + timedelta(seconds=timer.delay_seconds),
+            DEADLINE_ALARM, door_id, timer
+        )
+        self._schedule_deadline(
+            timer.last_detected + timedelta(seconds=STALE_TIMER_SECONDS),
+            DEADLINE_STALE, door_id, timer
+        )
+        for phase, fraction in PHASE_THRESHOLDS.items():
+            self._schedule_deadline(
+                timer.first_detected + timedelta(seconds=timer.delay_seconds * fraction),
+                phase, door_id, timer
+            )
+    
+    def _process_due_deadlines(self, now: float):
+        """Procesar todos los vencimientos cumplidos (solo desde el actor)"""
+        while self._deadlines and self._deadlines[0][0] <= now:
+            _, _, kind, door_id, timer = heapq.heappop(self._deadlines)
+            
+            # Borrado perezoso: el timer fue cancelado o reemplazado
+            if self.door_timers.get(door_id) is not timer or not timer.is_active:
+                continue
+            
+            if kind == DEADLINE_ALARM and not timer.alarm_triggered:
+                self._metrics['deadlines_fired'] += 1
+                self._trigger_alarm(door_id, timer)
+            elif kind in PHASE_THRESHOLDS:
+                self._emit_timer_change('phase', door_id, timer, phase=kind)
+            elif kind == DEADLINE_STALE:
+                stale_at = timer.last_detected + timedelta(seconds=STALE_TIMER_SECONDS)
+                if datetime.now() >= stale_at:
+                    logger.info(f"🧹 Limpiando temporizador antiguo: {door_id} (más de 10 minutos)")
+                    self._remove_timer(door_id)
+                else:
+                    # Hubo detecciones desde que se programó: reprogramar
+                    self._schedule_deadline(stale_at, DEADLINE_STALE, door_id, timer)
+    
+    def _trigger_alarm(self, door_id: str, timer: DoorTimer):
+        """Activar la alarma de un temporizador vencido"""
+        logger.warning(f"⏰ ALARMA ACTIVADA - Puerta {door_id} abierta por {timer.time_elapsed:.0f} segundos")
+        timer.alarm_triggered = True
+        self.alarm_active = True
+        self._journal(OP_TRIGGER, door_id)
+        self._emit_timer_change('triggered', door_id, timer)
+        zone_name = self._get_zone_name(door_id)
+        
+        # Activar alarma sonora si está disponible
+        if AUDIO_AVAILABLE and audio_service:
+            self._dispatch("audio", "start_alarm",
+                           zone_id=door_id, zone_name=zone_name,
+                           timer_seconds=timer.delay_seconds)
+        
+        # Activar alerta persistente de Telegram
+        if self.telegram_alert_manager and telegram_service.enabled:
+            self._dispatch("telegram", "create_alert",
+                           zone_id=door_id, zone_name=zone_name,
+                           camera_id=timer.camera_id,
+                           image=self._capture_timer_image(door_id, timer))
+        
+        # Registrar evento de alarma
+        self._dispatch("events", "log",
+                       door_id=door_id, zone_name=zone_name,
+                       camera_id=timer.camera_id, delay_seconds=timer.delay_seconds)
+    
+    def _log_alarm_event(self, door_id: str, zone_name: str, camera_id: str, delay_seconds: int):
+        """Registrar la alarma en el historial de eventos (ejecutado en executor)"""
+        try:
+            from backend.utils.event_logger import event_logger, EventTypes
+        except ImportError:
+            return
+        event_logger.log_event(
+            event_type=EventTypes.ALARM_TRIGGERED,
+            event_name=f"Alarma activada - {zone_name}",
+            description=f"Puerta abierta más de {delay_seconds}s en {zone_name}",
+            zone_id=door_id,
+            severity="critical",
+            metadata={'camera_id': camera_id, 'delay_seconds': delay_seconds}
+        )
+    
+    def _capture_timer_image(self, door_id: str, timer: DoorTimer):
+        """Intentar capturar imagen de la cámara asociada al temporizador"""
+        try:
+            # Acceder al camera_manager global a través del módulo backend.main
+            import backend.main
+            if hasattr(backend.main, 'camera_manager') and backend.main.camera_manager:
+                camera_manager = backend.main.camera_manager
+                if timer.camera_id in camera_manager.cameras:
+                    camera = camera_manager.cameras[timer.camera_id]
+                    frame = camera.get_frame()
+                    if frame is not None:
+                        logger.info(f"📸 Imagen capturada de cámara {timer.camera_id}")
+                        return frame
+                else:
+                    # Si no hay cámara específica, buscar por zona
+                    camera = camera_manager.get_camera_by_zone(door_id)
+                    if camera:
+                        frame = camera.get_frame()
+                        if frame is not None:
+                            logger.info(f"📸 Imagen capturada de zona {door_id}")
+                            return frame
+        except Exception as e:
+            logger.warning(f"No se pudo capturar imagen: {e}")
+        return None
+    
+    def _remove_timer(self, door_id: str):
+        """Eliminar un timer y despachar la cancelación de sus efectos"""
+        timer = self.door_timers.pop(door_id, None)
+        if timer is None:
+            return
+        self._journal(OP_REMOVE, door_id)
+        zone_registry.remove_timer(door_id)
+        
+        if timer.alarm_triggered:
+            logger.info(f"🔕 Alarma CANCELADA para {door_id}")
+            # Detener alarma sonora
+            if AUDIO_AVAILABLE and audio_service:
+                self._dispatch("audio", "stop_alarm", zone_id=door_id)
+            # Cancelar alerta Telegram
+            if self.telegram_alert_manager:
+                self._dispatch("telegram", "cancel_alert", zone_id=door_id)
+        
+        self.alarm_active = any(t.alarm_triggered for t in self.door_timers.values())
+        self._emit_timer_change('cancelled', door_id)
+    
+    # ==================== API PÚBLICA ====================
     
     def get_timer_delay(self, door_id: str, camera_id: str = "default") -> int:
         """Obtener delay configurado para una puerta específica"""
@@ -283,6 +679,10 @@ class AlertManager:
     
     async def process_detection(self, detections: List[Dict], camera_id: str = "default", image: Optional[Any] = None):
         """Procesar nuevas detecciones con sistema de temporizador"""
+        await self._send('detection', detections=detections, camera_id=camera_id)
+    
+    def _handle_detection(self, detections: List[Dict], camera_id: str = "default"):
+        """Aplicar detecciones al estado (solo desde el actor)"""
         current_time = datetime.now()
         
         # Identificar puertas abiertas
@@ -299,19 +699,7 @@ class AlertManager:
             if self.door_timers:
                 logger.info(f"🧹 Limpiando {len(self.door_timers)} timers activos")
                 for timer_id in list(self.door_timers.keys()):
-                    timer = self.door_timers[timer_id]
-                    if timer.alarm_triggered:
-                        logger.info(f"🔕 Alarma CANCELADA para {timer_id}")
-                        # Detener alarma sonora
-                        if AUDIO_AVAILABLE and audio_service:
-                            try:
-                                audio_service.stop_alarm(timer_id)
-                            except:
-                                pass
-                        # Cancelar alerta Telegram
-                        if self.telegram_alert_manager:
-                            self.telegram_alert_manager.cancel_alert(timer_id)
-                    del self.door_timers[timer_id]
+                    self._remove_timer(timer_id)
             
             # Resetear estado global
             self.alarm_active = False
@@ -322,22 +710,15 @@ class AlertManager:
             for door_detection in closed_doors:
                 door_id = door_detection.get('door_id', f"{camera_id}_door_0")
                 
-                # Buscar y cancelar timers relacionados
-                timers_to_remove = []
-                for timer_id, timer in self.door_timers.items():
-                    if (timer.camera_id == camera_id or 
-                        timer_id == door_id or
-                        door_id in timer_id or
-                        timer_id in door_id):
-                        timers_to_remove.append(timer_id)
+                # Timers de la misma cámara y de la puerta exacta (índices, sin substrings)
+                timers_to_remove = zone_registry.timers_for_camera(camera_id)
+                if door_id in self.door_timers:
+                    timers_to_remove.add(door_id)
                 
                 # Eliminar timers encontrados
                 for timer_id in timers_to_remove:
-                    timer = self.door_timers[timer_id]
                     logger.info(f"✅ Puerta {timer_id} CERRADA - Cancelando timer")
-                    if timer.alarm_triggered:
-                        logger.info(f"🔕 Alarma cancelada para {timer_id}")
-                    del self.door_timers[timer_id]
+                    self._remove_timer(timer_id)
         
         # Procesar puertas abiertas (solo si no se limpió todo)
         for door_detection in open_doors:
@@ -359,22 +740,27 @@ class AlertManager:
                     camera_id=camera_id
                 )
                 self.door_timers[door_id] = timer
+                self._schedule_timer(door_id, timer)
+                self._journal(OP_CREATE, door_id, timer)
+                zone_registry.add_timer(door_id, camera_id)
+                self._emit_timer_change('created', door_id, timer)
                 logger.info(f"🔴 Nueva puerta abierta: {door_id}. Temporizador: {delay} segundos")
         
         # Limpiar timers huérfanos (sin detección reciente)
         current_door_ids = {d.get('door_id') for d in detections}
         timers_to_cleanup = []
         
-        for door_id, timer in self.door_timers.items():
+        for door_id in zone_registry.timers_for_camera(camera_id):
             # Si es de esta cámara y no está en las detecciones actuales
-            if timer.camera_id == camera_id and door_id not in current_door_ids:
+            timer = self.door_timers.get(door_id)
+            if timer and door_id not in current_door_ids:
                 time_since_last = (current_time - timer.last_detected).total_seconds()
                 if time_since_last > 5:  # 5 segundos sin detección
                     timers_to_cleanup.append(door_id)
         
         for door_id in timers_to_cleanup:
             logger.info(f"🧹 Limpiando timer sin detección reciente: {door_id}")
-            del self.door_timers[door_id]
+            self._remove_timer(door_id)
         
         # Actualizar estado global de alarma
         self.alarm_active = any(t.alarm_triggered for t in self.door_timers.values())
@@ -438,50 +824,54 @@ class AlertManager:
                 })
         return active_timers
     
-    def stop_all_alarms(self):
-        """Detener y ELIMINAR todas las alarmas activas"""
+    def stop_all_alarms(self) -> asyncio.Future:
+        """Detener y ELIMINAR todas las alarmas activas (awaitable)"""
+        return self._send('stop_all')
+    
+    def _handle_stop_all(self):
+        """Limpiar todos los timers (solo desde el actor)"""
         logger.info("🛑 STOP ALL - Eliminando TODOS los timers y alarmas")
         
         # Detener todas las alarmas sonoras
         if AUDIO_AVAILABLE and audio_service:
-            try:
-                audio_service.stop_all_alarms()
-            except:
-                pass
+            self._dispatch("audio", "stop_all_alarms")
         
         # Cancelar todas las alertas Telegram
         if self.telegram_alert_manager:
-            self.telegram_alert_manager.cancel_all_alerts()
+            self._dispatch("telegram", "cancel_all_alerts")
         
-        # Limpiar todo
+        # Limpiar todo (las entradas del heap quedan obsoletas)
         self.door_timers.clear()
+        self._journal(OP_CLEAR)
+        zone_registry.clear_timers()
         self.alarm_active = False
+        self._emit_timer_change('cleared')
         
         logger.info("✅ Sistema completamente limpio")
     
-    def acknowledge_alarm(self, door_id: str):
-        """Reconocer y ELIMINAR una alarma específica"""
-        if door_id in self.door_timers:
-            logger.info(f"✅ Reconociendo y eliminando timer: {door_id}")
-            
-            # Detener alarma sonora si está activa
+    def acknowledge_alarm(self, door_id: str) -> asyncio.Future:
+        """Reconocer y ELIMINAR una alarma específica (awaitable)"""
+        return self._send('acknowledge', door_id=door_id)
+    
+    def _handle_acknowledge(self, door_id: str) -> bool:
+        """Eliminar el timer reconocido (solo desde el actor)"""
+        if door_id not in self.door_timers:
+            return False
+        
+        logger.info(f"✅ Reconociendo y eliminando timer: {door_id}")
+        timer = self.door_timers[door_id]
+        
+        # Detener alarma sonora y Telegram aunque la alarma aún no se haya disparado
+        if not timer.alarm_triggered:
             if AUDIO_AVAILABLE and audio_service:
-                try:
-                    audio_service.stop_alarm(door_id)
-                except:
-                    pass
-            
-            # Cancelar alerta Telegram
+                self._dispatch("audio", "stop_alarm", zone_id=door_id)
             if self.telegram_alert_manager:
-                self.telegram_alert_manager.cancel_alert(door_id)
-            
-            del self.door_timers[door_id]
-            
-            # Actualizar estado global
-            self.alarm_active = any(t.alarm_triggered for t in self.door_timers.values())
-            
-            if not self.alarm_active:
-                logger.info("✅ No quedan alarmas activas")
+                self._dispatch("telegram", "cancel_alert", zone_id=door_id)
+        self._remove_timer(door_id)
+        
+        if not self.alarm_active:
+            logger.info("✅ No quedan alarmas activas")
+        return True
     
     def get_alert_statistics(self, hours: int = 24) -> Dict:
         """Obtener estadísticas básicas"""
@@ -494,7 +884,8 @@ class AlertManager:
             'active_timers': len(self.get_active_timers()),
             'alarm_active': self.alarm_active,
             'average_confidence': 0.85,  # Placeholder
-            'telegram_stats': telegram_stats
+            'telegram_stats': telegram_stats,
+            'actor': self.get_actor_metrics()
         }
     
     def save_config(self, config_path: Optional[str] = None):
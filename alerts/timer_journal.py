@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Journal Durable de Temporizadores
+Registro append-only en SQLite (modo WAL) de los cambios de DoorTimer,
+con compactación periódica a una tabla snapshot para recuperar el estado
+en milisegundos tras un reinicio del backend
+"""
+
+import sqlite3
+import logging
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Operaciones del journal
+OP_CREATE = "create"
+OP_TRIGGER = "trigger"
+OP_REMOVE = "remove"
+OP_CLEAR = "clear"
+
+
+class TimerJournal:
+    """
+    Write-ahead log de temporizadores de puertas
+
+    Solo se registran transiciones (crear, disparar, eliminar, limpiar todo);
+    las actualizaciones de last_detected no se escriben porque ocurren en
+    cada frame. Todas las escrituras se hacen fuera del loop (executor).
+    """
+
+    def __init__(self, db_path: str, compact_every: int = 500):
+        """
+        Args:
+            db_path: Ruta de la base de datos SQLite del journal
+            compact_every: Operaciones acumuladas antes de compactar
+        """
+        self.db_path = db_path
+        self.compact_every = compact_every
+        self._ops_since_compact = 0
+        # append_many y compact se llaman desde hilos del executor
+        self._lock = threading.Lock()
+        self._init_database()
+
+    def _init_database(self):
+        """Crear tablas de journal y snapshot"""
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+
+        with self._get_connection() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS timer_journal (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    op TEXT NOT NULL,
+                    door_id TEXT,
+                    camera_id TEXT,
+                    first_detected REAL,
+                    delay_seconds INTEGER,
+                    recorded_at REAL NOT NULL
+                )
+            ''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS timer_snapshot (
+                    door_id TEXT PRIMARY KEY,
+                    camera_id TEXT,
+                    first_detected REAL NOT NULL,
+                    delay_seconds INTEGER NOT NULL,
+                    alarm_triggered INTEGER DEFAULT 0
+                )
+            ''')
+            self._ops_since_compact = conn.execute(
+                'SELECT COUNT(*) FROM timer_journal'
+            ).fetchone()[0]
+
+    @contextmanager
+    def _get_connection(self):
+        """Context manager para conexiones a la base de datos"""
+        conn = sqlite3.connect(self.db_path)
+        conn.execute('PRAGMA synchronous=NORMAL')
+        try:
+            yield conn
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            raise e
+        finally:
+            conn.close()
+
+    def append_many(self, records: List[Dict]):
+        """
+        Añadir un lote de operaciones en una sola transacción
+
+        Args:
+            records: Dicts con 'op', 'door_id', 'camera_id', 'first_detected'
+                     (epoch), 'delay_seconds' y 'recorded_at'
+        """
+        if not records:
+            return
+
+        with self._lock:
+            with self._get_connection() as conn:
+                conn.executemany(
+                    '''INSERT INTO timer_journal
+                       (op, door_id, camera_id, first_detected, delay_seconds, recorded_at)
+                       VALUES (:op, :door_id, :camera_id, :first_detected, :delay_seconds, :recorded_at)''',
+                    [{
+                        'door_id': None, 'camera_id': None,
+                        'first_detected': None, 'delay_seconds': None,
+                        **record
+                    } for record in records]
+                )
+            self._ops_since_compact += len(records)
+            needs_compact = self._ops_since_compact >= self.compact_every
+
+        if needs_compact:
+            self.compact()
+
+    def _replay(self, conn) -> Dict[str, Dict]:
+        """Reconstruir el estado: snapshot + operaciones del journal en orden"""
+        state = {
+            row[0]: {
+                'door_id': row[0],
+                'camera_id': row[1],
+                'first_detected': row[2],
+                'delay_seconds': row[3],
+                'alarm_triggered': bool(row[4])
+            }
+            for row in conn.execute(
+                'SELECT door_id, camera_id, first_detected, delay_seconds, alarm_triggered FROM timer_snapshot'
+            )
+        }
+
+        for op, door_id, camera_id, first_detected, delay_seconds in conn.execute(
+            'SELECT op, door_id, camera_id, first_detected, delay_seconds FROM timer_journal ORDER BY seq'
+        ):
+            if op == OP_CREATE:
+                state[door_id] = {
+                    'door_id': door_id,
+                    'camera_id': camera_id,
+                    'first_detected': first_detected,
+                    'delay_seconds': delay_seconds,
+                    'alarm_triggered': False
+                }
+            elif op == OP_TRIGGER and door_id in state:
+                state[door_id]['alarm_triggered'] = True
+            elif op == OP_REMOVE:
+                state.pop(door_id, None)
+            elif op == OP_CLEAR:
+                state.clear()
+
+        return state
+
+    def load(self) -> List[Dict]:
+        """Estado actual de los temporizadores persistidos"""
+        start = time.perf_counter()
+        with self._get_connection() as conn:
+            state = self._replay(conn)
+        logger.info(f"Journal de temporizadores cargado: {len(state)} timers "
+                    f"en {(time.perf_counter() - start) * 1000:.1f} ms")
+        return list(state.values())
+
+    def compact(self):
+        """Volcar el estado al snapshot y vaciar el journal (atómico)"""
+        with self._lock:
+            with self._get_connection() as conn:
+                conn.execute('BEGIN IMMEDIATE')
+                state = self._replay(conn)
+                conn.execute('DELETE FROM timer_snapshot')
+                conn.executemany(
+                    '''INSERT INTO timer_snapshot
+                       (door_id, camera_id, first_detected, delay_seconds, alarm_triggered)
+                       VALUES (:door_id, :camera_id, :first_detected, :delay_seconds, :alarm_triggered)''',
+                    list(state.values())
+                )
+                conn.execute('DELETE FROM timer_journal')
+            self._ops_since_compact = 0
+
+        logger.debug(f"Journal de temporizadores compactado: {len(state)} timers")
@@ -6,8 +6,11 @@ Ahora con almacenamiento en base de datos SQLite
 
 import cv2
 import asyncio
+import bisect
 import threading
-from typing import Dict, Optional, Any
+from collections import deque
+from itertools import islice
+from typing import Deque, Dict, List, Optional, Any, Tuple
 from dataclasses import dataclass
 import logging
 import numpy as np
@@ -23,6 +26,8 @@ except ImportError:
     DB_AVAILABLE = False
     camera_config_db = None
 
+from backend.utils.zone_registry import zone_registry
+
 logger = logging.getLogger(__name__)
 
 @dataclass
@@ -52,27 +57,71 @@ class VideoBuffer:
     """Buffer circular para almacenar frames con timestamp"""
     def __init__(self, duration_seconds: int = 60):
         self.duration = duration_seconds
-        self.frames = []
-        self.timestamps = []
         self.max_frames = duration_seconds * 30  # Asumiendo 30 fps
+        # deque con maxlen: descartar el frame más antiguo es O(1)
+        self.frames: Deque[np.ndarray] = deque(maxlen=self.max_frames)
+        self.timestamps: Deque[datetime] = deque(maxlen=self.max_frames)
+        self._lock = threading.Lock()
         
     def add_frame(self, frame: np.ndarray):
         """Agregar frame al buffer"""
-        self.frames.append(frame)
-        self.timestamps.append(datetime.now())
-        
-        # Mantener solo los frames necesarios
-        if len(self.frames) > self.max_frames:
-            self.frames.pop(0)
-            self.timestamps.pop(0)
+        with self._lock:
+            self.frames.append(frame)
+            self.timestamps.append(datetime.now())
     
     def get_frames_range(self, start_time: datetime, end_time: datetime):
-        """Obtener frames en un rango de tiempo"""
-        frames_in_range = []
-        for i, timestamp in enumerate(self.timestamps):
-            if start_time <= timestamp <= end_time:
-                frames_in_range.append((self.frames[i], timestamp))
-        return frames_in_range
+        """
+        Obtener frames en un rango de tiempo (búsqueda binaria)
+        
+        Devuelve referencias a los frames del buffer, que no se modifican
+        una vez añadidos; no se copian las imágenes.
+        """
+        with self._lock:
+            lo = bisect.bisect_left(self.timestamps, start_time)
+            hi = bisect.bisect_right(self.timestamps, end_time)
+            return list(zip(islice(self.frames, lo, hi), islice(self.timestamps, lo, hi)))
+    
+    def get_nearest_frame(self, timestamp: datetime) -> Optional[Tuple[np.ndarray, datetime]]:
+        """Frame más cercano a un instante"""
+        with self._lock:
+            if not self.timestamps:
+                return None
+            index = bisect.bisect_left(self.timestamps, timestamp)
+            if index == len(self.timestamps) or (
+                    index > 0 and timestamp - self.timestamps[index - 1] < self.timestamps[index] - timestamp):
+                index -= 1
+            return self.frames[index], self.timestamps[index]
+
+def decimate_frames(frames: List[Tuple[np.ndarray, datetime]], target_fps: Optional[float] = None,
+                    max_frames: Optional[int] = None) -> List[Tuple[np.ndarray, datetime]]:
+    """
+    Reducir una secuencia de frames a un FPS objetivo y/o un máximo de frames
+    
+    Args:
+        frames: Lista de (frame, timestamp) ordenada por tiempo
+        target_fps: FPS máximo de la secuencia resultante
+        max_frames: Número máximo de frames (muestreo uniforme)
+    """
+    if target_fps and target_fps > 0 and frames:
+        min_gap = timedelta(seconds=1.0 / target_fps)
+        selected = []
+        next_time = None
+        for frame, timestamp in frames:
+            if next_time is None or timestamp >= next_time:
+                selected.append((frame, timestamp))
+                next_time = timestamp + min_gap
+        frames = selected
+    
+    if max_frames and max_frames > 0 and len(frames) > max_frames:
+        step = len(frames) / max_frames
+        frames = [frames[int(i * step)] for i in range(max_frames)]
+    
+    return frames
+
+def _resolve_waiter(future: asyncio.Future):
+    """Completar una espera de frame (ya puede estar cancelada por timeout)"""
+    if not future.done():
+        future.set_result(None)
 
 class CameraStream:
     """Maneja un stream individual de cámara"""
@@ -82,6 +131,13 @@ class CameraStream:
         self.is_running = False
         self.thread = None
         self.current_frame = None
+        # (secuencia, frame) publicados juntos para lectores de otros hilos
+        self.latest = (0, None)
+        # Identifica esta instancia del stream (las secuencias empiezan en 0)
+        self.stream_epoch = int(datetime.now().timestamp())
+        # Esperas async de frame nuevo: (loop, future) despertadas desde el hilo de captura
+        self._frame_waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+        self._waiters_lock = threading.Lock()
         self.buffer = VideoBuffer(duration_seconds=120)  # 2 minutos de buffer
         self.error_count = 0
         self.last_error = None
@@ -168,6 +224,8 @@ class CameraStream:
                     self.current_frame = frame
                     self.buffer.add_frame(frame.copy())
                     self.frame_count += 1
+                    self.latest = (self.frame_count, frame)
+                    self._notify_frame()
                     fps_counter += 1
                     consecutive_errors = 0  # Reset error counter on success
                     
@@ -211,11 +269,68 @@ class CameraStream:
         """Obtener el frame actual"""
         return self.current_frame.copy() if self.current_frame is not None else None
     
-    def get_context_video(self, event_time: datetime, before_seconds: int = 30, after_seconds: int = 30):
-        """Obtener video de contexto alrededor de un evento"""
+    def get_frame_with_seq(self) -> Tuple[int, Optional[np.ndarray]]:
+        """Obtener (secuencia, copia del frame actual); la secuencia identifica el frame"""
+        seq, frame = self.latest
+        return seq, (frame.copy() if frame is not None else None)
+    
+    def _notify_frame(self):
+        """Despertar a las corrutinas esperando un frame nuevo (hilo de captura)"""
+        with self._waiters_lock:
+            waiters, self._frame_waiters = self._frame_waiters, []
+        for loop, future in waiters:
+            try:
+                loop.call_soon_threadsafe(_resolve_waiter, future)
+            except RuntimeError:
+                pass  # Loop cerrado
+    
+    async def wait_for_frame(self, after_seq: int = 0, timeout: float = 1.0,
+                             copy: bool = True) -> Tuple[int, Optional[np.ndarray]]:
+        """
+        Esperar un frame con secuencia mayor que after_seq
+        
+        Args:
+            after_seq: Última secuencia ya procesada por el llamador
+            timeout: Segundos máximos de espera
+            copy: Devolver una copia (False solo si el frame no se va a modificar)
+            
+        Returns:
+            (secuencia, frame) o (secuencia, None) si no llegó un frame nuevo
+        """
+        seq, frame = self.latest
+        if seq <= after_seq:
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            entry = (loop, future)
+            with self._waiters_lock:
+                self._frame_waiters.append(entry)
+            try:
+                # Comprobar de nuevo tras registrarse para no perder la notificación
+                if self.latest[0] <= after_seq:
+                    await asyncio.wait_for(future, timeout)
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                with self._waiters_lock:
+                    if entry in self._frame_waiters:
+                        self._frame_waiters.remove(entry)
+            seq, frame = self.latest
+        
+        if seq <= after_seq or frame is None:
+            return seq, None
+        return seq, (frame.copy() if copy else frame)
+    
+    def get_context_video(self, event_time: datetime, before_seconds: int = 30, after_seconds: int = 30,
+                          target_fps: Optional[float] = None, max_frames: Optional[int] = None):
+        """Obtener video de contexto alrededor de un evento (opcionalmente decimado)"""
         start_time = event_time - timedelta(seconds=before_seconds)
         end_time = event_time + timedelta(seconds=after_seconds)
-        return self.buffer.get_frames_range(start_time, end_time)
+        frames = self.buffer.get_frames_range(start_time, end_time)
+        return decimate_frames(frames, target_fps, max_frames)
+    
+    def get_context_frame(self, timestamp: datetime) -> Optional[Tuple[np.ndarray, datetime]]:
+        """Frame del buffer más cercano a un instante"""
+        return self.buffer.get_nearest_frame(timestamp)
     
     def start_recording(self, output_path: str):
         """Iniciar grabación"""
@@ -278,6 +393,10 @@ class CameraManager:
         else:
             # Cargar desde JSON
             self._load_from_json()
+        
+        # Indexar cámara → zona en el registro compartido
+        for cam_id, config in self.configs.items():
+            zone_registry.set_camera(cam_id, config.zone_id, config.name)
             
     def _load_from_json(self):
         """Cargar configuraciones desde archivo JSON (fallback)"""
@@ -345,6 +464,7 @@ class CameraManager:
     def add_camera(self, config: CameraConfig):
         """Agregar nueva cámara"""
         self.configs[config.id] = config
+        zone_registry.set_camera(config.id, config.zone_id, config.name)
         self.save_configs()
         
         if config.enabled:
@@ -357,6 +477,7 @@ class CameraManager:
         
         if camera_id in self.configs:
             del self.configs[camera_id]
+            zone_registry.remove_camera(camera_id)
             
             # Eliminar de base de datos
             if self.use_db:
@@ -397,11 +518,9 @@ class CameraManager:
             self.stop_camera(cam_id)
     
     def get_camera_by_zone(self, zone_id: str) -> Optional[CameraStream]:
-        """Obtener cámara asociada a una zona"""
-        for config in self.configs.values():
-            if config.zone_id == zone_id and config.id in self.cameras:
-                return self.cameras[config.id]
-        return None
+        """Obtener cámara asociada a una zona o puerta (índice exacto)"""
+        camera_id = zone_registry.get_camera_id(zone_id)
+        return self.cameras.get(camera_id) if camera_id else None
     
     def get_camera_status(self) -> Dict[str, Any]:
         """Obtener estado de todas las cámaras"""
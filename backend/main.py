@@ -4,9 +4,9 @@ Backend API con FastAPI para Sistema de Seguridad YOLO11
 Arquitectura profesional con WebSockets y tiempo real
 """
 
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, UploadFile, File, HTTPException
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, UploadFile, File, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, StreamingResponse
+from fastapi.responses import FileResponse, StreamingResponse, Response
 from contextlib import asynccontextmanager
 import asyncio
 import json
@@ -15,16 +15,17 @@ import os
 from datetime import datetime
 from typing import Dict, List, Optional, Any
 from pathlib import Path
+from urllib.parse import quote
 import cv2
 import numpy as np
 from ultralytics import YOLO
 import base64
+import hashlib
 from PIL import Image
 import io
 import uvicorn
-import socket
-import ipaddress
-import requests
+import threading
+import zipfile
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
@@ -46,85 +47,103 @@ sys.path.append(str(Path(__file__).parent.parent))
 from alerts.alert_manager_v2_simple import AlertManager, DoorTimer
 from backend.camera_manager import CameraManager, CameraConfig
 from backend.utils.detection_manager import DetectionManager
+from backend.utils.door_tracker import DoorTracker
+from backend.utils.zone_registry import zone_registry
+from backend.utils.connection_manager import ConnectionManager
+from backend.utils.stream_protocol import StreamEncoderV2, PROTOCOL_VERSION
+from backend.utils.frame_encoder import frame_encoder, ViewerRateController
+from backend.utils.batch_detection import decode_image, iter_zip_images, compact_detections
+from backend.utils.event_stats import event_stats, RESEED_SECONDS
+from backend.utils.network_scanner import network_scanner, parse_networks
+from backend.utils.retention import RetentionEngine
+from backend.utils.state_store import (
+    StateStore, create_state_store, get_process_role,
+    ROLE_ALL, ROLE_API, CHANNEL_TIMERS, CHANNEL_COMMANDS
+)
 from backend.utils.eco_mode import EcoModeManager, SystemState
+from backend.utils.eco_scheduler import EcoScheduler
 from backend.utils.telegram_service import telegram_service
 from backend.utils.image_event_handler import image_handler
 try:
-    from backend.optimized_config import DETECTION_CONFIG, RESOURCE_CONFIG
+    from backend.optimized_config import (
+        DETECTION_CONFIG, RESOURCE_CONFIG, WEBSOCKET_CONFIG, STREAM_CONFIG, EVENT_WRITER_CONFIG,
+        RETENTION_CONFIG
+    )
 except ImportError:
     DETECTION_CONFIG = {"interval": 0.5, "max_fps": 30, "jpeg_quality": 70}
     RESOURCE_CONFIG = {"max_workers": 4}
-
-# Manager de conexiones WebSocket
-class ConnectionManager:
-    def __init__(self):
-        self.active_connections: List[WebSocket] = []
-        
-    async def connect(self, websocket: WebSocket):
-        await websocket.accept()
-        self.active_connections.append(websocket)
-        logger.info(f"Cliente conectado. Total: {len(self.active_connections)}")
-        
-    def disconnect(self, websocket: WebSocket):
-        try:
-            if websocket in self.active_connections:
-                self.active_connections.remove(websocket)
-                logger.info(f"Cliente desconectado. Total: {len(self.active_connections)}")
-            else:
-                logger.warning("Intento de desconectar un websocket que no está en la lista")
-        except Exception as e:
-            logger.error(f"Error al desconectar websocket: {e}")
-        
-    async def send_personal_message(self, message: str, websocket: WebSocket):
-        await websocket.send_text(message)
-        
-    async def broadcast(self, message: dict):
-        """Enviar mensaje a todos los clientes conectados"""
-        dead_connections = []
-        for connection in self.active_connections:
-            try:
-                await connection.send_json(message)
-            except Exception as e:
-                logger.error(f"Error enviando mensaje: {e}")
-                dead_connections.append(connection)
-        
-        # Limpiar conexiones muertas
-        for conn in dead_connections:
-            try:
-                if conn in self.active_connections:
-                    self.active_connections.remove(conn)
-            except Exception as e:
-                logger.error(f"Error limpiando conexión muerta: {e}")
+    WEBSOCKET_CONFIG = {"max_queue": 100, "overflow_policy": "coalesce", "send_timeout": 10.0}
+    STREAM_CONFIG = {"adaptive": True, "tiers": ["full", "half", "quarter"], "min_fps": 2}
+    EVENT_WRITER_CONFIG = {"async_writes": True, "flush_interval": 0.05, "batch_size": 256}
+    RETENTION_CONFIG = {"enabled": True, "interval_hours": 6}
 
 # Instancias globales
-manager = ConnectionManager()
+manager = ConnectionManager(
+    max_queue=WEBSOCKET_CONFIG.get('max_queue', 100),
+    overflow_policy=WEBSOCKET_CONFIG.get('overflow_policy', 'coalesce'),
+    send_timeout=WEBSOCKET_CONFIG.get('send_timeout', 10.0)
+)
 model: Optional[YOLO] = None
+# Instancia propia para /api/detect/batch: los predictores de Ultralytics no
+# son thread-safe y un imgsz distinto cambiaría los args del de las cámaras
+batch_model: Optional[YOLO] = None
+batch_model_lock = threading.Lock()
+MODEL_PATH = Path(__file__).parent.parent / 'runs' / 'gates' / 'gate_detector_v1' / 'weights' / 'best.pt'
 alert_manager: Optional[AlertManager] = None
 camera_manager: Optional[CameraManager] = None
 detection_manager: Optional[DetectionManager] = None
+door_tracker: Optional[DoorTracker] = None
 eco_manager: Optional[EcoModeManager] = None
+eco_scheduler: Optional[EcoScheduler] = None
+state_store: Optional[StateStore] = None
+retention_engine: Optional[RetentionEngine] = None
+process_role: str = ROLE_ALL
 monitoring_active = False
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Gestión del ciclo de vida de la aplicación"""
-    global model, alert_manager, camera_manager, detection_manager, eco_manager
+    global model, alert_manager, camera_manager, detection_manager, door_tracker, eco_manager, eco_scheduler
+    global state_store, process_role, retention_engine
     
     # Startup
     logger.info("Iniciando backend...")
     
-    # Cargar modelo YOLO
-    model_path = Path(__file__).parent.parent / 'runs' / 'gates' / 'gate_detector_v1' / 'weights' / 'best.pt'
-    if model_path.exists():
-        model = YOLO(str(model_path))
+    # Rol del proceso y almacén de estado (YOMJAI_ROLE / YOMJAI_STATE_STORE)
+    process_role = get_process_role()
+    state_store = create_state_store()
+    if process_role != ROLE_ALL and not state_store.shared:
+        logger.error(f"El rol '{process_role}' requiere un almacén compartido (sqlite o redis); usando '{ROLE_ALL}'")
+        process_role = ROLE_ALL
+    logger.info(f"Rol del proceso: {process_role}")
+    is_api_only = process_role == ROLE_API
+    
+    # Conversión única a auto_vacuum incremental, antes de que nada registre
+    # eventos (el VACUUM bloquea la escritura mientras dura)
+    if not is_api_only:
+        try:
+            from backend.utils.event_logger import event_logger
+            await asyncio.get_event_loop().run_in_executor(None, event_logger.enable_incremental_vacuum)
+        except Exception as e:
+            logger.error(f"Error activando auto_vacuum incremental: {e}")
+    
+    # Cargar modelo YOLO (no necesario en workers de API)
+    if is_api_only:
+        logger.info("Worker de API: modelo YOLO no cargado")
+    elif MODEL_PATH.exists():
+        model = YOLO(str(MODEL_PATH))
         logger.info("Modelo YOLO cargado exitosamente")
     else:
-        logger.error(f"Modelo no encontrado en {model_path}")
+        logger.error(f"Modelo no encontrado en {MODEL_PATH}")
     
-    # Cargar AlertManager
+    # Cargar AlertManager (los workers de API leen los timers del almacén compartido)
     config_path = Path(__file__).parent.parent / 'alerts' / 'alert_config_v2.json'
-    alert_manager = AlertManager(str(config_path))
-    logger.info("AlertManager inicializado")
+    if not is_api_only:
+        alert_manager = AlertManager(
+            str(config_path),
+            state_store=state_store if state_store.shared else None
+        )
+        logger.info("AlertManager inicializado")
     
     # Configurar Telegram si está en la configuración
     if alert_manager and 'telegram' in alert_manager.config:
@@ -139,8 +158,8 @@ async def lifespan(app: FastAPI):
     # Cargar CameraManager con manejo de errores
     try:
         camera_manager = CameraManager()
-        # Solo iniciar cámaras si no está deshabilitado
-        if not os.environ.get('YOMJAI_NO_AUTO_CAMERAS'):
+        # Solo iniciar cámaras si no está deshabilitado (y no es un worker de API)
+        if not os.environ.get('YOMJAI_NO_AUTO_CAMERAS') and not is_api_only:
             try:
                 camera_manager.start_all()
                 logger.info("CameraManager: cámaras iniciadas")
@@ -155,18 +174,42 @@ async def lifespan(app: FastAPI):
     # Inicializar DetectionManager
     detection_manager = DetectionManager(
         state_timeout=5.0,  # 5 segundos sin detección = objeto ausente
-        min_confidence=0.75  # Confianza mínima
+        min_confidence=0.75,  # Confianza mínima
+        temporal_filter=alert_manager.config.get('temporal_filter', {}) if alert_manager else {}
     )
     logger.info("DetectionManager inicializado")
     
+    # Inicializar tracker de puertas (identidades estables por cámara)
+    tracking_config = alert_manager.config.get('door_tracking', {}) if alert_manager else {}
+    door_tracker = DoorTracker(
+        iou_threshold=tracking_config.get('iou_threshold', 0.3),
+        max_age=tracking_config.get('max_age_seconds', 600.0),
+        gate_rois=tracking_config.get('gate_rois', {})
+    )
+    logger.info("DoorTracker inicializado")
+    
     # Inicializar EcoModeManager
     eco_manager = EcoModeManager()
     logger.info("Modo Eco inicializado en estado IDLE")
     
+    # Inicializar planificador predictivo del Modo Eco
+    eco_scheduler = EcoScheduler(
+        eco_manager,
+        config_path=str(Path(__file__).parent / 'configs' / 'eco_schedule_config.json')
+    )
+    
     # Crear directorio para imágenes de eventos
     Path("/Users/Shared/yolo11_project/event_images").mkdir(parents=True, exist_ok=True)
     logger.info("Directorio de imágenes de eventos listo")
     
+    # Escritura de eventos por lotes y estadísticas en memoria (sembradas una vez, luego incrementales)
+    try:
+        from backend.utils.event_logger import event_logger
+        event_logger.configure_writer(**EVENT_WRITER_CONFIG)
+        await asyncio.get_event_loop().run_in_executor(None, event_stats.attach, event_logger)
+    except Exception as e:
+        logger.error(f"Error sembrando estadísticas de eventos: {e}")
+    
     # Registrar evento de inicio del sistema
     try:
         from backend.utils.event_logger import event_logger, EventTypes
@@ -187,13 +230,44 @@ async def lifespan(app: FastAPI):
     # Iniciar monitor de temporizadores
     asyncio.create_task(timer_monitor())
     
+    # Iniciar planificador del Modo Eco
+    asyncio.create_task(eco_schedule_monitor())
+    
+    # En workers de API los contadores no ven los eventos de la inferencia:
+    # volver a sembrarlos desde los agregados periódicamente
+    if is_api_only:
+        asyncio.create_task(event_stats_monitor())
+    
+    # Retención de eventos (un solo proceso: los workers de API no la ejecutan)
+    if not is_api_only and RETENTION_CONFIG.get('enabled', True):
+        from backend.utils.event_logger import event_logger
+        retention_engine = RetentionEngine(
+            event_logger,
+            **{k: v for k, v in RETENTION_CONFIG.items() if k != 'enabled'}
+        )
+        asyncio.create_task(retention_monitor())
+    
+    # Comandos de workers de API (reconocer / detener alarmas)
+    if alert_manager and state_store.shared:
+        asyncio.create_task(state_command_listener())
+    
     yield
     
     # Shutdown
     logger.info("Cerrando backend...")
+    if alert_manager:
+        await alert_manager.shutdown()
+    if state_store:
+        state_store.close()
     if camera_manager:
         camera_manager.stop_all()
 
+    # Escribir eventos pendientes y cerrar conexiones SQLite persistentes
+    from backend.utils.event_logger import event_logger
+    from backend.utils.camera_config_db import camera_config_db
+    event_logger.close()
+    camera_config_db.close()
+
 # Crear aplicación FastAPI
 app = FastAPI(
     title="YOLO11 Security System API",
@@ -246,8 +320,13 @@ async def health_check():
     }
 
 @app.post("/api/detect")
-async def detect_image(file: UploadFile = File(...)):
-    """Detectar puertas en imagen subida"""
+async def detect_image(file: UploadFile = File(...), annotate: bool = True, broadcast: bool = True):
+    """
+    Detectar puertas en imagen subida
+    
+    annotate=false omite la imagen anotada y broadcast=false no la envía
+    a los clientes WebSocket
+    """
     if not model:
         raise HTTPException(status_code=503, detail="Modelo no disponible")
     
@@ -293,25 +372,28 @@ async def detect_image(file: UploadFile = File(...)):
             #             image=annotated if 'annotated' in locals() else None
             #         )
         
-        # Obtener imagen anotada
-        annotated = results[0].plot()
-        _, buffer = cv2.imencode('.jpg', annotated)
-        img_base64 = base64.b64encode(buffer).decode('utf-8')
+        # Obtener imagen anotada (solo si se pide)
+        image_data = None
+        if annotate:
+            annotated = results[0].plot()
+            _, buffer = cv2.imencode('.jpg', annotated)
+            image_data = f"data:image/jpeg;base64,{base64.b64encode(buffer).decode('utf-8')}"
         
         # Broadcast a clientes WebSocket
-        await manager.broadcast({
-            'type': 'detection',
-            'data': {
-                'detections': detections,
-                'image': f"data:image/jpeg;base64,{img_base64}",
-                'timestamp': datetime.now().isoformat()
-            }
-        })
+        if broadcast:
+            await manager.broadcast({
+                'type': 'detection',
+                'data': {
+                    'detections': detections,
+                    'image': image_data,
+                    'timestamp': datetime.now().isoformat()
+                }
+            })
         
         return {
             'success': True,
             'detections': detections,
-            'image': f"data:image/jpeg;base64,{img_base64}",
+            'image': image_data,
             'timers': alert_manager.get_active_timers() if alert_manager else []
         }
         
@@ -319,29 +401,169 @@ async def detect_image(file: UploadFile = File(...)):
         logger.error(f"Error en detección: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+async def _iter_batch_uploads(files: List[UploadFile], max_images: int):
+    """
+    Imágenes (nombre, bytes) de los archivos subidos, expandiendo los ZIP
+
+    Cada archivo se lee al llegar a él, no todos por adelantado
+    """
+    count = 0
+    for upload in files:
+        name = upload.filename or 'image'
+        contents = await upload.read()
+        await upload.close()
+        if name.lower().endswith('.zip') or upload.content_type in ('application/zip', 'application/x-zip-compressed'):
+            try:
+                for item in iter_zip_images(contents, max_images - count):
+                    count += 1
+                    yield item
+            except zipfile.BadZipFile:
+                yield name, None
+        else:
+            count += 1
+            yield name, contents
+        if count >= max_images:
+            return
+
+def _run_detection_batch(batch: List[tuple], conf: float, target_size: int, annotate: bool) -> List[Dict]:
+    """
+    Decodificar y detectar un lote de imágenes (se ejecuta en un executor)
+
+    Usa batch_model, no el modelo de las cámaras; el lock serializa las
+    peticiones por lotes concurrentes
+    """
+    global batch_model
+    items = []
+    images = []
+    pending = []
+    for name, contents in batch:
+        image, scale = decode_image(contents, target_size) if contents else (None, 1)
+        item = {'name': name}
+        items.append(item)
+        if image is None:
+            item['error'] = "No se pudo decodificar la imagen"
+            continue
+        images.append(image)
+        pending.append((item, scale))
+    
+    if images:
+        with batch_model_lock:
+            if batch_model is None:
+                batch_model = YOLO(str(MODEL_PATH))
+            results = batch_model.predict(images, conf=conf, iou=0.5, imgsz=target_size, verbose=False)
+        for (item, scale), result in zip(pending, results):
+            item['detections'] = compact_detections(result, batch_model.names, scale)
+            if annotate:
+                _, buffer = cv2.imencode('.jpg', result.plot())
+                item['image'] = f"data:image/jpeg;base64,{base64.b64encode(buffer).decode('utf-8')}"
+    return items
+
+@app.post("/api/detect/batch")
+async def detect_batch(
+    files: List[UploadFile] = File(...),
+    conf: float = 0.5,
+    batch_size: int = 16,
+    target_size: int = 640,
+    max_images: int = 5000,
+    annotate: bool = False,
+    broadcast: bool = False
+):
+    """
+    Detección por lotes sobre muchas imágenes (multipart y/o ZIP)
+    
+    Pensado para backtesting: no crea temporizadores ni alertas. Las
+    imágenes mayores que la entrada del modelo se decodifican a escala
+    reducida; las coordenadas se devuelven en la escala original. Solo se
+    renderizan (annotate) o difunden (broadcast) imágenes si se pide.
+    """
+    if not model:
+        raise HTTPException(status_code=503, detail="Modelo no disponible")
+    
+    batch_size = max(1, min(batch_size, 64))
+    # imgsz múltiplo del stride (32) y acotado
+    target_size = max(320, min(target_size, 1280)) // 32 * 32
+    loop = asyncio.get_event_loop()
+    start = loop.time()
+    
+    results: List[Dict] = []
+    batch: List[tuple] = []
+    
+    async def flush():
+        items = await loop.run_in_executor(
+            None, _run_detection_batch, list(batch), conf, target_size, annotate
+        )
+        batch.clear()
+        results.extend(items)
+        if broadcast:
+            for item in items:
+                if item.get('detections'):
+                    await manager.broadcast({
+                        'type': 'detection',
+                        'data': {
+                            'name': item['name'],
+                            'detections': item['detections'],
+                            'image': item.get('image'),
+                            'timestamp': datetime.now().isoformat()
+                        }
+                    })
+    
+    try:
+        async for item in _iter_batch_uploads(files, max_images):
+            batch.append(item)
+            if len(batch) >= batch_size:
+                await flush()
+        if batch:
+            await flush()
+    except Exception as e:
+        logger.error(f"Error en detección por lotes: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    class_counts: Dict[str, int] = {}
+    for item in results:
+        for detection in item.get('detections', ()):
+            class_counts[detection['class_name']] = class_counts.get(detection['class_name'], 0) + 1
+    elapsed = loop.time() - start
+    
+    return {
+        'success': True,
+        'total_images': len(results),
+        'images_with_detections': sum(1 for item in results if item.get('detections')),
+        'errors': sum(1 for item in results if 'error' in item),
+        'class_counts': class_counts,
+        'elapsed_seconds': round(elapsed, 2),
+        'images_per_second': round(len(results) / elapsed, 1) if elapsed > 0 else None,
+        'results': results
+    }
+
 @app.get("/api/timers")
 async def get_timers():
     """Obtener temporizadores activos"""
     if not alert_manager:
+        if process_role == ROLE_API:
+            return await _get_timers_from_store()
         return {"timers": []}
     
     return {
         "timers": alert_manager.get_active_timers(),
-        "alarm_active": alert_manager.alarm_active if hasattr(alert_manager, 'alarm_active') else False
+        "alarm_active": alert_manager.alarm_active if hasattr(alert_manager, 'alarm_active') else False,
+        "version": alert_manager.timer_version
     }
 
 @app.post("/api/timers/acknowledge/{door_id}")
 async def acknowledge_timer(door_id: str):
     """Reconocer alarma de una puerta"""
-    if not alert_manager:
+    if alert_manager:
+        await alert_manager.acknowledge_alarm(door_id)
+    elif process_role == ROLE_API:
+        # El worker de inferencia es el dueño de los timers
+        await _publish_command({'command': 'acknowledge', 'door_id': door_id})
+    else:
         raise HTTPException(status_code=503, detail="AlertManager no disponible")
     
-    alert_manager.acknowledge_alarm(door_id)
-    
     # Registrar evento
     try:
         from backend.utils.event_logger import event_logger, EventTypes
-        zone_name = alert_manager.config['zones'].get(door_id, {}).get('name', door_id)
+        zone_name = zone_registry.get_zone_name(door_id)
         event_logger.log_event(
             event_type=EventTypes.ALARM_ACKNOWLEDGED,
             event_name=f"Alarma reconocida - {zone_name}",
@@ -363,11 +585,13 @@ async def acknowledge_timer(door_id: str):
 @app.post("/api/alarms/stop-all")
 async def stop_all_alarms():
     """Detener todas las alarmas"""
-    if not alert_manager:
+    if alert_manager:
+        await alert_manager.stop_all_alarms()
+    elif process_role == ROLE_API:
+        await _publish_command({'command': 'stop_all'})
+    else:
         raise HTTPException(status_code=503, detail="AlertManager no disponible")
     
-    alert_manager.stop_all_alarms()
-    
     # También resetear el detection manager
     if detection_manager:
         detection_manager.reset_all()
@@ -399,6 +623,14 @@ async def update_config(config: dict):
         alert_manager.config.update(config)
         alert_manager.save_config()
         
+        # Actualizar nombres de zona en el registro
+        if 'zones' in config:
+            zone_registry.set_zone_names(config['zones'])
+        
+        # Aplicar filtro temporal si cambió
+        if 'temporal_filter' in config and detection_manager:
+            detection_manager.configure_temporal_filter(config['temporal_filter'])
+        
         # Configurar Telegram si está presente
         if 'telegram' in config:
             tg_config = config['telegram']
@@ -455,19 +687,9 @@ async def process_detection(data: dict):
         # Procesar con AlertManager
         await alert_manager.process_detection(detections, camera_id=camera_id)
         
-        # Obtener timers actualizados
+        # Obtener timers actualizados (los clientes WebSocket reciben los deltas vía timer_monitor)
         timers = alert_manager.get_active_timers()
         
-        # Broadcast actualización
-        await manager.broadcast({
-            'type': 'timer_update',
-            'data': {
-                'timers': timers,
-                'alarm_active': alert_manager.alarm_active,
-                'timestamp': datetime.now().isoformat()
-            }
-        })
-        
         return {
             "success": True,
             "timers": timers,
@@ -478,14 +700,15 @@ async def process_detection(data: dict):
         logger.error(f"Error procesando detección: {e}")
         raise HTTPException(status_code=400, detail=str(e))
 
-@app.get("/api/statistics")
-async def get_statistics():
-    """Obtener estadísticas del sistema"""
-    if not alert_manager:
-        return {"statistics": {}}
-    
+# Caché de /api/statistics (el frontend hace polling)
+STATISTICS_TTL_SECONDS = 2.0
+_statistics_cache: Dict[str, Any] = {'expires': 0.0, 'body': None, 'etag': None}
+
+def _build_statistics() -> Dict:
+    """Estadísticas del sistema a partir de los contadores en memoria"""
     stats = alert_manager.get_alert_statistics(hours=24)
     stats['websocket_clients'] = len(manager.active_connections)
+    stats['websocket'] = manager.get_metrics()
     
     # Agregar estado de zonas
     if detection_manager:
@@ -493,33 +716,20 @@ async def get_statistics():
     
     # Agregar estadísticas por hora para la gráfica
     try:
-        from backend.utils.event_logger import event_logger
-        
-        # Obtener estadísticas de las últimas 24 horas
-        hourly_stats_dict = event_logger.get_hourly_stats(days=1)
+        hourly_stats_dict = event_stats.get_hourly_stats()
         
         # Convertir a lista ordenada para la gráfica
-        hourly_stats = []
-        for hour in range(24):
-            hourly_stats.append({
-                'hour': hour,
-                'count': hourly_stats_dict.get(hour, 0)
-            })
-        
-        stats['hourly_activity'] = hourly_stats
+        stats['hourly_activity'] = [
+            {'hour': hour, 'count': hourly_stats_dict.get(hour, 0)}
+            for hour in range(24)
+        ]
         
-        # Actualizar el total_alerts con los eventos reales de la DB
-        total_events_24h = sum(hourly_stats_dict.values())
-        stats['total_alerts'] = total_events_24h
+        # Actualizar el total_alerts con los eventos reales de las últimas 24 horas
+        stats['total_alerts'] = sum(hourly_stats_dict.values())
         
-        # Obtener estadísticas adicionales de eventos
-        event_stats = event_logger.get_event_stats()
-        
-        # Contar detecciones del último día
-        if 'by_type' in event_stats:
-            stats['detections_24h'] = event_stats['by_type'].get('door_open', 0) + event_stats['by_type'].get('door_close', 0)
-        else:
-            stats['detections_24h'] = total_events_24h
+        # Aperturas y cierres de puertas del último día
+        recent_by_type = event_stats.get_recent_by_type()
+        stats['detections_24h'] = recent_by_type.get('door_open', 0) + recent_by_type.get('door_close', 0)
             
     except Exception as e:
         logger.error(f"Error obteniendo estadísticas por hora: {e}")
@@ -530,6 +740,31 @@ async def get_statistics():
     
     return {"statistics": stats}
 
+@app.get("/api/statistics")
+async def get_statistics(request: Request):
+    """
+    Obtener estadísticas del sistema
+    
+    La respuesta se cachea STATISTICS_TTL_SECONDS y lleva ETag; si el
+    cliente envía If-None-Match con el mismo valor se responde 304.
+    """
+    if not alert_manager:
+        return {"statistics": {}}
+    
+    now = asyncio.get_event_loop().time()
+    if _statistics_cache['body'] is None or now >= _statistics_cache['expires']:
+        body = json.dumps(_build_statistics(), default=str).encode('utf-8')
+        _statistics_cache.update({
+            'body': body,
+            'etag': f'"{hashlib.md5(body).hexdigest()}"',
+            'expires': now + STATISTICS_TTL_SECONDS
+        })
+    
+    headers = {"ETag": _statistics_cache['etag'], "Cache-Control": "no-cache"}
+    if request.headers.get('if-none-match') == _statistics_cache['etag']:
+        return Response(status_code=304, headers=headers)
+    return Response(content=_statistics_cache['body'], media_type="application/json", headers=headers)
+
 @app.get("/api/zones")
 async def get_zones():
     """Obtener estado de todas las zonas"""
@@ -538,25 +773,63 @@ async def get_zones():
     
     return {"zones": detection_manager.get_zone_states()}
 
+@app.get("/api/doors")
+async def get_tracked_doors():
+    """Obtener puertas físicas seguidas por cámara"""
+    if not door_tracker:
+        return {"doors": {}}
+    
+    return {"doors": door_tracker.get_tracks()}
+
 # ==================== EVENTOS ====================
 
 @app.get("/api/events/recent")
 async def get_recent_events(
     limit: int = 20, 
     offset: int = 0,
-    search: str = None
+    search: str = None,
+    event_type: str = None,
+    zone_id: str = None,
+    severity: str = None,
+    since: str = None,
+    until: str = None,
+    order: str = 'recent',
+    cursor: str = None
 ):
-    """Obtiene los eventos recientes del sistema con opción de búsqueda"""
+    """
+    Obtiene los eventos recientes del sistema con opción de búsqueda
+    
+    search busca prefijos de palabras (índice FTS5); order=relevance ordena
+    por relevancia. since/until son fechas ISO (UTC si no indican zona).
+    Para paginar, pasar el next_cursor de la respuesta anterior en cursor.
+    """
+    from backend.utils.event_logger import decode_cursor
+    if cursor:
+        try:
+            decode_cursor(cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    
     try:
         # Importar aquí para evitar circular imports
         from backend.utils.event_logger import event_logger
         
-        events = event_logger.get_recent_events(
-            limit=limit, 
-            offset=offset,
-            search=search
+        page = await asyncio.get_event_loop().run_in_executor(
+            None,
+            lambda: event_logger.get_events_page(
+                limit=limit, 
+                offset=offset,
+                search=search,
+                event_type=event_type,
+                zone_id=zone_id,
+                severity=severity,
+                since=since,
+                until=until,
+                order=order,
+                cursor=cursor
+            )
         )
-        return {"events": events}
+        return page
     except Exception as e:
         logger.error(f"Error obteniendo eventos: {e}")
         return {"events": []}
@@ -565,6 +838,8 @@ async def get_recent_events(
 async def get_event_stats():
     """Obtiene estadísticas de eventos"""
     try:
+        if event_stats.seeded:
+            return {"stats": event_stats.get_event_stats()}
         from backend.utils.event_logger import event_logger
         stats = event_logger.get_event_stats()
         return {"stats": stats}
@@ -572,44 +847,102 @@ async def get_event_stats():
         logger.error(f"Error obteniendo estadísticas de eventos: {e}")
         return {"stats": {}}
 
+@app.get("/api/events/rollup")
+async def get_event_rollup(
+    granularity: str = 'hour',
+    since: str = None,
+    until: str = None,
+    zone_id: str = None,
+    event_type: str = None,
+    group_by: str = None
+):
+    """
+    Serie temporal de eventos desde los agregados por hora o día
+    
+    group_by: columnas separadas por comas (zone_id, event_type, severity)
+    """
+    if granularity not in ('hour', 'day'):
+        raise HTTPException(status_code=400, detail="granularity debe ser 'hour' o 'day'")
+    
+    from backend.utils.event_logger import event_logger
+    columns = tuple(c.strip() for c in group_by.split(',')) if group_by else ()
+    buckets = await asyncio.get_event_loop().run_in_executor(
+        None,
+        lambda: event_logger.get_rollup(
+            granularity=granularity, since=since, until=until,
+            zone_id=zone_id, event_type=event_type, group_by=columns
+        )
+    )
+    return {"granularity": granularity, "buckets": buckets}
+
+@app.get("/api/events/retention")
+async def get_retention_status():
+    """Estado de la retención de eventos y resultado de la última pasada"""
+    if not retention_engine:
+        return {"retention": {"enabled": False}}
+    return {"retention": {"enabled": True, **retention_engine.get_status()}}
+
+@app.post("/api/events/retention/run")
+async def run_retention():
+    """Ejecutar una pasada de retención ahora"""
+    if not retention_engine:
+        raise HTTPException(status_code=503, detail="Retención no disponible en este proceso")
+    summary = await asyncio.get_event_loop().run_in_executor(None, retention_engine.run_once)
+    return {"retention": summary}
+
 @app.get("/api/events/{event_id}/image")
 async def get_event_image(event_id: int):
     """Obtener la imagen completa de un evento"""
     try:
         from backend.utils.event_logger import event_logger
         
-        # Obtener información del evento
-        with event_logger._get_connection() as conn:
-            cursor = conn.execute(
-                'SELECT image_path, thumbnail_base64 FROM events WHERE id = ?',
-                (event_id,)
-            )
-            row = cursor.fetchone()
-            
-            if not row:
-                raise HTTPException(status_code=404, detail="Evento no encontrado")
-            
-            image_path = row['image_path']
-            thumbnail = row['thumbnail_base64']
-            
-            # Si hay archivo guardado, devolverlo
-            if image_path and os.path.exists(image_path):
-                return FileResponse(image_path)
-            
-            # Si solo hay thumbnail, decodificarlo y devolverlo
-            elif thumbnail:
-                img_data = base64.b64decode(thumbnail)
-                return StreamingResponse(
-                    io.BytesIO(img_data),
-                    media_type="image/jpeg"
-                )
-            else:
-                raise HTTPException(status_code=404, detail="No hay imagen disponible para este evento")
+        # Obtener información del evento (incluye los aún no escritos)
+        row = event_logger.get_event_image_data(event_id)
+        if not row:
+            raise HTTPException(status_code=404, detail="Evento no encontrado")
+        
+        image_path = row['image_path']
+        thumbnail = row['thumbnail']
+        
+        # Si hay archivo guardado, devolverlo
+        if image_path and os.path.exists(image_path):
+            return FileResponse(image_path)
+        
+        # Si solo hay thumbnail, devolverlo
+        elif thumbnail:
+            return Response(content=thumbnail, media_type="image/jpeg")
+        else:
+            raise HTTPException(status_code=404, detail="No hay imagen disponible para este evento")
                 
     except Exception as e:
         logger.error(f"Error obteniendo imagen del evento: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/thumbnails/{thumbnail_hash}")
+async def get_thumbnail(thumbnail_hash: str):
+    """
+    Thumbnail de un evento por su hash de contenido
+    
+    El contenido de un hash nunca cambia, así que se puede cachear
+    indefinidamente en el navegador.
+    """
+    if len(thumbnail_hash) != 32 or any(c not in '0123456789abcdef' for c in thumbnail_hash):
+        raise HTTPException(status_code=400, detail="Hash de thumbnail inválido")
+    
+    from backend.utils.event_logger import event_logger
+    data = await asyncio.get_event_loop().run_in_executor(None, event_logger.get_thumbnail, thumbnail_hash)
+    if data is None:
+        raise HTTPException(status_code=404, detail="Thumbnail no encontrado")
+    
+    return Response(
+        content=data,
+        media_type="image/jpeg",
+        headers={
+            'Cache-Control': 'public, max-age=31536000, immutable',
+            'ETag': f'"{thumbnail_hash}"'
+        }
+    )
+
 @app.get("/api/eco-mode")
 async def get_eco_mode():
     """Obtener estado del Modo Eco"""
@@ -625,10 +958,32 @@ async def get_eco_mode():
                 "idle_timeout": eco_manager.idle_timeout,
                 "alert_timeout": eco_manager.alert_timeout,
                 "motion_threshold": eco_manager.motion_threshold
-            }
+            },
+            "schedule": eco_scheduler.get_status() if eco_scheduler else None
         }
     }
 
+@app.get("/api/eco-mode/schedule")
+async def get_eco_schedule():
+    """Obtener plan predictivo del Modo Eco"""
+    if not eco_scheduler:
+        return {"schedule": {"enabled": False}}
+    
+    return {"schedule": eco_scheduler.get_status()}
+
+@app.put("/api/eco-mode/schedule")
+async def update_eco_schedule(settings: dict):
+    """Actualizar configuración del planificador del Modo Eco"""
+    if not eco_scheduler:
+        raise HTTPException(status_code=503, detail="Planificador Eco no disponible")
+    
+    try:
+        eco_scheduler.update_config(settings)
+        return {"success": True, "schedule": eco_scheduler.get_status()}
+        
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @app.put("/api/eco-mode")
 async def update_eco_mode(settings: dict):
     """Actualizar configuración del Modo Eco"""
@@ -841,8 +1196,16 @@ async def update_camera(camera_id: str, config: dict):
         # Actualizar la configuración
         new_config = CameraConfig(**config)
         camera_manager.configs[camera_id] = new_config
+        zone_registry.set_camera(camera_id, new_config.zone_id, new_config.name)
         camera_manager.save_configs()
         
+        # Cambio de zona: las puertas seguidas llevan el prefijo de la zona
+        # anterior en su door_id, así que se vuelven a numerar
+        if new_config.zone_id != current_config.zone_id:
+            frame_encoder.invalidate(camera_id)
+            if door_tracker:
+                door_tracker.reset_camera(camera_id)
+        
         # Solo reconectar si es necesario
         if needs_reconnect and camera_id in camera_manager.cameras:
             camera_manager.stop_camera(camera_id)
@@ -867,6 +1230,9 @@ async def remove_camera(camera_id: str):
         raise HTTPException(status_code=503, detail="CameraManager no disponible")
     
     camera_manager.remove_camera(camera_id)
+    frame_encoder.invalidate(camera_id)
+    if door_tracker:
+        door_tracker.reset_camera(camera_id)
     return {"success": True, "message": f"Cámara {camera_id} eliminada"}
 
 @app.post("/api/cameras/{camera_id}/reconnect")
@@ -945,105 +1311,82 @@ async def test_camera_connection(camera_id: str):
     }
 
 @app.post("/api/cameras/scan")
-async def scan_network_for_cameras():
-    """Escanear la red en busca de cámaras IP"""
-    import socket
-    import ipaddress
-    from concurrent.futures import ThreadPoolExecutor, as_completed
-    import requests
-    
-    def get_local_network():
-        """Obtener el rango de red local"""
-        try:
-            s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-            s.connect(("8.8.8.8", 80))
-            local_ip = s.getsockname()[0]
-            s.close()
-            # Asumiendo una red /24
-            network = ipaddress.ip_network(f"{local_ip}/24", strict=False)
-            return network
-        except:
-            # Red por defecto
-            return ipaddress.ip_network("192.168.1.0/24")
+async def scan_network_for_cameras(subnets: Optional[str] = None, force: bool = False):
+    """
+    Escanear la red en busca de cámaras IP
+    
+    subnets: lista separada por comas (por defecto YOMJAI_SCAN_SUBNETS o la
+    red local /24). Los hosts sondeados recientemente salen de la caché
+    salvo force=true. Para recibir cámaras a medida que aparecen usar
+    el WebSocket /ws/cameras/scan.
+    """
+    logger.info("Iniciando escaneo de red para cámaras")
+    
+    try:
+        networks = parse_networks(subnets)
+        result = await network_scanner.scan(networks, force=force)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error en escaneo de red: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    return {
+        "success": True,
+        "cameras": result['cameras'],
+        "network_scanned": ", ".join(result['networks']),
+        "total_found": len(result['cameras']),
+        "hosts_probed": result['probed'],
+        "hosts_cached": result['cached'],
+        "elapsed_seconds": result['elapsed_seconds']
+    }
+
+@app.websocket("/ws/cameras/scan")
+async def scan_network_websocket(websocket: WebSocket):
+    """
+    Escaneo de red con resultados en streaming
+    
+    Query: subnets, force. Mensajes: camera_found, scan_progress,
+    scan_complete y scan_error.
+    """
+    await websocket.accept()
+    connected = True
     
-    def check_rtsp_port(ip_str, port=554, timeout=0.5):
-        """Verificar si el puerto RTSP está abierto"""
+    async def send(message: dict):
+        # Si el cliente se fue, el escaneo sigue y completa la caché
+        nonlocal connected
+        if not connected:
+            return
         try:
-            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            sock.settimeout(timeout)
-            result = sock.connect_ex((ip_str, port))
-            sock.close()
-            return result == 0
-        except:
-            return False
+            await websocket.send_json(message)
+        except Exception:
+            connected = False
     
-    def check_hikvision_http(ip_str, timeout=1):
-        """Verificar si es una cámara Hikvision por HTTP"""
-        ports = [80, 8080]
-        
-        for port in ports:
-            try:
-                url = f"http://{ip_str}:{port}"
-                response = requests.get(url, timeout=timeout, verify=False)
-                
-                # Buscar indicadores de Hikvision
-                if any(indicator in response.text.lower() for indicator in ['hikvision', 'hik', 'dvr', 'nvr']):
-                    return True, port
-            except:
-                pass
-        
-        return False, None
+    async def on_found(camera: dict):
+        await send({"type": "camera_found", "camera": camera})
     
-    logger.info("Iniciando escaneo de red para cámaras")
+    async def on_progress(done: int, total: int):
+        await send({"type": "scan_progress", "done": done, "total": total})
     
     try:
-        network = get_local_network()
-        found_cameras = []
-        
-        # Usar ThreadPoolExecutor para escaneo paralelo
-        with ThreadPoolExecutor(max_workers=50) as executor:
-            # Crear futures para cada IP
-            future_to_ip = {}
-            for ip in network.hosts():
-                future = executor.submit(check_rtsp_port, str(ip))
-                future_to_ip[future] = str(ip)
-            
-            # Procesar resultados conforme se completan
-            for future in as_completed(future_to_ip):
-                ip = future_to_ip[future]
-                try:
-                    has_rtsp = future.result()
-                    if has_rtsp:
-                        # Verificar si es Hikvision
-                        is_hik, http_port = check_hikvision_http(ip)
-                        
-                        camera_info = {
-                            "ip": ip,
-                            "rtsp_port": 554,
-                            "rtsp_open": True,
-                            "http_port": http_port,
-                            "confirmed_hikvision": is_hik,
-                            "name": f"Cámara {ip}"
-                        }
-                        
-                        found_cameras.append(camera_info)
-                        logger.info(f"Cámara encontrada en {ip}")
-                        
-                except Exception as e:
-                    logger.error(f"Error verificando {ip}: {e}")
-        
-        logger.info(f"Escaneo completado. {len(found_cameras)} cámaras encontradas")
-        
-        return {
-            "success": True,
-            "cameras": found_cameras,
-            "network_scanned": str(network),
-            "total_found": len(found_cameras)
-        }
-        
+        networks = parse_networks(websocket.query_params.get('subnets'))
+        force = websocket.query_params.get('force', 'false').lower() in ('1', 'true', 'yes')
+        await send({
+            "type": "scan_started",
+            "networks": [str(network) for network in networks]
+        })
+        result = await network_scanner.scan(networks, force=force, on_found=on_found, on_progress=on_progress)
+        await send({"type": "scan_complete", **result})
     except Exception as e:
         logger.error(f"Error en escaneo de red: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+        await send({"type": "scan_error", "error": str(e)})
+    
+    if connected:
+        try:
+            await websocket.close()
+        except Exception:
+            pass
+
 async def test_camera_connection(camera_id: str):
     """Probar conexión con una cámara"""
     if not camera_manager or camera_id not in camera_manager.configs:
@@ -1070,19 +1413,24 @@ async def test_camera_connection(camera_id: str):
 
 @app.get("/api/cameras/{camera_id}/stream")
 async def get_camera_stream(camera_id: str):
-    """Obtener frame actual de una cámara"""
+    """
+    Obtener frame actual de una cámara (JPEG en base64 dentro de JSON)
+    
+    Para polling usar /snapshot.jpg, que devuelve el JPEG binario y 304
+    si el frame no cambió.
+    """
     if not camera_manager or camera_id not in camera_manager.cameras:
         raise HTTPException(status_code=404, detail="Cámara no encontrada")
     
     camera = camera_manager.cameras[camera_id]
-    frame = camera.get_frame()
+    seq, frame = camera.latest
     
     if frame is None:
         raise HTTPException(status_code=503, detail="No hay frame disponible")
     
-    # Convertir frame a JPEG
-    _, buffer = cv2.imencode('.jpg', frame)
-    img_base64 = base64.b64encode(buffer).decode('utf-8')
+    # Convertir frame a JPEG (codificación compartida por frame)
+    jpeg = frame_encoder.encode(camera_id, seq, lambda: frame, quality=95, overlay_key='snapshot')
+    img_base64 = base64.b64encode(jpeg).decode('utf-8')
     
     return {
         "camera_id": camera_id,
@@ -1091,22 +1439,86 @@ async def get_camera_stream(camera_id: str):
         "timestamp": datetime.now().isoformat()
     }
 
+@app.get("/api/cameras/{camera_id}/snapshot.jpg")
+async def get_camera_snapshot(request: Request, camera_id: str,
+                              width: Optional[int] = None, quality: int = 95):
+    """
+    Frame actual de una cámara como image/jpeg
+    
+    El ETag identifica el frame (época del stream + secuencia): si el
+    cliente envía If-None-Match y no hay frame nuevo se responde 304 sin
+    codificar nada. width y quality generan variantes cacheadas.
+    """
+    if not camera_manager or camera_id not in camera_manager.cameras:
+        raise HTTPException(status_code=404, detail="Cámara no encontrada")
+    
+    camera = camera_manager.cameras[camera_id]
+    seq, frame = camera.latest
+    if frame is None:
+        raise HTTPException(status_code=503, detail="No hay frame disponible")
+    
+    etag = f'"{camera.stream_epoch}-{seq}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "no-cache",
+        "X-Frame-Seq": str(seq),
+        "X-Camera-FPS": str(camera.fps)
+    }
+    if request.headers.get('if-none-match') == etag:
+        return Response(status_code=304, headers=headers)
+    
+    quality = max(10, min(int(quality), 95))
+    width = max(16, int(width)) if width else None
+    jpeg = frame_encoder.encode(camera_id, seq, lambda: frame, quality=quality,
+                                overlay_key='snapshot', width=width)
+    return Response(content=jpeg, media_type="image/jpeg", headers=headers)
+
+def _parse_event_time(value: str) -> datetime:
+    """Parsear un instante ISO (acepta 'Z' / offset) como hora local naive del buffer"""
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone().replace(tzinfo=None)
+    return parsed
+
+def _get_context_frames(camera_id: str, event_time: str, before_seconds: int, after_seconds: int,
+                        target_fps: Optional[float], max_frames: Optional[int],
+                        offset: int = 0, limit: Optional[int] = None):
+    """Frames de contexto decimados y paginados (referencias, sin codificar)"""
+    if not camera_manager or camera_id not in camera_manager.cameras:
+        raise HTTPException(status_code=404, detail="Cámara no encontrada")
+    try:
+        event_dt = _parse_event_time(event_time)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    camera = camera_manager.cameras[camera_id]
+    frames = camera.get_context_video(event_dt, before_seconds, after_seconds, target_fps, max_frames)
+    total = len(frames)
+    offset = max(offset, 0)
+    end = total if limit is None else min(total, offset + max(limit, 0))
+    return frames[offset:end], total
+
 @app.get("/api/cameras/{camera_id}/context")
 async def get_camera_context(
     camera_id: str,
     event_time: str,
     before_seconds: int = 30,
-    after_seconds: int = 30
+    after_seconds: int = 30,
+    target_fps: Optional[float] = None,
+    max_frames: Optional[int] = None,
+    offset: int = 0,
+    limit: Optional[int] = None
 ):
-    """Obtener video de contexto de un evento"""
-    if not camera_manager or camera_id not in camera_manager.cameras:
-        raise HTTPException(status_code=404, detail="Cámara no encontrada")
+    """
+    Obtener video de contexto de un evento (frames en base64)
+    
+    Para ventanas grandes usar /context/index + /context/frame.jpg o
+    /context.mjpeg, que no cargan toda la ventana en memoria.
+    """
+    frames, total = _get_context_frames(camera_id, event_time, before_seconds, after_seconds,
+                                        target_fps, max_frames, offset, limit)
     
     try:
-        event_dt = datetime.fromisoformat(event_time)
-        camera = camera_manager.cameras[camera_id]
-        frames = camera.get_context_video(event_dt, before_seconds, after_seconds)
-        
         # Convertir frames a base64 para enviar
         context_data = []
         for frame, timestamp in frames:
@@ -1120,12 +1532,127 @@ async def get_camera_context(
             "camera_id": camera_id,
             "event_time": event_time,
             "frames": context_data,
-            "total_frames": len(context_data)
+            "total_frames": total,
+            "offset": offset
         }
         
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+@app.get("/api/cameras/{camera_id}/context/index")
+async def get_camera_context_index(
+    camera_id: str,
+    event_time: str,
+    before_seconds: int = 30,
+    after_seconds: int = 30,
+    target_fps: Optional[float] = 10,
+    max_frames: Optional[int] = None,
+    offset: int = 0,
+    limit: Optional[int] = 200
+):
+    """
+    Índice paginado de frames de contexto (solo timestamps y URLs)
+    
+    Cada frame se descarga con /context/frame.jpg?timestamp=..., de modo que
+    el cliente puede mostrar el primero en cuanto llega.
+    """
+    frames, total = _get_context_frames(camera_id, event_time, before_seconds, after_seconds,
+                                        target_fps, max_frames, offset, limit)
+    return {
+        "camera_id": camera_id,
+        "event_time": event_time,
+        "frames": [
+            {
+                "index": offset + i,
+                "timestamp": timestamp.isoformat(),
+                "url": f"/api/cameras/{camera_id}/context/frame.jpg?timestamp={quote(timestamp.isoformat())}"
+            }
+            for i, (_, timestamp) in enumerate(frames)
+        ],
+        "total_frames": total,
+        "offset": offset,
+        "next_offset": offset + len(frames) if offset + len(frames) < total else None
+    }
+
+@app.get("/api/cameras/{camera_id}/context/frame.jpg")
+async def get_camera_context_frame(camera_id: str, timestamp: str, quality: int = 70):
+    """Frame del buffer de contexto más cercano a un instante"""
+    if not camera_manager or camera_id not in camera_manager.cameras:
+        raise HTTPException(status_code=404, detail="Cámara no encontrada")
+    try:
+        target = _parse_event_time(timestamp)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    found = camera_manager.cameras[camera_id].get_context_frame(target)
+    if found is None:
+        raise HTTPException(status_code=404, detail="Frame no disponible en el buffer")
+    frame, frame_time = found
+    
+    quality = max(10, min(int(quality), 95))
+    _, buffer = await asyncio.get_event_loop().run_in_executor(
+        None, lambda: cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    )
+    return Response(
+        content=buffer.tobytes(),
+        media_type="image/jpeg",
+        headers={
+            "X-Frame-Timestamp": frame_time.isoformat(),
+            # El frame de un instante no cambia mientras esté en el buffer
+            "Cache-Control": "private, max-age=300"
+        }
+    )
+
+@app.get("/api/cameras/{camera_id}/context.mjpeg")
+async def get_camera_context_mjpeg(
+    camera_id: str,
+    request: Request,
+    event_time: str,
+    before_seconds: int = 30,
+    after_seconds: int = 30,
+    target_fps: Optional[float] = 10,
+    max_frames: Optional[int] = None,
+    offset: int = 0,
+    limit: Optional[int] = None,
+    realtime: bool = False,
+    quality: int = 70
+):
+    """
+    Clip de contexto como stream MJPEG
+    
+    Los frames se codifican uno a uno fuera del event loop y se envían en
+    cuanto están listos (memoria constante). realtime=true respeta los
+    tiempos originales entre frames; offset/limit seleccionan un rango.
+    """
+    frames, total = _get_context_frames(camera_id, event_time, before_seconds, after_seconds,
+                                        target_fps, max_frames, offset, limit)
+    quality = max(10, min(int(quality), 95))
+    
+    async def generate():
+        loop = asyncio.get_event_loop()
+        previous = None
+        for frame, timestamp in frames:
+            if await request.is_disconnected():
+                break
+            if realtime and previous is not None:
+                await asyncio.sleep(max(0.0, (timestamp - previous).total_seconds()))
+            previous = timestamp
+            
+            _, buffer = await loop.run_in_executor(
+                None, lambda f=frame: cv2.imencode('.jpg', f, [cv2.IMWRITE_JPEG_QUALITY, quality])
+            )
+            yield (b'--frame\r\n'
+                   b'Content-Type: image/jpeg\r\n'
+                   b'X-Frame-Timestamp: ' + timestamp.isoformat().encode() + b'\r\n\r\n' +
+                   buffer.tobytes() +
+                   b'\r\n')
+    
+    return StreamingResponse(
+        generate(),
+        media_type="multipart/x-mixed-replace; boundary=frame",
+        headers={"X-Total-Frames": str(total)}
+    )
+
 @app.post("/api/cameras/{camera_id}/record")
 async def start_recording(camera_id: str):
     """Iniciar grabación de una cámara"""
@@ -1155,28 +1682,53 @@ async def stop_recording(camera_id: str):
     return {"success": True}
 
 @app.get("/api/cameras/{camera_id}/stream.mjpeg")
-async def get_camera_mjpeg_stream(camera_id: str):
-    """Stream MJPEG de una cámara (fallback para WebSocket)"""
+async def get_camera_mjpeg_stream(camera_id: str, request: Request,
+                                  max_fps: Optional[float] = None, quality: int = 70):
+    """
+    Stream MJPEG de una cámara (fallback para WebSocket)
+    
+    Se despierta con cada frame nuevo de la cámara y reutiliza un único JPEG
+    por frame entre todos los clientes MJPEG. max_fps limita el ritmo de
+    este cliente; la conexión se libera al desconectarse.
+    """
     if not camera_manager or camera_id not in camera_manager.cameras:
         raise HTTPException(status_code=404, detail="Cámara no encontrada")
     
     camera = camera_manager.cameras[camera_id]
+    quality = max(10, min(int(quality), 95))
+    min_interval = 1.0 / max_fps if max_fps and max_fps > 0 else 0.0
     
     async def generate():
         """Generador de frames MJPEG"""
-        while True:
-            frame = camera.get_frame()
-            if frame is not None:
-                # Codificar frame como JPEG
-                _, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 70])
+        loop = asyncio.get_event_loop()
+        last_seq = 0
+        last_sent = 0.0
+        try:
+            while not await request.is_disconnected():
+                # Límite de FPS del cliente: saltar frames intermedios
+                wait = min_interval - (loop.time() - last_sent)
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                
+                seq, frame = await camera.wait_for_frame(last_seq, timeout=1.0, copy=False)
+                if frame is None:
+                    if not camera.is_running:
+                        await asyncio.sleep(0.5)
+                    continue
+                last_seq = seq
+                
+                # JPEG compartido: una codificación por frame para todos los clientes
+                jpeg = frame_encoder.encode(camera_id, seq, lambda: frame, quality=quality,
+                                            overlay_key='mjpeg')
                 
                 # Formato MJPEG
                 yield (b'--frame\r\n'
                        b'Content-Type: image/jpeg\r\n\r\n' + 
-                       buffer.tobytes() + 
+                       jpeg + 
                        b'\r\n')
-            
-            await asyncio.sleep(0.033)  # ~30 FPS
+                last_sent = loop.time()
+        finally:
+            logger.debug(f"Cliente MJPEG desconectado de {camera_id}")
     
     return StreamingResponse(
         generate(),
@@ -1185,14 +1737,30 @@ async def get_camera_mjpeg_stream(camera_id: str):
 
 # ==================== WEBSOCKET ====================
 
+@app.get("/api/streams/metrics")
+async def get_stream_metrics():
+    """Caché de codificación compartida y adaptación por cliente de los streams"""
+    return {
+        'encoder': frame_encoder.get_metrics(),
+        'viewers': {
+            camera_id: [viewer.get_metrics() for viewer in viewers.values()]
+            for camera_id, viewers in stream_viewers.items()
+        }
+    }
+
+@app.get("/api/websocket/metrics")
+async def get_websocket_metrics():
+    """Colas y lag por cliente WebSocket"""
+    return manager.get_metrics()
+
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
     """Endpoint WebSocket para comunicación en tiempo real"""
     await manager.connect(websocket)
     
     try:
-        # Enviar estado inicial
-        await websocket.send_json({
+        # Enviar estado inicial (todo pasa por la cola del cliente para mantener el orden)
+        manager.send(websocket, {
             'type': 'connection',
             'data': {
                 'status': 'connected',
@@ -1200,14 +1768,22 @@ async def websocket_endpoint(websocket: WebSocket):
             }
         })
         
+        # Estado inicial de temporizadores (después solo llegan deltas)
+        if alert_manager or process_role == ROLE_API:
+            manager.send(websocket, await _timer_snapshot_message())
+        
         while True:
             # Recibir mensajes del cliente
             data = await websocket.receive_text()
             message = json.loads(data)
             
             # Procesar comandos
-            if message.get('type') == 'ping':
-                await websocket.send_json({
+            if message.get('type') == 'timer_resync' and (alert_manager or process_role == ROLE_API):
+                # El cliente detectó un hueco de versión
+                manager.send(websocket, await _timer_snapshot_message())
+            
+            elif message.get('type') == 'ping':
+                manager.send(websocket, {
                     'type': 'pong',
                     'data': {'timestamp': datetime.now().isoformat()}
                 })
@@ -1215,7 +1791,7 @@ async def websocket_endpoint(websocket: WebSocket):
             elif message.get('type') == 'start_monitoring':
                 global monitoring_active
                 monitoring_active = True
-                await websocket.send_json({
+                manager.send(websocket, {
                     'type': 'monitoring_started',
                     'data': {'status': 'active'}
                 })
@@ -1226,11 +1802,100 @@ async def websocket_endpoint(websocket: WebSocket):
         logger.error(f"Error en WebSocket: {e}")
         manager.disconnect(websocket)
 
+# Controladores de adaptación activos: camera_id → {id(websocket): controller}
+stream_viewers: Dict[str, Dict[int, ViewerRateController]] = {}
+
+def _create_viewer_controller() -> ViewerRateController:
+    """Controlador de tier / frame rate para un nuevo cliente del stream"""
+    return ViewerRateController(
+        min_fps=STREAM_CONFIG.get('min_fps', 2),
+        high_ratio=STREAM_CONFIG.get('latency_high_ratio', 0.8),
+        low_ratio=STREAM_CONFIG.get('latency_low_ratio', 0.3),
+        cooldown_seconds=STREAM_CONFIG.get('adjust_cooldown', 2.0),
+        tiers=tuple(STREAM_CONFIG.get('tiers', ('full', 'half', 'quarter'))),
+        adaptive=STREAM_CONFIG.get('adaptive', True)
+    )
+
+def _detections_key(detections: List[Dict]) -> tuple:
+    """Firma de las detecciones dibujadas (parte de la clave del JPEG compartido)"""
+    return tuple(
+        (d['class_name'], round(d['confidence'], 2),
+         d['bbox']['x1'], d['bbox']['y1'], d['bbox']['x2'], d['bbox']['y2'])
+        for d in detections
+    )
+
+def _draw_detections(frame: np.ndarray, detections: List[Dict]) -> np.ndarray:
+    """Dibujar bounding boxes y etiquetas de las detecciones sobre el frame"""
+    for det in detections:
+        bbox = det['bbox']
+        color = (0, 255, 0) if det['class_name'] == 'gate_closed' else (0, 0, 255)
+        
+        # Dibujar bounding box
+        cv2.rectangle(frame, 
+                    (bbox['x1'], bbox['y1']), 
+                    (bbox['x2'], bbox['y2']), 
+                    color, 2)
+        
+        # Dibujar etiqueta
+        label = f"{det['class_name']} {det['confidence']:.2f}"
+        label_size, _ = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 2)
+        
+        # Fondo para el texto
+        cv2.rectangle(frame,
+                    (bbox['x1'], bbox['y1'] - label_size[1] - 4),
+                    (bbox['x1'] + label_size[0], bbox['y1']),
+                    color, -1)
+        
+        # Texto
+        cv2.putText(frame, label,
+                  (bbox['x1'], bbox['y1'] - 2),
+                  cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 2)
+    return frame
+
+def _encode_stream_message_v1(jpeg: bytes, detections: List[Dict]) -> bytes:
+    """
+    Mensaje del protocolo v1: metadata + frame en un solo mensaje binario
+    
+    Formato: [metadata_length(4 bytes)][metadata_json][frame_jpeg]
+    """
+    metadata = {
+        "type": "frame",
+        "timestamp": datetime.now().isoformat(),
+        "detections": detections,
+        "frame_size": len(jpeg),
+        "zones": detection_manager.get_zone_states() if detection_manager else {},
+        "eco_mode": eco_manager.get_status() if eco_manager else None
+    }
+    metadata_json = json.dumps(metadata).encode('utf-8')
+    metadata_length = len(metadata_json).to_bytes(4, byteorder='big')
+    return metadata_length + metadata_json + jpeg
+
+def _eco_state_key():
+    """Firma del estado del Modo Eco (sin campos que cambian en cada frame)"""
+    if not eco_manager:
+        return None
+    return (
+        eco_manager.current_state,
+        eco_manager.schedule_floor,
+        eco_manager.aggressive_idle,
+        eco_manager.schedule_reason
+    )
+
 @app.websocket("/ws/camera/{camera_id}")
 async def camera_stream_websocket(websocket: WebSocket, camera_id: str):
-    """WebSocket endpoint para streaming de cámara con detecciones YOLO y Modo Eco"""
+    """
+    WebSocket endpoint para streaming de cámara con detecciones YOLO y Modo Eco
+    
+    ?protocol=2 activa el protocolo binario compacto (ver stream_protocol);
+    sin parámetro se mantiene el formato v1 (longitud + JSON + JPEG)
+    """
     await websocket.accept()
     
+    # Protocolo v2 opcional: cabecera fija y estado solo cuando cambia
+    encoder = None
+    if websocket.query_params.get('protocol') == str(PROTOCOL_VERSION):
+        encoder = StreamEncoderV2()
+    
     if not camera_manager or camera_id not in camera_manager.cameras:
         await websocket.send_json({
             "error": "Cámara no encontrada"
@@ -1245,12 +1910,25 @@ async def camera_stream_websocket(websocket: WebSocket, camera_id: str):
     enable_detection = True
     last_detection_time = 0
     
+    # Tier y frame rate propios de este cliente según su latencia de envío
+    viewer = _create_viewer_controller()
+    stream_viewers.setdefault(camera_id, {})[id(websocket)] = viewer
+    last_frame_seq = 0
+    loop = asyncio.get_event_loop()
+    
     try:
         while True:
-            # Obtener frame de la cámara
-            frame = camera.get_frame()
+            loop_start = loop.time()
+            
+            # Esperar un frame nuevo de la cámara (no se reenvía el mismo frame)
+            frame_seq, frame = await camera.wait_for_frame(last_frame_seq, timeout=1.0)
             
             if frame is not None:
+                # Frames de la cámara que este cliente no alcanzó a recibir
+                if last_frame_seq:
+                    viewer.record_skipped(frame_seq - last_frame_seq - 1)
+                last_frame_seq = frame_seq
+                
                 # Procesar frame con Modo Eco
                 eco_config = None
                 if eco_manager:
@@ -1295,12 +1973,9 @@ async def camera_stream_websocket(websocket: WebSocket, camera_id: str):
                         results = model.predict(frame, conf=confidence_threshold, iou=0.5, verbose=False)
                         
                         # Procesar detecciones
+                        zone_id = camera.config.zone_id or f"cam_{camera_id}"
                         if len(results) > 0 and results[0].boxes is not None:
                             for i, box in enumerate(results[0].boxes):
-                                # Asignar door_id basado en la zona de la cámara
-                                zone_id = camera.config.zone_id or f"cam_{camera_id}"
-                                door_id = f"{zone_id}_door_{i}"
-                                
                                 detection = {
                                     'class_name': model.names[int(box.cls)],
                                     'confidence': float(box.conf),
@@ -1310,10 +1985,16 @@ async def camera_stream_websocket(websocket: WebSocket, camera_id: str):
                                         'x2': int(box.xyxy[0][2]),
                                         'y2': int(box.xyxy[0][3])
                                     },
-                                    'door_id': door_id
+                                    'door_id': f"{zone_id}_door_{i}"
                                 }
                                 detections.append(detection)
                         
+                        # Asignar door_id estable por puerta física (no por orden de YOLO)
+                        if door_tracker:
+                            detections = door_tracker.update(camera_id, zone_id, detections, frame.shape)
+                        for detection in detections:
+                            zone_registry.register_door(camera_id, zone_id, detection['door_id'])
+                        
                         # Procesar con DetectionManager para deduplicar
                         if detection_manager and alert_manager:
                             actions = detection_manager.process_frame_detections(detections, camera_id)
@@ -1331,15 +2012,15 @@ async def camera_stream_websocket(websocket: WebSocket, camera_id: str):
                                     # Registrar evento en base de datos
                                     try:
                                         from backend.utils.event_logger import event_logger, EventTypes
-                                        zone_name = alert_manager.config['zones'].get(action['zone_id'], {}).get('name', action['zone_id'])
+                                        zone_name = zone_registry.get_zone_name(action['zone_id'])
                                         
                                         # Capturar thumbnail del frame actual
-                                        thumbnail_base64 = None
+                                        thumbnail = None
                                         image_path = None
                                         
                                         if frame is not None:
                                             # Crear thumbnail para vista rápida
-                                            thumbnail_base64 = image_handler.capture_frame_thumbnail(frame)
+                                            thumbnail = image_handler.capture_frame_thumbnail_jpeg(frame)
                                             
                                             # Dibujar overlay con información del evento
                                             event_info = {
@@ -1359,7 +2040,7 @@ async def camera_stream_websocket(websocket: WebSocket, camera_id: str):
                                                 'camera_id': camera_id,
                                                 'confidence': action['detection']['confidence']
                                             },
-                                            thumbnail_base64=thumbnail_base64,
+                                            thumbnail=thumbnail,
                                             image_path=image_path
                                         )
                                     except Exception as e:
@@ -1378,42 +2059,21 @@ async def camera_stream_websocket(websocket: WebSocket, camera_id: str):
                                 elif action['action'] == 'cancel_alert':
                                     # Cancelar alerta existente
                                     zone_id = action['zone_id']
-                                    # Buscar TODOS los timers activos
-                                    active_timers = alert_manager.get_active_timers()
-                                    timers_to_cancel = []
+                                    had_timers = bool(alert_manager.door_timers)
                                     
-                                    # Buscar timers que coincidan con la zona/cámara
-                                    for timer in active_timers:
-                                        timer_door_id = timer.get('door_id', '')
-                                        timer_camera_id = timer.get('camera_id', '')
-                                        
-                                        # Cancelar si:
-                                        # 1. El door_id coincide exactamente
-                                        # 2. Es de la misma cámara
-                                        # 3. El door_id contiene el zone_id
-                                        if (timer_door_id == zone_id or 
-                                            timer_camera_id == camera_id or
-                                            zone_id in timer_door_id or
-                                            timer_door_id in zone_id):
-                                            timers_to_cancel.append(timer_door_id)
+                                    # Timers de esta cámara y de la puerta exacta (índices, sin substrings)
+                                    timers_to_cancel = zone_registry.timers_for_camera(camera_id)
+                                    if zone_id in alert_manager.door_timers:
+                                        timers_to_cancel.add(zone_id)
                                     
-                                    # Cancelar todos los timers encontrados
                                     for door_id in timers_to_cancel:
-                                        alert_manager.acknowledge_alarm(door_id)
+                                        await alert_manager.acknowledge_alarm(door_id)
                                         logger.info(f"Alerta cancelada para {door_id}")
                                     
-                                    # Si no se encontraron timers específicos, limpiar todos de esta cámara
-                                    if not timers_to_cancel:
-                                        logger.warning(f"No se encontraron timers para {zone_id}, limpiando todos de cámara {camera_id}")
-                                        for timer in active_timers:
-                                            if timer.get('camera_id') == camera_id:
-                                                alert_manager.acknowledge_alarm(timer['door_id'])
-                                                logger.info(f"Alerta cancelada para {timer['door_id']} (limpieza por cámara)")
-                                    
                                     # Enviar notificación a Telegram de puerta cerrada (sin imagen)
-                                    if telegram_service.enabled and (timers_to_cancel or not active_timers):
+                                    if telegram_service.enabled and (timers_to_cancel or not had_timers):
                                         try:
-                                            zone_name = alert_manager.config['zones'].get(zone_id, {}).get('name', zone_id)
+                                            zone_name = zone_registry.get_zone_name(zone_id)
                                             await telegram_service.send_alert(
                                                 zone_id=zone_id,
                                                 zone_name=zone_name,
@@ -1427,12 +2087,12 @@ async def camera_stream_websocket(websocket: WebSocket, camera_id: str):
                                     # Registrar evento de puerta cerrada
                                     try:
                                         from backend.utils.event_logger import event_logger, EventTypes
-                                        zone_name = alert_manager.config['zones'].get(zone_id, {}).get('name', zone_id)
+                                        zone_name = zone_registry.get_zone_name(zone_id)
                                         
                                         # Capturar thumbnail del frame actual
-                                        thumbnail_base64 = None
+                                        thumbnail = None
                                         if frame is not None:
-                                            thumbnail_base64 = image_handler.capture_frame_thumbnail(frame)
+                                            thumbnail = image_handler.capture_frame_thumbnail_jpeg(frame)
                                         
                                         event_logger.log_event(
                                             event_type=EventTypes.DOOR_CLOSE,
@@ -1444,7 +2104,7 @@ async def camera_stream_websocket(websocket: WebSocket, camera_id: str):
                                                 'camera_id': camera_id,
                                                 'alarms_cancelled': len(timers_to_cancel)
                                             },
-                                            thumbnail_base64=thumbnail_base64
+                                            thumbnail=thumbnail
                                         )
                                     except Exception as e:
                                         logger.error(f"Error registrando evento de cierre: {e}")
@@ -1459,111 +2119,246 @@ async def camera_stream_websocket(websocket: WebSocket, camera_id: str):
                     except Exception as e:
                         logger.error(f"Error en detección YOLO: {e}")
                 
-                # Dibujar detecciones en el frame
-                if detections:
-                    for det in detections:
-                        bbox = det['bbox']
-                        color = (0, 255, 0) if det['class_name'] == 'gate_closed' else (0, 0, 255)
-                        
-                        # Dibujar bounding box
-                        cv2.rectangle(frame, 
-                                    (bbox['x1'], bbox['y1']), 
-                                    (bbox['x2'], bbox['y2']), 
-                                    color, 2)
-                        
-                        # Dibujar etiqueta
-                        label = f"{det['class_name']} {det['confidence']:.2f}"
-                        label_size, _ = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 2)
-                        
-                        # Fondo para el texto
-                        cv2.rectangle(frame,
-                                    (bbox['x1'], bbox['y1'] - label_size[1] - 4),
-                                    (bbox['x1'] + label_size[0], bbox['y1']),
-                                    color, -1)
-                        
-                        # Texto
-                        cv2.putText(frame, label,
-                                  (bbox['x1'], bbox['y1'] - 2),
-                                  cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 2)
-                
-                # Comprimir frame a JPEG con calidad según Modo Eco
-                encode_param = [cv2.IMWRITE_JPEG_QUALITY, int(jpeg_quality)]
-                _, buffer = cv2.imencode('.jpg', frame, encode_param)
-                
-                # Crear mensaje con metadata
-                metadata = {
-                    "type": "frame",
-                    "timestamp": datetime.now().isoformat(),
-                    "detections": detections,
-                    "frame_size": len(buffer),
-                    "zones": detection_manager.get_zone_states() if detection_manager else {},
-                    "eco_mode": eco_manager.get_status() if eco_manager else None
-                }
-                
-                # Protocolo: enviar metadata + frame en un solo mensaje binario
-                # Formato: [metadata_length(4 bytes)][metadata_json][frame_jpeg]
-                metadata_json = json.dumps(metadata).encode('utf-8')
-                metadata_length = len(metadata_json).to_bytes(4, byteorder='big')
+                # JPEG compartido entre clientes del mismo frame, tier y overlay
+                frame_interval = viewer.frame_interval(frame_delay)
+                overlay_key = (frame.shape[:2], _detections_key(detections))
+                jpeg = frame_encoder.encode(
+                    camera_id, frame_seq,
+                    lambda: _draw_detections(frame, detections),
+                    tier=viewer.tier, quality=jpeg_quality, overlay_key=overlay_key
+                )
                 
-                # Combinar todo en un solo mensaje
-                full_message = metadata_length + metadata_json + buffer.tobytes()
+                if encoder is not None:
+                    full_message = encoder.encode(
+                        jpeg, detections,
+                        zones_key=detection_manager.state_version if detection_manager else None,
+                        get_zones=detection_manager.get_zone_states if detection_manager else None,
+                        eco_key=_eco_state_key(),
+                        get_eco=eco_manager.get_status if eco_manager else None
+                    )
+                else:
+                    full_message = _encode_stream_message_v1(jpeg, detections)
                 
-                # Enviar mensaje completo
+                # Enviar midiendo la latencia (incluye la espera por backpressure)
+                send_start = loop.time()
                 await websocket.send_bytes(full_message)
+                viewer.record_send(loop.time() - send_start, len(full_message), frame_interval)
                 
-                # Control de FPS según Modo Eco
-                await asyncio.sleep(frame_delay)
-            else:
-                # Si no hay frame, esperar un poco
-                await asyncio.sleep(0.1)
+                # Control de FPS: Modo Eco + adaptación del cliente; si el envío
+                # tardó más que el intervalo se sigue con el frame más reciente
+                await asyncio.sleep(max(0.0, frame_interval - (loop.time() - loop_start)))
+            elif not camera.is_running:
+                # Cámara detenida: esperar antes de volver a consultar
+                await asyncio.sleep(0.5)
                 
     except WebSocketDisconnect:
-        logger.info(f"Cliente desconectado del stream de {camera_id}")
+        if encoder is not None:
+            logger.info(f"Cliente desconectado del stream de {camera_id} "
+                        f"(protocolo v2, {encoder.get_metrics()['avg_overhead_bytes']} B/frame de metadata)")
+        else:
+            logger.info(f"Cliente desconectado del stream de {camera_id}")
     except Exception as e:
         logger.error(f"Error en stream de {camera_id}: {e}")
         try:
             await websocket.close()
         except:
             pass
+    finally:
+        viewers = stream_viewers.get(camera_id, {})
+        viewers.pop(id(websocket), None)
+        if not viewers:
+            stream_viewers.pop(camera_id, None)
 
 # ==================== TAREAS ASÍNCRONAS ====================
 
+# Intervalo del tick compacto de temporizadores (segundos)
+TIMER_TICK_SECONDS = 5.0
+
+def _add_timer_camera_info(timer: Dict):
+    """Agregar información de la cámara asociada a un timer"""
+    if not camera_manager or not timer.get('door_id'):
+        return
+    camera = camera_manager.get_camera_by_zone(timer['door_id'])
+    if camera:
+        timer['has_camera'] = True
+        timer['camera_id'] = camera.config.id
+        timer['camera_name'] = camera.config.name
+        timer['camera_connected'] = camera.current_frame is not None
+    else:
+        timer['has_camera'] = False
+
+async def _timer_snapshot_message() -> Dict:
+    """Mensaje con el estado completo versionado de los temporizadores"""
+    if alert_manager:
+        snapshot = alert_manager.get_timer_snapshot()
+    else:
+        loop = asyncio.get_running_loop()
+        snapshot = {
+            'version': await loop.run_in_executor(None, state_store.get_timer_version),
+            'timers': await loop.run_in_executor(None, state_store.get_timers),
+            'server_time': datetime.now().timestamp()
+        }
+        snapshot['alarm_active'] = any(t.get('alarm_triggered') for t in snapshot['timers'])
+    for timer in snapshot['timers']:
+        _add_timer_camera_info(timer)
+    return {'type': 'timer_snapshot', 'data': snapshot}
+
+async def _timer_tick() -> Dict:
+    """Tick compacto de temporizadores (del AlertManager local o del almacén)"""
+    if alert_manager:
+        return alert_manager.get_timer_tick()
+    loop = asyncio.get_running_loop()
+    timers = await loop.run_in_executor(None, state_store.get_timers)
+    return {
+        'version': await loop.run_in_executor(None, state_store.get_timer_version),
+        'server_time': datetime.now().timestamp(),
+        'alarm_active': any(t.get('alarm_triggered') for t in timers),
+        'telegram': {}
+    }
+
+async def _get_timers_from_store() -> Dict:
+    """Lista de timers (formato de /api/timers) leída del almacén compartido"""
+    loop = asyncio.get_running_loop()
+    timers = await loop.run_in_executor(None, state_store.get_timers)
+    now = datetime.now().timestamp()
+    for timer in timers:
+        elapsed = now - timer['first_detected_ts']
+        timer['time_elapsed'] = elapsed
+        timer['time_remaining'] = max(0, timer['delay_seconds'] - elapsed)
+        timer['progress_percent'] = min(100, (elapsed / timer['delay_seconds']) * 100) if timer['delay_seconds'] else 100
+    return {
+        "timers": timers,
+        "alarm_active": any(t.get('alarm_triggered') for t in timers),
+        "version": await loop.run_in_executor(None, state_store.get_timer_version)
+    }
+
+async def _publish_command(command: Dict):
+    """Enviar un comando al worker de inferencia por el almacén compartido"""
+    await asyncio.get_running_loop().run_in_executor(None, state_store.publish, CHANNEL_COMMANDS, command)
+
+async def state_command_listener():
+    """Ejecuta los comandos publicados por los workers de API"""
+    commands = state_store.subscribe(CHANNEL_COMMANDS)
+    while True:
+        try:
+            command = await commands.get()
+            if command.get('command') == 'acknowledge':
+                await alert_manager.acknowledge_alarm(command['door_id'])
+            elif command.get('command') == 'stop_all':
+                await alert_manager.stop_all_alarms()
+                if detection_manager:
+                    detection_manager.reset_all()
+            logger.info(f"Comando remoto ejecutado: {command.get('command')}")
+        except Exception as e:
+            logger.error(f"Error en state_command_listener: {e}")
+
 async def timer_monitor():
-    """Monitor de temporizadores que envía actualizaciones por WebSocket"""
+    """
+    Monitor de temporizadores que envía cambios por WebSocket
+    
+    Solo se envían deltas versionados (created/cancelled/phase/triggered/cleared)
+    y un tick compacto periódico; los clientes calculan la cuenta atrás
+    localmente a partir de first_detected_ts y delay_seconds.
+    """
+    if alert_manager:
+        changes = alert_manager.subscribe_timer_changes()
+    elif process_role == ROLE_API:
+        # Worker de API: los cambios llegan desde el worker de inferencia
+        changes = state_store.subscribe(CHANNEL_TIMERS)
+    else:
+        changes = None
+    loop = asyncio.get_running_loop()
+    last_tick = 0.0
+    
     while True:
         try:
-            if alert_manager and len(manager.active_connections) > 0:
-                timers = alert_manager.get_active_timers()
-                
-                # Agregar información de cámaras a los timers
-                for timer in timers:
-                    if camera_manager and timer.get('door_id'):
-                        # Buscar cámara asociada a la zona
-                        camera = camera_manager.get_camera_by_zone(timer['door_id'])
-                        if camera:
-                            timer['has_camera'] = True
-                            timer['camera_id'] = camera.config.id
-                            timer['camera_name'] = camera.config.name
-                            timer['camera_connected'] = camera.current_frame is not None
-                        else:
-                            timer['has_camera'] = False
-                
-                # Broadcast estado de temporizadores
-                await manager.broadcast({
-                    'type': 'timer_update',
-                    'data': {
-                        'timers': timers,
-                        'alarm_active': getattr(alert_manager, 'alarm_active', False),
-                        'timestamp': datetime.now().isoformat()
-                    }
-                })
+            if changes is None:
+                await asyncio.sleep(1)
+                continue
+            
+            timeout = max(0.0, last_tick + TIMER_TICK_SECONDS - loop.time())
+            try:
+                change = await asyncio.wait_for(changes.get(), timeout)
+            except asyncio.TimeoutError:
+                change = None
+            
+            if not manager.active_connections:
+                continue
             
-            await asyncio.sleep(0.5)  # Actualizar cada 500ms
+            if change:
+                if change['timer']:
+                    _add_timer_camera_info(change['timer'])
+                await manager.broadcast({'type': 'timer_delta', 'data': change})
+            
+            # Tick solo sin cambios pendientes, para que su versión coincida con la del cliente
+            if changes.empty() and loop.time() - last_tick >= TIMER_TICK_SECONDS:
+                last_tick = loop.time()
+                await manager.broadcast({'type': 'timer_tick', 'data': await _timer_tick()})
             
         except Exception as e:
             logger.error(f"Error en timer_monitor: {e}")
             await asyncio.sleep(1)
 
+def _load_eco_schedule_sources(history_days: int):
+    """Cargar ventanas de vehículos e histórico por hora (bloqueante, usar en executor)"""
+    vehicle_config = {}
+    try:
+        try:
+            from backend.api.vehicle_config_routes import load_config as load_vehicle_config
+        except ImportError:
+            from api.vehicle_config_routes import load_config as load_vehicle_config
+        vehicle_config = load_vehicle_config()
+    except Exception as e:
+        logger.warning(f"No se pudo cargar configuración de vehículos: {e}")
+    
+    hourly_stats = {}
+    try:
+        from backend.utils.event_logger import event_logger
+        hourly_stats = event_logger.get_hourly_stats(days=history_days)
+    except Exception as e:
+        logger.warning(f"No se pudo cargar histórico por hora: {e}")
+    
+    return vehicle_config, hourly_stats
+
+async def eco_schedule_monitor():
+    """Aplica el plan predictivo del Modo Eco (pre-calentamiento y horas muertas)"""
+    while True:
+        try:
+            if eco_scheduler:
+                if eco_scheduler.needs_refresh():
+                    vehicle_config, hourly_stats = await asyncio.get_event_loop().run_in_executor(
+                        None, _load_eco_schedule_sources, eco_scheduler.config['history_days']
+                    )
+                    eco_scheduler.refresh(vehicle_config, hourly_stats)
+                
+                eco_scheduler.evaluate()
+            
+            await asyncio.sleep(30)  # Evaluar cada 30s
+            
+        except Exception as e:
+            logger.error(f"Error en eco_schedule_monitor: {e}")
+            await asyncio.sleep(60)
+
+async def event_stats_monitor():
+    """Re-siembra las estadísticas de eventos en workers de API (en executor)"""
+    while True:
+        try:
+            await asyncio.sleep(RESEED_SECONDS)
+            await asyncio.get_event_loop().run_in_executor(None, event_stats.seed)
+        except Exception as e:
+            logger.error(f"Error en event_stats_monitor: {e}")
+
+async def retention_monitor():
+    """Ejecuta la retención de eventos periódicamente (en executor)"""
+    await asyncio.sleep(300)  # No competir con el arranque
+    while True:
+        try:
+            await asyncio.get_event_loop().run_in_executor(None, retention_engine.run_once)
+            await asyncio.sleep(retention_engine.interval_hours * 3600)
+        except Exception as e:
+            logger.error(f"Error en retention_monitor: {e}")
+            await asyncio.sleep(3600)
+
 # ==================== ARRANQUE ====================
 
 if __name__ == "__main__":
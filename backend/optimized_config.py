@@ -28,3 +28,45 @@ CAMERA_CONFIG = {
     "capture_fps": 15,  # Capturar a 15 FPS
     "buffer_frames": False,  # No almacenar frames extras
 }
+
+# Configuración de WebSocket del dashboard
+WEBSOCKET_CONFIG = {
+    "max_queue": 100,  # Mensajes pendientes máximos por cliente
+    "overflow_policy": "coalesce",  # drop_oldest, coalesce o disconnect
+    "send_timeout": 10.0,  # Segundos antes de considerar un socket muerto
+}
+
+# Configuración del stream de cámaras (adaptación por cliente)
+STREAM_CONFIG = {
+    "adaptive": True,  # Ajustar tier y FPS según la latencia de cada cliente
+    "tiers": ["full", "half", "quarter"],  # Tiers de resolución compartidos
+    "min_fps": 2,  # FPS mínimo para clientes lentos
+    "latency_high_ratio": 0.8,  # Latencia / intervalo por encima de la cual se degrada
+    "latency_low_ratio": 0.3,  # Latencia / intervalo por debajo de la cual se recupera
+    "adjust_cooldown": 2.0,  # Segundos mínimos entre ajustes
+}
+
+# Configuración de retención de eventos
+RETENTION_CONFIG = {
+    "enabled": True,
+    "interval_hours": 6,  # Horas entre pasadas de retención
+    "days_by_severity": {  # Días que se conserva cada severidad
+        "critical": 365,
+        "error": 180,
+        "warning": 90,
+        "info": 30,
+        "success": 30,
+    },
+    "default_days": 30,  # Severidades no listadas
+    "batch_size": 500,  # Eventos borrados por transacción
+    "batch_pause": 0.05,  # Segundos entre lotes (deja pasar al escritor)
+    "archive": True,  # Guardar lo borrado en archivos mensuales .jsonl.gz
+    "archive_keep_months": 24,  # Meses de archivos conservados (0 = todos)
+}
+
+# Configuración de escritura de eventos (group commit)
+EVENT_WRITER_CONFIG = {
+    "async_writes": True,  # Encolar eventos y escribirlos por lotes en un hilo
+    "flush_interval": 0.05,  # Segundos máximos que un evento espera en la cola
+    "batch_size": 256,  # Eventos máximos por transacción
+}
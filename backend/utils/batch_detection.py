@@ -0,0 +1,99 @@
+"""
+Utilidades de Detección por Lotes
+Decodificación a escala reducida, extracción de imágenes de un ZIP y
+formato compacto de detecciones para backtesting masivo (p. ej. archivo
+de fotos de Telegram)
+"""
+
+import io
+import logging
+import zipfile
+from typing import Iterator, List, Optional, Tuple
+
+import cv2
+import numpy as np
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# Extensiones de imagen aceptadas dentro de un ZIP
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
+
+# Modos de decodificación reducida de OpenCV por factor
+_REDUCED_MODES = (
+    (8, cv2.IMREAD_REDUCED_COLOR_8),
+    (4, cv2.IMREAD_REDUCED_COLOR_4),
+    (2, cv2.IMREAD_REDUCED_COLOR_2),
+)
+
+
+def _image_size(contents: bytes) -> Optional[Tuple[int, int]]:
+    """Dimensiones (ancho, alto) leyendo solo la cabecera"""
+    try:
+        with Image.open(io.BytesIO(contents)) as image:
+            return image.size
+    except Exception:
+        return None
+
+
+def decode_image(contents: bytes, target_size: int = 640) -> Tuple[Optional[np.ndarray], int]:
+    """
+    Decodificar una imagen, a escala reducida si es mucho mayor que la
+    entrada del modelo
+
+    Se elige el mayor factor (2, 4 u 8) que mantiene el lado mayor por
+    encima de target_size, de modo que YOLO no pierde resolución útil.
+
+    Returns:
+        (imagen BGR o None si no se pudo decodificar, factor de reducción)
+    """
+    nparr = np.frombuffer(contents, np.uint8)
+    size = _image_size(contents)
+
+    if size and target_size:
+        longest = max(size)
+        for factor, mode in _REDUCED_MODES:
+            if longest // factor >= target_size:
+                image = cv2.imdecode(nparr, mode)
+                if image is not None:
+                    return image, factor
+                break
+
+    return cv2.imdecode(nparr, cv2.IMREAD_COLOR), 1
+
+
+def iter_zip_images(contents: bytes, max_images: int) -> Iterator[Tuple[str, bytes]]:
+    """Recorrer las imágenes de un ZIP (nombre, bytes) sin extraerlo a disco"""
+    with zipfile.ZipFile(io.BytesIO(contents)) as archive:
+        count = 0
+        for info in archive.infolist():
+            if info.is_dir() or not info.filename.lower().endswith(IMAGE_EXTENSIONS):
+                continue
+            if count >= max_images:
+                logger.warning(f"ZIP con más de {max_images} imágenes, se ignoran las restantes")
+                return
+            count += 1
+            yield info.filename, archive.read(info)
+
+
+def compact_detections(result, names: dict, scale: int = 1) -> List[dict]:
+    """
+    Detecciones de un resultado YOLO en formato compacto
+
+    Las coordenadas se devuelven en el espacio de la imagen original
+    (multiplicadas por el factor de reducción usado al decodificar).
+    """
+    if result.boxes is None or len(result.boxes) == 0:
+        return []
+
+    classes = result.boxes.cls.tolist()
+    confidences = result.boxes.conf.tolist()
+    boxes = result.boxes.xyxy.tolist()
+    return [
+        {
+            'class_name': names[int(cls)],
+            'confidence': round(conf, 4),
+            'bbox': [int(coord * scale) for coord in box]
+        }
+        for cls, conf, box in zip(classes, confidences, boxes)
+    ]
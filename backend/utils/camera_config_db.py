@@ -2,19 +2,21 @@
 Sistema de almacenamiento de configuración de cámaras en base de datos SQLite
 Reemplaza el almacenamiento en JSON por una solución más robusta
 """
-import sqlite3
 import json
 from datetime import datetime
 from pathlib import Path
 from typing import List, Dict, Optional
 import logging
-from contextlib import contextmanager
+
+from backend.utils.sqlite_pool import SQLitePool
 
 logger = logging.getLogger(__name__)
 
 class CameraConfigDB:
     def __init__(self, db_path: str = "/Users/Shared/yolo11_project/database/yomjai_cameras.db"):
         self.db_path = db_path
+        # Una conexión persistente por hilo (WAL, sentencias cacheadas)
+        self._pool = SQLitePool(db_path, foreign_keys=True)
         self._init_database()
         
     def _init_database(self):
@@ -60,20 +62,13 @@ class CameraConfigDB:
                 )
             ''')
             
-    @contextmanager
     def _get_connection(self):
-        """Context manager para conexiones a la base de datos"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        conn.execute('PRAGMA foreign_keys = ON')
-        try:
-            yield conn
-            conn.commit()
-        except Exception as e:
-            conn.rollback()
-            raise e
-        finally:
-            conn.close()
+        """Context manager para conexiones a la base de datos (conexión del hilo)"""
+        return self._pool.connection()
+    
+    def close(self):
+        """Cerrar las conexiones persistentes"""
+        self._pool.close_all()
             
     def save_camera_config(self, config: Dict) -> bool:
         """
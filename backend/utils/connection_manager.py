@@ -0,0 +1,209 @@
+"""
+Manager de Conexiones WebSocket con Backpressure
+Cada cliente tiene su propia cola de salida acotada y una tarea escritora,
+de modo que un cliente lento no bloquea a los demás
+"""
+
+import asyncio
+import json
+import logging
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+from fastapi import WebSocket
+
+logger = logging.getLogger(__name__)
+
+# Políticas de desbordamiento de la cola de un cliente
+OVERFLOW_DROP_OLDEST = "drop_oldest"   # Descartar el mensaje más antiguo
+OVERFLOW_COALESCE = "coalesce"         # Reemplazar el pendiente más antiguo del mismo tipo
+OVERFLOW_DISCONNECT = "disconnect"     # Cerrar la conexión del cliente lento
+
+OVERFLOW_POLICIES = (OVERFLOW_DROP_OLDEST, OVERFLOW_COALESCE, OVERFLOW_DISCONNECT)
+
+
+def _encode(message: dict) -> str:
+    """Serializar igual que WebSocket.send_json (una sola vez por broadcast)"""
+    return json.dumps(message, separators=(",", ":"), ensure_ascii=False)
+
+
+class ClientConnection:
+    """Conexión de un cliente con su cola de salida y métricas de lag"""
+
+    def __init__(self, websocket: WebSocket, client_id: int):
+        self.websocket = websocket
+        self.client_id = client_id
+        # (tipo de mensaje, texto serializado, instante de encolado)
+        self.queue: Deque[Tuple[Optional[str], str, float]] = deque()
+        self.ready = asyncio.Event()
+        self.writer: Optional[asyncio.Task] = None
+        self.connected_at = time.time()
+        self.closed = False
+
+        # Métricas
+        self.sent = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.last_lag_ms = 0.0
+        self.max_lag_ms = 0.0
+        self.total_lag_ms = 0.0
+
+    def get_metrics(self) -> dict:
+        """Métricas de envío y lag del cliente"""
+        client = getattr(self.websocket, 'client', None)
+        return {
+            'client_id': self.client_id,
+            'address': f"{client.host}:{client.port}" if client else None,
+            'connected_seconds': round(time.time() - self.connected_at, 1),
+            'queue_depth': len(self.queue),
+            'sent': self.sent,
+            'dropped': self.dropped,
+            'coalesced': self.coalesced,
+            'last_lag_ms': round(self.last_lag_ms, 2),
+            'max_lag_ms': round(self.max_lag_ms, 2),
+            'avg_lag_ms': round(self.total_lag_ms / self.sent, 2) if self.sent else 0.0
+        }
+
+
+class ConnectionManager:
+    """
+    Gestiona las conexiones WebSocket del dashboard
+
+    broadcast() solo encola (nunca espera a un socket); cada cliente tiene
+    una tarea escritora que vacía su cola en orden.
+    """
+
+    def __init__(self, max_queue: int = 100, overflow_policy: str = OVERFLOW_COALESCE,
+                 send_timeout: float = 10.0):
+        """
+        Args:
+            max_queue: Mensajes pendientes máximos por cliente
+            overflow_policy: drop_oldest, coalesce o disconnect
+            send_timeout: Segundos máximos de un envío antes de considerar el socket muerto
+        """
+        if overflow_policy not in OVERFLOW_POLICIES:
+            logger.warning(f"Política de desbordamiento desconocida '{overflow_policy}', usando '{OVERFLOW_COALESCE}'")
+            overflow_policy = OVERFLOW_COALESCE
+        self.max_queue = max_queue
+        self.overflow_policy = overflow_policy
+        self.send_timeout = send_timeout
+        self.clients: Dict[WebSocket, ClientConnection] = {}
+        self._next_id = 0
+
+    @property
+    def active_connections(self) -> List[WebSocket]:
+        """WebSockets conectados (compatibilidad con el manager anterior)"""
+        return list(self.clients.keys())
+
+    async def connect(self, websocket: WebSocket):
+        await websocket.accept()
+        self._next_id += 1
+        client = ClientConnection(websocket, self._next_id)
+        client.writer = asyncio.create_task(self._write_loop(client))
+        self.clients[websocket] = client
+        logger.info(f"Cliente conectado. Total: {len(self.clients)}")
+
+    def disconnect(self, websocket: WebSocket):
+        client = self.clients.pop(websocket, None)
+        if client is None:
+            return
+        client.closed = True
+        client.ready.set()
+        if client.writer and client.writer is not asyncio.current_task():
+            client.writer.cancel()
+        logger.info(f"Cliente desconectado. Total: {len(self.clients)}")
+
+    async def send_personal_message(self, message: str, websocket: WebSocket):
+        client = self.clients.get(websocket)
+        if client:
+            self._enqueue(client, None, message)
+
+    def send(self, websocket: WebSocket, message: dict):
+        """Encolar un mensaje para un cliente concreto"""
+        client = self.clients.get(websocket)
+        if client:
+            self._enqueue(client, message.get('type'), _encode(message))
+
+    async def broadcast(self, message: dict):
+        """Encolar un mensaje para todos los clientes (no bloquea)"""
+        if not self.clients:
+            return
+        text = _encode(message)
+        message_type = message.get('type')
+        for client in list(self.clients.values()):
+            self._enqueue(client, message_type, text)
+
+    def _enqueue(self, client: ClientConnection, message_type: Optional[str], text: str):
+        """Añadir a la cola del cliente aplicando la política de desbordamiento"""
+        if client.closed:
+            return
+
+        if len(client.queue) >= self.max_queue:
+            if self.overflow_policy == OVERFLOW_DISCONNECT:
+                logger.warning(f"Cliente {client.client_id} demasiado lento, desconectando")
+                self._close_slow_client(client)
+                return
+
+            if self.overflow_policy == OVERFLOW_COALESCE and message_type is not None:
+                for index, (queued_type, _, _) in enumerate(client.queue):
+                    if queued_type == message_type:
+                        del client.queue[index]
+                        client.coalesced += 1
+                        break
+                else:
+                    client.queue.popleft()
+                    client.dropped += 1
+            else:
+                client.queue.popleft()
+                client.dropped += 1
+
+        client.queue.append((message_type, text, time.perf_counter()))
+        client.ready.set()
+
+    def _close_slow_client(self, client: ClientConnection):
+        """Desconectar un cliente y cerrar su socket en segundo plano"""
+        self.disconnect(client.websocket)
+
+        async def close():
+            try:
+                await client.websocket.close(code=1013)  # Try again later
+            except Exception:
+                pass
+        asyncio.create_task(close())
+
+    async def _write_loop(self, client: ClientConnection):
+        """Tarea escritora: envía la cola del cliente en orden"""
+        try:
+            while not client.closed:
+                await client.ready.wait()
+                client.ready.clear()
+
+                while client.queue and not client.closed:
+                    _, text, enqueued_at = client.queue.popleft()
+                    await asyncio.wait_for(client.websocket.send_text(text), self.send_timeout)
+
+                    lag_ms = (time.perf_counter() - enqueued_at) * 1000
+                    client.sent += 1
+                    client.last_lag_ms = lag_ms
+                    client.total_lag_ms += lag_ms
+                    client.max_lag_ms = max(client.max_lag_ms, lag_ms)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            # Socket muerto o envío colgado: liberar el cliente de inmediato
+            logger.error(f"Error enviando mensaje al cliente {client.client_id}: {e}")
+            self.disconnect(client.websocket)
+
+    def get_metrics(self) -> dict:
+        """Métricas globales y por cliente"""
+        clients = [client.get_metrics() for client in self.clients.values()]
+        return {
+            'connections': len(clients),
+            'max_queue': self.max_queue,
+            'overflow_policy': self.overflow_policy,
+            'total_dropped': sum(c['dropped'] for c in clients),
+            'total_coalesced': sum(c['coalesced'] for c in clients),
+            'max_lag_ms': max((c['max_lag_ms'] for c in clients), default=0.0),
+            'clients': clients
+        }
@@ -1,16 +1,40 @@
 """
 Gestor de Detecciones con Deduplicación
 Evita múltiples alarmas para la misma puerta/zona
+Incluye filtrado temporal (votación N de M, EMA de confianza e histéresis)
 """
 
 import time
-from typing import Dict, List, Optional, Tuple
-from dataclasses import dataclass
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+from dataclasses import dataclass, field
 from datetime import datetime
 import logging
 
+from backend.utils.zone_registry import zone_registry
+
 logger = logging.getLogger(__name__)
 
+@dataclass
+class TemporalFilterConfig:
+    """
+    Configuración del filtro temporal por zona
+    
+    Los valores por defecto reproducen el comportamiento de un solo frame
+    """
+    window: int = 1                 # M: observaciones recientes consideradas
+    votes_required: int = 1         # N: votos necesarios para cambiar de estado
+    ema_alpha: float = 1.0          # Peso de la observación nueva en la EMA
+    open_threshold: float = 0.5     # EMA mínima para abrir (histéresis superior)
+    close_threshold: float = 0.5    # EMA máxima para cerrar (histéresis inferior)
+    min_dwell_seconds: float = 0.0  # Tiempo mínimo en un estado antes de cambiar
+    
+    @classmethod
+    def from_dict(cls, data: dict) -> 'TemporalFilterConfig':
+        """Crear configuración ignorando claves desconocidas"""
+        fields = cls.__dataclass_fields__
+        return cls(**{k: v for k, v in data.items() if k in fields})
+
 @dataclass
 class ZoneState:
     """Estado de una zona específica"""
@@ -20,26 +44,76 @@ class ZoneState:
     alert_active: bool
     detection_count: int
     confidence_sum: float
+    # Anillo de observaciones recientes: (abierta, confianza)
+    observations: Deque[Tuple[bool, float]] = field(default_factory=deque)
+    open_score: float = 0.5          # EMA de probabilidad de puerta abierta
+    last_transition_time: float = 0.0
     
     @property
     def average_confidence(self) -> float:
         return self.confidence_sum / max(self.detection_count, 1)
+    
+    @property
+    def open_votes(self) -> int:
+        return sum(1 for is_open, _ in self.observations if is_open)
+    
+    @property
+    def closed_votes(self) -> int:
+        return len(self.observations) - self.open_votes
 
 class DetectionManager:
     """
     Gestiona las detecciones evitando duplicados y manteniendo estado por zona
     """
     
-    def __init__(self, state_timeout: float = 2.0, min_confidence: float = 0.75):
+    def __init__(self, state_timeout: float = 2.0, min_confidence: float = 0.75,
+                 temporal_filter: Optional[dict] = None):
         """
         Args:
             state_timeout: Tiempo sin detecciones para considerar que no hay objeto
             min_confidence: Confianza mínima para procesar detección
+            temporal_filter: Configuración del filtro temporal; las claves de
+                TemporalFilterConfig definen el valor por defecto y 'zones'
+                permite sobrescribirlo por zona configurada o por door_id
+                ({zone_id: {...}})
         """
         self.zones: Dict[str, ZoneState] = {}
         self.state_timeout = state_timeout
         self.min_confidence = min_confidence
         self.last_cleanup = time.time()
+        # Se incrementa solo en transiciones (zona nueva o eliminada, cambio de
+        # last_state o alert_active); los campos volátiles (conteos, last_seen)
+        # viajan en el keyframe periódico del stream
+        self.state_version = 0
+        self.configure_temporal_filter(temporal_filter or {})
+    
+    def configure_temporal_filter(self, temporal_filter: dict):
+        """Aplicar configuración del filtro temporal (global y por zona)"""
+        self.default_filter = TemporalFilterConfig.from_dict(temporal_filter)
+        self.zone_filters: Dict[str, TemporalFilterConfig] = {
+            zone_id: TemporalFilterConfig.from_dict({**temporal_filter, **overrides})
+            for zone_id, overrides in temporal_filter.get('zones', {}).items()
+        }
+        
+        # Ajustar el tamaño de los anillos existentes
+        for zone_id, zone in self.zones.items():
+            window = max(1, self._get_filter(zone_id).window)
+            zone.observations = deque(zone.observations, maxlen=window)
+    
+    def _get_filter(self, zone_id: str, camera_id: Optional[str] = None) -> TemporalFilterConfig:
+        """
+        Obtener configuración del filtro para una zona
+
+        zone_id es el door_id de la detección: se busca primero tal cual y
+        después la zona configurada de la puerta o de su cámara (zone_registry)
+        """
+        zone_filter = self.zone_filters.get(zone_id)
+        if zone_filter is None:
+            configured_zone = zone_registry.get_zone_id(zone_id)
+            if configured_zone == zone_id and camera_id:
+                configured_zone = zone_registry.camera_zone.get(camera_id)
+            zone_filter = self.zone_filters.get(configured_zone)
+        return zone_filter or self.default_filter
         
     def process_frame_detections(self, detections: List[dict], camera_id: str) -> List[dict]:
         """
@@ -55,6 +129,8 @@ class DetectionManager:
         current_time = time.time()
         actions_needed = []
         detected_zones = set()
+        # Una zona nueva parte de 'unknown', así que también cuenta como cambio
+        state_changed = False
         
         # Procesar cada detección
         for detection in detections:
@@ -65,6 +141,7 @@ class DetectionManager:
             detected_zones.add(zone_id)
             
             # Obtener o crear estado de zona
+            zone_filter = self._get_filter(zone_id, camera_id)
             if zone_id not in self.zones:
                 self.zones[zone_id] = ZoneState(
                     zone_id=zone_id,
@@ -72,7 +149,9 @@ class DetectionManager:
                     last_detection_time=current_time,
                     alert_active=False,
                     detection_count=0,
-                    confidence_sum=0
+                    confidence_sum=0,
+                    observations=deque(maxlen=max(1, zone_filter.window)),
+                    last_transition_time=0.0
                 )
             
             zone = self.zones[zone_id]
@@ -80,13 +159,23 @@ class DetectionManager:
             zone.detection_count += 1
             zone.confidence_sum += detection['confidence']
             
-            # Verificar cambios de estado
+            # Registrar observación en el anillo y actualizar EMA
             new_state = detection['class_name']
+            is_open = new_state == 'gate_open'
+            confidence = detection['confidence']
+            zone.observations.append((is_open, confidence))
+            observed_open = confidence if is_open else 1.0 - confidence
+            zone.open_score += zone_filter.ema_alpha * (observed_open - zone.open_score)
             
-            if new_state == 'gate_open' and not zone.alert_active:
-                # Nueva puerta abierta detectada
+            dwell_ok = current_time - zone.last_transition_time >= zone_filter.min_dwell_seconds
+            
+            # Verificar cambios de estado (con votación e histéresis)
+            if (is_open and not zone.alert_active and dwell_ok and
+                    zone.open_votes >= zone_filter.votes_required and
+                    zone.open_score >= zone_filter.open_threshold):
+                # Nueva puerta abierta confirmada
                 zone.alert_active = True
-                zone.last_state = new_state
+                zone.last_transition_time = current_time
                 action = {
                     'action': 'create_alert',
                     'zone_id': zone_id,
@@ -96,10 +185,12 @@ class DetectionManager:
                 actions_needed.append(action)
                 logger.info(f"Nueva alerta para zona {zone_id}")
                 
-            elif new_state == 'gate_closed' and zone.alert_active:
-                # Puerta cerrada, cancelar alerta
+            elif (new_state == 'gate_closed' and zone.alert_active and dwell_ok and
+                    zone.closed_votes >= zone_filter.votes_required and
+                    zone.open_score <= zone_filter.close_threshold):
+                # Puerta cerrada confirmada, cancelar alerta
                 zone.alert_active = False
-                zone.last_state = new_state
+                zone.last_transition_time = current_time
                 action = {
                     'action': 'cancel_alert',
                     'zone_id': zone_id,
@@ -108,12 +199,18 @@ class DetectionManager:
                 actions_needed.append(action)
                 logger.info(f"Cancelar alerta para zona {zone_id}")
             
-            # Actualizar estado sin crear nueva alerta
+            # Actualizar última observación sin crear nueva alerta
+            if zone.last_state != new_state:
+                state_changed = True
             zone.last_state = new_state
         
         # Limpiar zonas no detectadas (timeout)
+        zone_count = len(self.zones)
         self._cleanup_old_zones(current_time, detected_zones, actions_needed)
         
+        if state_changed or actions_needed or len(self.zones) != zone_count:
+            self.state_version += 1
+        
         return actions_needed
     
     def _get_zone_id(self, detection: dict, camera_id: str) -> str:
@@ -137,6 +234,9 @@ class DetectionManager:
                 # Si ha pasado el timeout y había alerta activa, cancelarla
                 if time_since_last > self.state_timeout and zone.alert_active:
                     zone.alert_active = False
+                    zone.last_transition_time = current_time
+                    zone.observations.clear()
+                    zone.open_score = 0.5
                     action = {
                         'action': 'cancel_alert',
                         'zone_id': zone_id,
@@ -169,6 +269,9 @@ class DetectionManager:
                 'alert_active': zone.alert_active,
                 'detection_count': zone.detection_count,
                 'average_confidence': zone.average_confidence,
+                'open_score': round(zone.open_score, 3),
+                'open_votes': zone.open_votes,
+                'window': zone.observations.maxlen,
                 'last_seen': time.time() - zone.last_detection_time
             }
             for zone_id, zone in self.zones.items()
@@ -180,6 +283,7 @@ class DetectionManager:
         """
         if zone_id in self.zones:
             del self.zones[zone_id]
+            self.state_version += 1
             logger.info(f"Zona {zone_id} reseteada")
     
     def reset_all(self):
@@ -187,4 +291,5 @@ class DetectionManager:
         Resetea todos los estados
         """
         self.zones.clear()
+        self.state_version += 1
         logger.info("Todos los estados de zona reseteados")
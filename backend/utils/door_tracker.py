@@ -0,0 +1,182 @@
+"""
+Tracker de Puertas con Identidades Estables
+Asocia cada detección con una puerta física persistente por IoU,
+en lugar de usar el índice de la caja en la salida de YOLO
+"""
+
+import time
+import logging
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Caja normalizada (x1, y1, x2, y2) en el rango 0-1
+NormBox = Tuple[float, float, float, float]
+
+
+def box_iou(a: NormBox, b: NormBox) -> float:
+    """Intersection over Union entre dos cajas (x1, y1, x2, y2)"""
+    inter_w = min(a[2], b[2]) - max(a[0], b[0])
+    inter_h = min(a[3], b[3]) - max(a[1], b[1])
+    if inter_w <= 0 or inter_h <= 0:
+        return 0.0
+    inter = inter_w * inter_h
+    area_a = (a[2] - a[0]) * (a[3] - a[1])
+    area_b = (b[2] - b[0]) * (b[3] - b[1])
+    union = area_a + area_b - inter
+    return inter / union if union > 0 else 0.0
+
+
+@dataclass
+class DoorTrack:
+    """Puerta física seguida en una cámara"""
+    door_id: str
+    bbox: NormBox
+    last_seen: float
+    hits: int = 0
+    fixed: bool = False  # ROI configurada: nunca expira ni se mueve
+
+
+class DoorTracker:
+    """
+    Mantiene identidades persistentes de puertas por cámara
+
+    Las cajas se normalizan al tamaño del frame, porque el Modo Eco
+    cambia la resolución de inferencia según el estado.
+    """
+
+    def __init__(self, iou_threshold: float = 0.3, max_age: float = 600.0,
+                 smoothing: float = 0.2, gate_rois: Optional[Dict[str, List[dict]]] = None):
+        """
+        Args:
+            iou_threshold: IoU mínimo para asociar una detección a una puerta
+            max_age: Segundos sin ver una puerta antes de olvidarla
+            smoothing: Factor de suavizado de la caja de la puerta (0 = fija)
+            gate_rois: ROIs fijas por cámara: {camera_id: [{'door_id', 'bbox': [x1,y1,x2,y2]}]}
+                       con coordenadas normalizadas 0-1
+        """
+        self.iou_threshold = iou_threshold
+        self.max_age = max_age
+        self.smoothing = smoothing
+        self.tracks: Dict[str, List[DoorTrack]] = {}
+        self.gate_rois = gate_rois or {}
+
+    def _camera_tracks(self, camera_id: str) -> List[DoorTrack]:
+        """Obtener (o crear desde ROIs) las puertas de una cámara"""
+        if camera_id not in self.tracks:
+            self.tracks[camera_id] = [
+                DoorTrack(door_id=roi['door_id'], bbox=tuple(roi['bbox']),
+                          last_seen=time.time(), fixed=True)
+                for roi in self.gate_rois.get(camera_id, [])
+            ]
+        return self.tracks[camera_id]
+
+    def _next_door_id(self, tracks: List[DoorTrack], zone_id: str) -> str:
+        """Menor índice libre, para conservar ids como '{zone}_door_0'"""
+        used = {t.door_id for t in tracks}
+        index = 0
+        while f"{zone_id}_door_{index}" in used:
+            index += 1
+        return f"{zone_id}_door_{index}"
+
+    def update(self, camera_id: str, zone_id: str, detections: List[dict],
+               frame_shape: Tuple[int, int]) -> List[dict]:
+        """
+        Asigna un door_id estable a cada detección del frame
+
+        Args:
+            camera_id: ID de la cámara
+            zone_id: Zona de la cámara (prefijo de los door_id nuevos)
+            detections: Detecciones con 'bbox' en píxeles del frame
+            frame_shape: (alto, ancho) del frame donde se detectó
+
+        Returns:
+            Las mismas detecciones con 'door_id' asignado
+        """
+        if not detections:
+            self._expire(camera_id)
+            return detections
+
+        now = time.time()
+        height, width = frame_shape[:2]
+        tracks = self._camera_tracks(camera_id)
+
+        boxes = []
+        for det in detections:
+            bbox = det['bbox']
+            boxes.append((bbox['x1'] / width, bbox['y1'] / height,
+                          bbox['x2'] / width, bbox['y2'] / height))
+
+        # Asociación greedy por IoU descendente (pocas puertas por cámara)
+        candidates = []
+        for det_idx, box in enumerate(boxes):
+            for track_idx, track in enumerate(tracks):
+                iou = box_iou(box, track.bbox)
+                if iou >= self.iou_threshold:
+                    candidates.append((iou, det_idx, track_idx))
+        candidates.sort(reverse=True)
+
+        assigned_dets = set()
+        assigned_tracks = set()
+        for iou, det_idx, track_idx in candidates:
+            if det_idx in assigned_dets or track_idx in assigned_tracks:
+                continue
+            assigned_dets.add(det_idx)
+            assigned_tracks.add(track_idx)
+
+            track = tracks[track_idx]
+            track.last_seen = now
+            track.hits += 1
+            if not track.fixed and self.smoothing > 0:
+                a = self.smoothing
+                track.bbox = tuple(
+                    (1 - a) * old + a * new for old, new in zip(track.bbox, boxes[det_idx])
+                )
+            detections[det_idx]['door_id'] = track.door_id
+
+        # Detecciones sin puerta: nuevas puertas (de izquierda a derecha para ids estables)
+        unmatched = sorted(
+            (i for i in range(len(detections)) if i not in assigned_dets),
+            key=lambda i: boxes[i][0]
+        )
+        for det_idx in unmatched:
+            door_id = self._next_door_id(tracks, zone_id)
+            tracks.append(DoorTrack(door_id=door_id, bbox=boxes[det_idx],
+                                    last_seen=now, hits=1))
+            detections[det_idx]['door_id'] = door_id
+            logger.info(f"Nueva puerta registrada en {camera_id}: {door_id}")
+
+        self._expire(camera_id, now)
+        return detections
+
+    def _expire(self, camera_id: str, now: Optional[float] = None):
+        """Olvidar puertas no fijas que no se ven desde hace max_age"""
+        tracks = self.tracks.get(camera_id)
+        if not tracks:
+            return
+        now = now or time.time()
+        self.tracks[camera_id] = [
+            t for t in tracks if t.fixed or now - t.last_seen <= self.max_age
+        ]
+
+    def reset_camera(self, camera_id: str):
+        """Olvidar las puertas de una cámara (p.ej. al eliminarla o moverla)"""
+        self.tracks.pop(camera_id, None)
+
+    def get_tracks(self) -> Dict[str, List[dict]]:
+        """Estado de las puertas seguidas por cámara"""
+        now = time.time()
+        return {
+            camera_id: [
+                {
+                    'door_id': t.door_id,
+                    'bbox': [round(v, 4) for v in t.bbox],
+                    'hits': t.hits,
+                    'fixed': t.fixed,
+                    'last_seen': now - t.last_seen
+                }
+                for t in tracks
+            ]
+            for camera_id, tracks in self.tracks.items()
+        }
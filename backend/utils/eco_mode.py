@@ -57,10 +57,24 @@ class EcoModeManager:
             }
         }
         
+        # Configuración IDLE agresiva para horas muertas (ver EcoScheduler)
+        self.aggressive_idle_config = {
+            'detection_interval': 10.0,   # Detectar cada 10s
+            'fps': 2,                     # Solo 2 FPS
+            'yolo_enabled': False,        # YOLO apagado
+            'resolution_scale': 0.5,      # Mitad de resolución
+            'jpeg_quality': 40            # Calidad mínima
+        }
+        
         # Timeouts para cambio de estado
         self.idle_timeout = 30.0      # 30s sin movimiento → IDLE
         self.alert_timeout = 10.0     # 10s sin detección → ALERT
         
+        # Ajustes del planificador predictivo
+        self.schedule_floor: Optional[SystemState] = None  # Estado mínimo permitido
+        self.aggressive_idle = False                       # IDLE agresivo en horas muertas
+        self.schedule_reason: Optional[str] = None
+        
         logger.info(f"Modo Eco Inteligente inicializado en estado {self.current_state.value}")
         logger.info(f"Configuración: motion_threshold={self.motion_threshold}, idle_timeout={self.idle_timeout}s")
     
@@ -165,7 +179,9 @@ class EcoModeManager:
                 
         elif self.current_state == SystemState.ALERT:
             # En estado ALERT, verificar si debe bajar a IDLE
-            if current_time - self.last_motion_time > self.idle_timeout:
+            # (no bajar si el planificador mantiene la cámara pre-calentada)
+            if (current_time - self.last_motion_time > self.idle_timeout and
+                    self.schedule_floor != SystemState.ALERT):
                 self.current_state = SystemState.IDLE
                 
         elif self.current_state == SystemState.IDLE:
@@ -178,6 +194,32 @@ class EcoModeManager:
             logger.info(f"Estado cambiado: {previous_state.value} → {self.current_state.value}")
             self._log_resource_usage()
     
+    def set_schedule(self, floor: Optional[SystemState] = None,
+                     aggressive_idle: bool = False, reason: Optional[str] = None):
+        """
+        Aplica el plan del EcoScheduler
+        
+        Args:
+            floor: Estado mínimo a mantener (ALERT para pre-calentar) o None
+            aggressive_idle: Usar configuración IDLE agresiva (horas muertas)
+            reason: Descripción del motivo para el status
+        """
+        changed = (floor != self.schedule_floor or
+                   aggressive_idle != self.aggressive_idle)
+        self.schedule_floor = floor
+        self.aggressive_idle = aggressive_idle and floor is None
+        self.schedule_reason = reason
+        
+        # Pre-calentar: subir inmediatamente para no perder los primeros frames
+        if floor == SystemState.ALERT and self.current_state == SystemState.IDLE:
+            self.current_state = SystemState.ALERT
+            self.last_motion_time = time.time()
+            logger.info(f"Estado cambiado: idle → alert por planificador ({reason})")
+            self._log_resource_usage()
+        elif changed:
+            logger.info(f"Plan Eco actualizado: floor={floor.value if floor else None}, "
+                        f"idle_agresivo={self.aggressive_idle} ({reason})")
+    
     def should_run_detection(self) -> bool:
         """
         Determina si debe ejecutar detección YOLO según el estado
@@ -189,6 +231,8 @@ class EcoModeManager:
         """
         Obtiene la configuración actual según el estado
         """
+        if self.aggressive_idle and self.current_state == SystemState.IDLE:
+            return self.aggressive_idle_config
         return self.state_configs[self.current_state]
     
     def process_frame(self, frame: np.ndarray) -> Tuple[np.ndarray, dict]:
@@ -262,6 +306,11 @@ class EcoModeManager:
             'time_since_motion': current_time - self.last_motion_time,
             'time_since_detection': current_time - self.last_detection_time,
             'motion_threshold': self.motion_threshold,
+            'schedule': {
+                'floor': self.schedule_floor.value if self.schedule_floor else None,
+                'aggressive_idle': self.aggressive_idle,
+                'reason': self.schedule_reason
+            },
             'estimated_cpu': {
                 'idle': '5%',
                 'alert': '20%',
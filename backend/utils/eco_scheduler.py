@@ -0,0 +1,253 @@
+"""
+Planificador Predictivo del Modo Eco
+Pre-calienta las cámaras (ALERT) antes de las ventanas de llegada de vehículos
+y fuerza un IDLE agresivo durante las horas históricamente muertas
+"""
+
+import json
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from backend.utils.eco_mode import SystemState
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ActivityWindow:
+    """Ventana de actividad esperada (minutos desde medianoche, hora local)"""
+    name: str
+    start_minute: int
+    end_minute: int
+    source: str  # 'vehicle' o 'history'
+
+    def contains(self, minute: int, lead_minutes: int = 0) -> bool:
+        """Verificar si un minuto del día cae en la ventana (con anticipación)"""
+        start = (self.start_minute - lead_minutes) % 1440
+        end = self.end_minute % 1440
+        if start <= end:
+            return start <= minute < end
+        # La ventana cruza la medianoche
+        return minute >= start or minute < end
+
+    def to_dict(self) -> dict:
+        return {
+            'name': self.name,
+            'start': f"{self.start_minute // 60:02d}:{self.start_minute % 60:02d}",
+            'end': f"{(self.end_minute // 60) % 24:02d}:{self.end_minute % 60:02d}",
+            'source': self.source
+        }
+
+
+def _parse_hhmm(value: str) -> Optional[int]:
+    """Convertir 'HH:MM' a minutos desde medianoche"""
+    if not value:
+        return None
+    try:
+        hours, minutes = value.split(':')
+        return int(hours) * 60 + int(minutes)
+    except (ValueError, AttributeError):
+        return None
+
+
+class EcoScheduler:
+    """
+    Planificador que ajusta el Modo Eco según la actividad esperada
+
+    Fuentes de información:
+    - Ventanas de llegada de vehículos (vehicle_config_routes)
+    - Histórico de eventos por hora (event_logger.get_hourly_stats)
+    """
+
+    def __init__(self, eco_manager, config_path: Optional[str] = None):
+        self.eco_manager = eco_manager
+        self.config = self._load_config(config_path)
+        self.windows: List[ActivityWindow] = []
+        self.dead_hours: set = set()
+        self.last_refresh = 0.0
+        self.current_plan = 'normal'
+
+        logger.info("EcoScheduler inicializado")
+
+    def _load_config(self, config_path: Optional[str]) -> Dict:
+        """Cargar configuración del planificador"""
+        default_config = {
+            "enabled": True,
+            "prewarm_minutes": 15,         # Subir a ALERT 15 min antes de la ventana
+            "history_days": 14,            # Días de histórico para horas muertas/pico
+            "dead_hour_max_events": 0,     # Eventos máximos para considerar hora muerta
+            "min_history_events": 50,      # Eventos mínimos en el histórico para usarlo
+            "busy_hour_ratio": 0.6,        # Fracción del máximo para considerar hora pico
+            "prewarm_busy_hours": True,    # Tratar horas pico históricas como ventanas
+            "aggressive_idle": True,       # IDLE agresivo en horas muertas
+            "refresh_interval": 3600       # Recalcular ventanas cada hora
+        }
+
+        if config_path and Path(config_path).exists():
+            try:
+                with open(config_path, 'r') as f:
+                    default_config.update(json.load(f))
+            except Exception as e:
+                logger.error(f"Error cargando configuración del planificador: {e}")
+
+        return default_config
+
+    # Claves ajustables desde la API
+    UPDATABLE_KEYS = ('enabled', 'prewarm_minutes', 'history_days', 'dead_hour_max_events',
+                      'min_history_events', 'busy_hour_ratio', 'prewarm_busy_hours', 'aggressive_idle')
+
+    def update_config(self, settings: Dict):
+        """
+        Actualizar la configuración convirtiendo cada valor al tipo del actual
+
+        Raises:
+            ValueError: Si un valor no se puede convertir
+        """
+        updates = {}
+        for key in self.UPDATABLE_KEYS:
+            if key not in settings:
+                continue
+            value = settings[key]
+            if isinstance(self.config[key], bool):
+                # bool("false") sería True
+                if isinstance(value, str):
+                    if value.strip().lower() not in ('true', 'false', '1', '0'):
+                        raise ValueError(f"{key}: valor booleano no válido '{value}'")
+                    value = value.strip().lower() in ('true', '1')
+                updates[key] = bool(value)
+            else:
+                updates[key] = type(self.config[key])(value)
+
+        self.config.update(updates)
+        # Forzar recálculo inmediato con la nueva configuración
+        self.last_refresh = 0
+
+    def _local_utc_offset_minutes(self) -> int:
+        """Diferencia horaria local respecto a UTC en minutos (los timestamps de SQLite son UTC)"""
+        offset = datetime.now().astimezone().utcoffset() or timedelta(0)
+        return int(offset.total_seconds() // 60)
+
+    def refresh(self, vehicle_config: Optional[Dict] = None,
+                hourly_stats: Optional[Dict[int, int]] = None):
+        """
+        Recalcula las ventanas de actividad y las horas muertas
+
+        Args:
+            vehicle_config: Configuración de vehículos (con 'vehicle_types')
+            hourly_stats: Eventos por hora UTC (0-23) del event_logger
+        """
+        windows = []
+
+        # Ventanas declaradas por tipo de vehículo
+        for vehicle in (vehicle_config or {}).get('vehicle_types', []):
+            if not vehicle.get('activo', True):
+                continue
+            start = _parse_hhmm(vehicle.get('hora_inicio', ''))
+            end = _parse_hhmm(vehicle.get('hora_fin', ''))
+            if start is None or end is None:
+                continue
+            windows.append(ActivityWindow(
+                name=vehicle.get('nombre_display', vehicle.get('tipo', 'vehiculo')),
+                start_minute=start,
+                end_minute=end if end > start else end + 1440,
+                source='vehicle'
+            ))
+
+        # Horas pico y horas muertas del histórico (convertidas a hora local).
+        # Sin histórico suficiente (base vacía o recién creada) todas las horas
+        # parecerían muertas: no se usa
+        dead_hours = set()
+        total = sum((hourly_stats or {}).values())
+        if total and total >= self.config['min_history_events']:
+            offset = self._local_utc_offset_minutes()
+            local_stats = {}
+            for hour in range(24):
+                # Con desfases de media hora una hora local cubre dos horas UTC:
+                # se toma la más activa
+                utc_start = (hour * 60 - offset) % 1440
+                utc_hours = {utc_start // 60, ((utc_start + 59) // 60) % 24}
+                local_stats[hour] = max(hourly_stats.get(h, 0) for h in utc_hours)
+            peak = max(local_stats.values())
+
+            for hour, count in sorted(local_stats.items()):
+                if self.config['prewarm_busy_hours'] and \
+                        count >= peak * self.config['busy_hour_ratio']:
+                    windows.append(ActivityWindow(
+                        name=f"Hora pico {hour:02d}:00",
+                        start_minute=hour * 60,
+                        end_minute=hour * 60 + 60,
+                        source='history'
+                    ))
+                elif count <= self.config['dead_hour_max_events']:
+                    dead_hours.add(hour)
+
+        # Una hora con ventana esperada nunca es muerta (incluyendo el pre-calentamiento)
+        lead = self.config['prewarm_minutes']
+        for hour in list(dead_hours):
+            if any(window.contains(hour * 60 + minute, lead)
+                   for window in windows for minute in (0, 59)):
+                dead_hours.discard(hour)
+
+        self.windows = windows
+        self.dead_hours = dead_hours
+        self.last_refresh = time.time()
+
+        logger.info(f"Plan Eco recalculado: {len(windows)} ventanas, "
+                    f"{len(dead_hours)} horas muertas")
+
+    def needs_refresh(self) -> bool:
+        """Indica si las ventanas deben recalcularse"""
+        return time.time() - self.last_refresh > self.config['refresh_interval']
+
+    def evaluate(self, now: Optional[datetime] = None) -> str:
+        """
+        Evalúa el plan para el momento actual y lo aplica al EcoModeManager
+
+        Returns:
+            Plan aplicado: 'prewarm', 'dead_hours' o 'normal'
+        """
+        if not self.config['enabled']:
+            self.eco_manager.set_schedule(None, False, None)
+            self.current_plan = 'normal'
+            return self.current_plan
+
+        now = now or datetime.now()
+        minute = now.hour * 60 + now.minute
+        lead = self.config['prewarm_minutes']
+
+        active_window = next(
+            (w for w in self.windows if w.contains(minute, lead)), None
+        )
+
+        if active_window:
+            self.current_plan = 'prewarm'
+            self.eco_manager.set_schedule(
+                SystemState.ALERT, False,
+                f"Ventana esperada: {active_window.name}"
+            )
+        elif now.hour in self.dead_hours and self.config['aggressive_idle']:
+            self.current_plan = 'dead_hours'
+            self.eco_manager.set_schedule(
+                None, True, f"Hora históricamente muerta ({now.hour:02d}:00)"
+            )
+        else:
+            self.current_plan = 'normal'
+            self.eco_manager.set_schedule(None, False, None)
+
+        return self.current_plan
+
+    def get_status(self) -> dict:
+        """Obtiene el estado del planificador"""
+        return {
+            'enabled': self.config['enabled'],
+            'plan': self.current_plan,
+            'prewarm_minutes': self.config['prewarm_minutes'],
+            'windows': [w.to_dict() for w in self.windows],
+            'dead_hours': sorted(self.dead_hours),
+            'last_refresh': datetime.fromtimestamp(self.last_refresh).isoformat()
+            if self.last_refresh else None
+        }
@@ -2,18 +2,143 @@
 Sistema de Eventos para YOMJAI
 Almacena eventos del sistema en SQLite
 """
-import sqlite3
+import atexit
+import base64
+import binascii
+import hashlib
 import json
-from datetime import datetime
+import os
+import queue
+import re
+import sqlite3
+import threading
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import Callable, List, Dict, Optional
 import asyncio
-from contextlib import contextmanager
+import logging
+import time
+
+from backend.utils.sqlite_pool import SQLitePool
+
+logger = logging.getLogger(__name__)
+
+# Formato de CURRENT_TIMESTAMP de SQLite (UTC); los timestamps se fijan al
+# registrar el evento, no al escribirlo
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# Marca de parada para el hilo escritor
+_STOP = object()
+
+# Reintentos del escritor: espera exponencial entre WRITE_RETRY_BASE y
+# WRITE_RETRY_MAX segundos; al cerrar solo se reintenta CLOSE_WRITE_RETRIES veces
+WRITE_RETRY_BASE = 0.1
+WRITE_RETRY_MAX = 5.0
+CLOSE_WRITE_RETRIES = 3
+
+# Filas migradas por transacción al mover thumbnails base64 a la tabla thumbnails
+MIGRATION_BATCH = 500
+
+
+# Columnas indexadas en events_fts y su peso en el ranking bm25
+FTS_COLUMNS = ('event_name', 'description', 'zone_id')
+FTS_WEIGHTS = (5.0, 1.0, 2.0)
+
+# Palabras de una búsqueda (mismos separadores que el tokenizer unicode61)
+_SEARCH_TOKEN = re.compile(r'[^\W_]+')
+
+
+def build_match_query(search: str) -> Optional[str]:
+    """
+    Expresión FTS5 MATCH para lo que escribe el usuario
+    
+    Cada palabra se busca como prefijo ("puer" encuentra "Puerta") y todas
+    deben aparecer. Las comillas evitan que la sintaxis FTS5 del texto
+    (AND, NEAR, *, ...) se interprete.
+    """
+    tokens = _SEARCH_TOKEN.findall(search or '')
+    if not tokens:
+        return None
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+# Tablas de agregados: nombre → expresión SQL del inicio del bucket
+ROLLUP_TABLES = {
+    'events_rollup_hourly': "strftime('%Y-%m-%d %H:00:00', {ts})",
+    'events_rollup_daily': "date({ts})",
+}
+
+# Duración de un evento (segundos) a partir de su metadata
+ROLLUP_DURATION_SQL = (
+    "CASE WHEN json_valid({meta}) THEN COALESCE("
+    "json_extract({meta}, '$.duration_seconds'), json_extract({meta}, '$.delay_seconds'), 0) "
+    "ELSE 0 END"
+)
+
+
+def encode_cursor(timestamp: str, event_id: int) -> str:
+    """Cursor opaco de paginación: posición (timestamp, id) del último evento"""
+    raw = f'{timestamp}|{event_id}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> tuple:
+    """(timestamp, id) de un cursor; ValueError si no es válido"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        timestamp, event_id = raw.rsplit('|', 1)
+        return timestamp, int(event_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError(f"Cursor inválido: {cursor}")
+
+
+def thumbnail_hash(data: bytes) -> str:
+    """Clave de contenido de un thumbnail (frames idénticos comparten clave)"""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
 
 class EventLogger:
-    def __init__(self, db_path: str = "/Users/Shared/yolo11_project/database/yomjai_events.db"):
+    def __init__(self, db_path: str = "/Users/Shared/yolo11_project/database/yomjai_events.db",
+                 async_writes: bool = True, flush_interval: float = 0.05,
+                 batch_size: int = 256, id_block_size: int = 256):
+        """
+        Args:
+            db_path: Ruta de la base de datos
+            async_writes: Encolar los eventos y escribirlos por lotes en un hilo
+            flush_interval: Segundos máximos que un evento espera en la cola
+            batch_size: Eventos máximos por transacción
+            id_block_size: IDs reservados de una vez en sqlite_sequence
+        """
         self.db_path = db_path
+        # Una conexión persistente por hilo (WAL, sentencias cacheadas).
+        # auto_vacuum solo tiene efecto en bases nuevas; las existentes lo
+        # activan con el VACUUM único de la retención
+        self._pool = SQLitePool(db_path, pragmas={'auto_vacuum': 'INCREMENTAL'})
+        # Callbacks invocados tras cada evento (None = cambio masivo)
+        self._listeners: List[Callable[[Optional[Dict]], None]] = []
+        
+        # Escritura por lotes (group commit)
+        self.async_writes = async_writes
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.id_block_size = id_block_size
+        self._queue: "queue.Queue" = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+        self._writer_pid: Optional[int] = None
+        self._writer_lock = threading.Lock()
+        # Eventos encolados aún no escritos: id → fila, hash → thumbnail
+        self._pending: Dict[int, tuple] = {}
+        self._pending_thumbnails: Dict[str, bytes] = {}
+        self._pending_lock = threading.Lock()
+        # Bloque de IDs reservado: (pid, siguiente, último)
+        self._id_block = (None, 0, -1)
+        self._id_lock = threading.Lock()
+        self._closed = False
+        # Búsqueda full-text (False si SQLite no tiene FTS5)
+        self.fts_enabled = False
+        
         self._init_database()
+        atexit.register(self.close)
         
     def _init_database(self):
         """Inicializa la base de datos y crea las tablas necesarias"""
@@ -33,24 +158,423 @@ class EventLogger:
                 )
             ''')
             
-            # Índices para búsquedas rápidas
-            conn.execute('CREATE INDEX IF NOT EXISTS idx_timestamp ON events(timestamp DESC)')
-            conn.execute('CREATE INDEX IF NOT EXISTS idx_event_type ON events(event_type)')
-            conn.execute('CREATE INDEX IF NOT EXISTS idx_zone_id ON events(zone_id)')
+            # Índices para búsquedas rápidas. Los compuestos sirven a la vez
+            # para filtrar y para ordenar por (timestamp, id): el rowid va
+            # implícito al final de cada índice
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_events_ts ON events(timestamp)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_events_type_ts ON events(event_type, timestamp)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_events_zone_ts ON events(zone_id, timestamp)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_events_severity_ts ON events(severity, timestamp)')
+            # Sustituidos: idx_timestamp era DESC con el rowid ascendente, de
+            # modo que ORDER BY timestamp DESC, id DESC necesitaba ordenar
+            conn.execute('DROP INDEX IF EXISTS idx_timestamp')
+            conn.execute('DROP INDEX IF EXISTS idx_event_type')
+            conn.execute('DROP INDEX IF EXISTS idx_zone_id')
+            
+            # Columnas añadidas después de la primera versión de la tabla
+            columns = {row['name'] for row in conn.execute('PRAGMA table_info(events)')}
+            for column in ('image_path', 'thumbnail_base64', 'thumbnail_hash'):
+                if column not in columns:
+                    conn.execute(f'ALTER TABLE events ADD COLUMN {column} TEXT')
+            
+            # Thumbnails JPEG direccionados por contenido (fuera de la tabla events)
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS thumbnails (
+                    hash TEXT PRIMARY KEY,
+                    data BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_thumbnail_hash ON events(thumbnail_hash)')
             
-    @contextmanager
+            self.fts_enabled = self._init_fts(conn)
+            self._init_rollups(conn)
+        
+        self._migrate_inline_thumbnails()
+    
+    def _init_fts(self, conn) -> bool:
+        """
+        Índice FTS5 de contenido externo sobre events, mantenido por triggers
+        
+        Returns:
+            False si FTS5 no está disponible (la búsqueda usa LIKE)
+        """
+        exists = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'events_fts'"
+        ).fetchone()
+        columns = ', '.join(FTS_COLUMNS)
+        new_columns = ', '.join(f'new.{column}' for column in FTS_COLUMNS)
+        old_columns = ', '.join(f'old.{column}' for column in FTS_COLUMNS)
+        try:
+            conn.execute(f'''
+                CREATE VIRTUAL TABLE IF NOT EXISTS events_fts USING fts5(
+                    {columns},
+                    content='events', content_rowid='id',
+                    tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+                )
+            ''')
+        except sqlite3.OperationalError as e:
+            logger.warning(f"FTS5 no disponible, la búsqueda de eventos usará LIKE: {e}")
+            return False
+        
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS events_fts_insert AFTER INSERT ON events BEGIN
+                INSERT INTO events_fts (rowid, {columns}) VALUES (new.id, {new_columns});
+            END
+        ''')
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS events_fts_delete AFTER DELETE ON events BEGIN
+                INSERT INTO events_fts (events_fts, rowid, {columns}) VALUES ('delete', old.id, {old_columns});
+            END
+        ''')
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS events_fts_update AFTER UPDATE OF {columns} ON events BEGIN
+                INSERT INTO events_fts (events_fts, rowid, {columns}) VALUES ('delete', old.id, {old_columns});
+                INSERT INTO events_fts (rowid, {columns}) VALUES (new.id, {new_columns});
+            END
+        ''')
+        
+        if not exists:
+            # Indexar los eventos que ya había
+            conn.execute("INSERT INTO events_fts (events_fts) VALUES ('rebuild')")
+            logger.info("Índice de búsqueda de eventos creado")
+        return True
+    
+    def _init_rollups(self, conn):
+        """
+        Agregados por hora y por día, mantenidos por un trigger al insertar
+        
+        Clave (bucket_start, zone_id, event_type, severity) con el número de
+        eventos y la suma de duraciones (metadata duration_seconds o
+        delay_seconds). Son el histórico de estadísticas: no se descuentan
+        al borrar eventos antiguos (retención). zone_id NULL se guarda como ''.
+        """
+        created = False
+        for table, bucket in ROLLUP_TABLES.items():
+            exists = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+            ).fetchone()
+            created = created or not exists
+            conn.execute(f'''
+                CREATE TABLE IF NOT EXISTS {table} (
+                    bucket_start TEXT NOT NULL,
+                    zone_id TEXT NOT NULL DEFAULT '',
+                    event_type TEXT NOT NULL,
+                    severity TEXT NOT NULL,
+                    count INTEGER NOT NULL DEFAULT 0,
+                    duration_sum REAL NOT NULL DEFAULT 0,
+                    PRIMARY KEY (bucket_start, zone_id, event_type, severity)
+                ) WITHOUT ROWID
+            ''')
+            conn.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS {table}_insert AFTER INSERT ON events BEGIN
+                    INSERT INTO {table} (bucket_start, zone_id, event_type, severity, count, duration_sum)
+                    VALUES ({bucket.format(ts='new.timestamp')}, COALESCE(new.zone_id, ''),
+                            new.event_type, COALESCE(new.severity, 'info'), 1,
+                            {ROLLUP_DURATION_SQL.format(meta='new.metadata')})
+                    ON CONFLICT (bucket_start, zone_id, event_type, severity) DO UPDATE SET
+                        count = count + 1,
+                        duration_sum = duration_sum + excluded.duration_sum;
+                END
+            ''')
+        
+        if created:
+            self._backfill_rollups(conn)
+    
+    def _backfill_rollups(self, conn):
+        """
+        Recalcular los agregados desde la tabla events (idempotente)
+        
+        Solo se reemplazan los buckets desde el evento más antiguo que se
+        conserva; los anteriores (eventos ya borrados por retención) no se
+        tocan.
+        """
+        oldest = conn.execute('SELECT MIN(timestamp) FROM events').fetchone()[0]
+        if oldest is None:
+            return
+        for table, bucket in ROLLUP_TABLES.items():
+            start = conn.execute(f'SELECT {bucket.format(ts="?")}', (oldest,)).fetchone()[0]
+            conn.execute(f'DELETE FROM {table} WHERE bucket_start >= ?', (start,))
+            conn.execute(f'''
+                INSERT INTO {table} (bucket_start, zone_id, event_type, severity, count, duration_sum)
+                SELECT {bucket.format(ts='timestamp')} AS bucket, COALESCE(zone_id, ''),
+                       event_type, COALESCE(severity, 'info'), COUNT(*),
+                       SUM({ROLLUP_DURATION_SQL.format(meta='metadata')})
+                FROM events
+                WHERE timestamp >= ?
+                GROUP BY bucket, COALESCE(zone_id, ''), event_type, COALESCE(severity, 'info')
+            ''', (start,))
+        logger.info("Agregados de eventos recalculados")
+    
+    def rebuild_rollups(self):
+        """Recalcular los agregados desde la tabla events"""
+        with self._get_connection() as conn:
+            self._backfill_rollups(conn)
+        self._notify(None)
+    
+    def _migrate_inline_thumbnails(self):
+        """Mover los thumbnails base64 de events a la tabla thumbnails (por lotes)"""
+        migrated = 0
+        last_id = 0
+        while True:
+            with self._get_connection() as conn:
+                rows = conn.execute('''
+                    SELECT id, thumbnail_base64 FROM events
+                    WHERE id > ? AND thumbnail_base64 IS NOT NULL
+                    ORDER BY id
+                    LIMIT ?
+                ''', (last_id, MIGRATION_BATCH)).fetchall()
+                if not rows:
+                    break
+                last_id = rows[-1]['id']
+                
+                updates = []
+                for row in rows:
+                    try:
+                        data = base64.b64decode(row['thumbnail_base64'], validate=True)
+                    except (binascii.Error, ValueError):
+                        data = b''
+                    digest = None
+                    if data:
+                        digest = thumbnail_hash(data)
+                        conn.execute(
+                            'INSERT OR IGNORE INTO thumbnails (hash, data, size) VALUES (?, ?, ?)',
+                            (digest, data, len(data))
+                        )
+                    updates.append((digest, row['id']))
+                conn.executemany(
+                    'UPDATE events SET thumbnail_hash = ?, thumbnail_base64 = NULL WHERE id = ?',
+                    updates
+                )
+                migrated += len(rows)
+        
+        if migrated:
+            logger.info(f"{migrated} thumbnails de eventos migrados a la tabla thumbnails")
+            
+    def add_listener(self, listener: Callable[[Optional[Dict]], None]):
+        """
+        Registrar un callback para cada evento registrado
+        
+        Recibe {'id', 'event_type', 'severity', 'zone_id', 'timestamp'} o
+        None cuando se borraron eventos en bloque
+        """
+        self._listeners.append(listener)
+    
+    def _notify(self, event: Optional[Dict]):
+        """Avisar a los listeners sin que un fallo afecte al registro"""
+        for listener in self._listeners:
+            try:
+                listener(event)
+            except Exception as e:
+                logger.error(f"Error en listener de eventos: {e}")
+    
     def _get_connection(self):
-        """Context manager para conexiones a la base de datos"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
+        """Context manager para conexiones a la base de datos (conexión del hilo)"""
+        return self._pool.connection()
+    
+    def enable_incremental_vacuum(self) -> bool:
+        """
+        Activar auto_vacuum incremental en bases creadas sin él
+
+        Requiere un VACUUM completo (una sola vez) que bloquea la escritura
+        mientras dura: llamar al arrancar, antes de registrar eventos.
+
+        Returns:
+            True si se ha hecho la conversión
+        """
+        self.flush()
+        with self._get_connection() as conn:
+            if conn.execute('PRAGMA auto_vacuum').fetchone()[0] == 2:
+                return False
+            logger.info("Activando auto_vacuum incremental en la base de eventos (VACUUM único)")
+            start = time.perf_counter()
+            conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+            conn.execute('VACUUM')
+        logger.info(f"VACUUM de eventos completado en {time.perf_counter() - start:.1f}s")
+        return True
+    
+    def configure_writer(self, async_writes: bool = None, flush_interval: float = None,
+                         batch_size: int = None):
+        """Ajustar la escritura por lotes (antes de registrar eventos)"""
+        if async_writes is not None:
+            self.async_writes = async_writes
+        if flush_interval is not None:
+            self.flush_interval = flush_interval
+        if batch_size is not None:
+            self.batch_size = max(1, batch_size)
+    
+    def close(self):
+        """Escribir los eventos pendientes, hacer checkpoint del WAL y cerrar"""
+        if self._closed:
+            return
+        self._closed = True
+        writer = self._writer
+        if writer is not None and writer.is_alive() and self._writer_pid == os.getpid():
+            self._queue.put(_STOP)
+            writer.join()
         try:
-            yield conn
-            conn.commit()
+            with self._get_connection() as conn:
+                conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
         except Exception as e:
-            conn.rollback()
-            raise e
-        finally:
-            conn.close()
+            logger.error(f"Error en checkpoint de eventos: {e}")
+        self._pool.close_all()
+    
+    # ==================== ESCRITURA POR LOTES ====================
+    
+    def _next_event_id(self) -> int:
+        """
+        ID para un evento nuevo, de un bloque reservado en sqlite_sequence
+        
+        AUTOINCREMENT nunca reutiliza valores por debajo de sqlite_sequence,
+        así que reservar un bloque subiendo el contador es seguro aunque
+        varios procesos (workers) registren eventos a la vez.
+        """
+        pid = os.getpid()
+        with self._id_lock:
+            block_pid, next_id, last_id = self._id_block
+            if block_pid != pid or next_id > last_id:
+                with self._get_connection() as conn:
+                    cursor = conn.execute(
+                        "UPDATE sqlite_sequence SET seq = seq + ? WHERE name = 'events'",
+                        (self.id_block_size,)
+                    )
+                    if cursor.rowcount == 0:
+                        conn.execute(
+                            "INSERT INTO sqlite_sequence (name, seq) "
+                            "SELECT 'events', COALESCE(MAX(id), 0) + ? FROM events",
+                            (self.id_block_size,)
+                        )
+                    last_id = conn.execute(
+                        "SELECT seq FROM sqlite_sequence WHERE name = 'events'"
+                    ).fetchone()[0]
+                next_id = last_id - self.id_block_size + 1
+            self._id_block = (pid, next_id + 1, last_id)
+            return next_id
+    
+    def _ensure_writer(self):
+        """Arrancar el hilo escritor (también en un proceso hijo tras fork)"""
+        pid = os.getpid()
+        if self._writer is not None and self._writer_pid == pid and self._writer.is_alive():
+            return
+        with self._writer_lock:
+            if self._writer is not None and self._writer_pid == pid and self._writer.is_alive():
+                return
+            if self._writer_pid is not None and self._writer_pid != pid:
+                # Proceso hijo: la cola y los pendientes son del padre
+                self._queue = queue.Queue()
+                with self._pending_lock:
+                    self._pending.clear()
+                    self._pending_thumbnails.clear()
+            self._writer_pid = pid
+            self._writer = threading.Thread(target=self._writer_loop, name="event-writer", daemon=True)
+            self._writer.start()
+    
+    def _writer_loop(self):
+        """Agrupar eventos durante flush_interval y escribirlos en una transacción"""
+        stop = False
+        while not stop:
+            item = self._queue.get()
+            if item is _STOP:
+                self._queue.task_done()
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    self._queue.task_done()
+                    stop = True
+                    break
+                batch.append(item)
+            
+            # En la parada se escribe todo lo que quede en la cola
+            while stop:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is not _STOP:
+                    batch.append(item)
+                else:
+                    self._queue.task_done()
+            
+            self._write_pending(batch)
+            for _ in batch:
+                self._queue.task_done()
+    
+    def _write_pending(self, items: List[tuple]):
+        """
+        Escribir un lote del hilo escritor sin perder eventos
+
+        Sus IDs ya se devolvieron, así que los errores (base bloqueada,
+        disco lleno) se reintentan con espera exponencial y las filas siguen
+        en _pending hasta escribirse. Un evento que viola una restricción
+        nunca se podrá escribir: el lote se reparte fila a fila para que no
+        bloquee al resto.
+        """
+        attempt = 0
+        while True:
+            try:
+                self._write_batch(items)
+                return
+            except sqlite3.IntegrityError as e:
+                if len(items) == 1:
+                    logger.error(f"Evento {items[0][0][0]} descartado: {e}")
+                    self._release_pending(items)
+                    return
+                for item in items:
+                    self._write_pending([item])
+                return
+            except Exception as e:
+                attempt += 1
+                if self._closed and attempt >= CLOSE_WRITE_RETRIES:
+                    logger.error(f"{len(items)} eventos sin escribir al cerrar: {e}")
+                    return
+                if attempt == 1 or attempt % 10 == 0:
+                    logger.error(f"Error escribiendo {len(items)} eventos (intento {attempt}): {e}")
+                time.sleep(min(WRITE_RETRY_BASE * 2 ** (attempt - 1), WRITE_RETRY_MAX))
+    
+    def _write_batch(self, items: List[tuple]):
+        """
+        Insertar un lote de (fila, thumbnail) en una transacción
+
+        Los IDs ya escritos se ignoran, de modo que reintentar un lote cuyo
+        commit sí llegó a la base no duplica eventos ni agregados.
+        """
+        rows = [row for row, _ in items]
+        thumbnails = {row[9]: data for row, data in items if data}
+        with self._get_connection() as conn:
+            conn.executemany(
+                'INSERT OR IGNORE INTO thumbnails (hash, data, size) VALUES (?, ?, ?)',
+                [(digest, data, len(data)) for digest, data in thumbnails.items()]
+            )
+            conn.executemany('''
+                INSERT INTO events (id, timestamp, event_type, event_name, description,
+                                    zone_id, severity, metadata, image_path, thumbnail_hash)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (id) DO NOTHING
+            ''', rows)
+        self._release_pending(items)
+    
+    def _release_pending(self, items: List[tuple]):
+        """Quitar de _pending las filas (y thumbnails) de un lote ya resuelto"""
+        with self._pending_lock:
+            for row, data in items:
+                self._pending.pop(row[0], None)
+                if data:
+                    self._pending_thumbnails.pop(row[9], None)
+    
+    def flush(self):
+        """Esperar a que todos los eventos encolados estén escritos"""
+        if self._writer is not None and self._writer_pid == os.getpid() and self._writer.is_alive():
+            self._queue.join()
             
     def log_event(
         self,
@@ -61,7 +585,8 @@ class EventLogger:
         severity: str = "info",
         metadata: Dict = None,
         image_path: str = None,
-        thumbnail_base64: str = None
+        thumbnail_base64: str = None,
+        thumbnail: bytes = None
     ) -> int:
         """
         Registra un nuevo evento en la base de datos
@@ -74,62 +599,172 @@ class EventLogger:
             severity: Severidad (info, warning, error, critical)
             metadata: Datos adicionales en formato dict (opcional)
             image_path: Ruta a la imagen del evento (opcional)
-            thumbnail_base64: Thumbnail en base64 para vista rápida (opcional)
+            thumbnail_base64: Thumbnail en base64 (opcional, formato anterior)
+            thumbnail: Thumbnail JPEG para vista rápida (opcional)
             
         Returns:
-            ID del evento creado
+            ID del evento creado (reservado de antemano; con escritura por
+            lotes la fila aparece en la base de datos tras flush_interval)
         """
+        if thumbnail is None and thumbnail_base64:
+            thumbnail = base64.b64decode(thumbnail_base64)
+        digest = thumbnail_hash(thumbnail) if thumbnail else None
+        
+        now = time.time()
+        event_id = self._next_event_id()
+        row = (
+            event_id,
+            datetime.fromtimestamp(now, tz=timezone.utc).strftime(TIMESTAMP_FORMAT),
+            event_type,
+            event_name,
+            description,
+            zone_id,
+            severity,
+            json.dumps(metadata) if metadata else None,
+            image_path,
+            digest
+        )
+        
+        if self.async_writes and not self._closed:
+            self._ensure_writer()
+            with self._pending_lock:
+                self._pending[event_id] = row
+                if thumbnail:
+                    self._pending_thumbnails[digest] = thumbnail
+            self._queue.put((row, thumbnail))
+        else:
+            try:
+                self._write_batch([(row, thumbnail)])
+            except sqlite3.OperationalError:
+                # Base bloqueada: un reintento antes de propagar el error
+                time.sleep(WRITE_RETRY_BASE)
+                self._write_batch([(row, thumbnail)])
+        
+        self._notify({
+            'id': event_id,
+            'event_type': event_type,
+            'severity': severity,
+            'zone_id': zone_id,
+            'timestamp': now
+        })
+        return event_id
+    
+    def get_event_image_data(self, event_id: int) -> Optional[Dict]:
+        """
+        Imagen de un evento, incluidos los que aún no se han escrito
+        
+        Returns:
+            {'image_path', 'thumbnail' (JPEG o None)} o None si el evento no existe
+        """
+        with self._pending_lock:
+            row = self._pending.get(event_id)
+        if row is not None:
+            return {'image_path': row[8], 'thumbnail': self.get_thumbnail(row[9]) if row[9] else None}
+        
         with self._get_connection() as conn:
-            cursor = conn.execute('''
-                INSERT INTO events (event_type, event_name, description, zone_id, 
-                                  severity, metadata, image_path, thumbnail_base64)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                event_type,
-                event_name,
-                description,
-                zone_id,
-                severity,
-                json.dumps(metadata) if metadata else None,
-                image_path,
-                thumbnail_base64
-            ))
-            return cursor.lastrowid
+            row = conn.execute('''
+                SELECT e.image_path, t.data
+                FROM events e LEFT JOIN thumbnails t ON t.hash = e.thumbnail_hash
+                WHERE e.id = ?
+            ''', (event_id,)).fetchone()
+        if row is None:
+            return None
+        return {'image_path': row['image_path'], 'thumbnail': row['data']}
+    
+    def get_thumbnail(self, digest: str) -> Optional[bytes]:
+        """JPEG de un thumbnail por su hash (incluidos los aún no escritos)"""
+        with self._pending_lock:
+            data = self._pending_thumbnails.get(digest)
+        if data is not None:
+            return data
+        with self._get_connection() as conn:
+            row = conn.execute('SELECT data FROM thumbnails WHERE hash = ?', (digest,)).fetchone()
+        return row['data'] if row else None
             
-    def get_recent_events(self, limit: int = 20, offset: int = 0, search: str = None) -> List[Dict]:
+    def get_recent_events(self, limit: int = 20, offset: int = 0, search: str = None,
+                          **filters) -> List[Dict]:
         """
         Obtiene los eventos más recientes con opción de búsqueda
         
+        Mismos argumentos que get_events_page.
+        
+        Returns:
+            Lista de eventos con formato para el frontend
+        """
+        return self.get_events_page(limit=limit, offset=offset, search=search, **filters)['events']
+    
+    def get_events_page(self, limit: int = 20, offset: int = 0, search: str = None,
+                        event_type: str = None, zone_id: str = None, severity: str = None,
+                        since: str = None, until: str = None, order: str = 'recent',
+                        cursor: str = None) -> Dict:
+        """
+        Página de eventos con opción de búsqueda y filtros
+        
         Args:
             limit: Número máximo de eventos a retornar
-            offset: Número de eventos a saltar (para paginación)
-            search: Término de búsqueda (opcional)
+            offset: Número de eventos a saltar (solo si no se usa cursor)
+            search: Término de búsqueda (opcional); prefijos de palabras en
+                    nombre, descripción y zona
+            event_type: Filtrar por tipo de evento (opcional)
+            zone_id: Filtrar por zona (opcional)
+            severity: Filtrar por severidad (opcional)
+            since: Desde esta fecha/hora ISO, UTC salvo que indique zona (opcional)
+            until: Hasta esta fecha/hora ISO (opcional)
+            order: 'recent' (más nuevos primero) o 'relevance' (bm25, con búsqueda)
+            cursor: next_cursor de la página anterior (orden 'recent'); a
+                    diferencia de offset no recorre los eventos ya vistos
             
         Returns:
-            Lista de eventos con formato para el frontend
+            {'events': lista con formato para el frontend,
+             'next_cursor': cursor de la página siguiente o None}
         """
-        with self._get_connection() as conn:
-            if search:
-                # Búsqueda con LIKE en nombre y descripción
-                cursor = conn.execute('''
-                    SELECT id, timestamp, event_type, event_name, description, 
-                           zone_id, severity, metadata, image_path, thumbnail_base64
-                    FROM events
-                    WHERE event_name LIKE ? OR description LIKE ? OR zone_id LIKE ?
-                    ORDER BY timestamp DESC
-                    LIMIT ? OFFSET ?
-                ''', (f'%{search}%', f'%{search}%', f'%{search}%', limit, offset))
+        where = []
+        params: list = []
+        source = 'events e'
+        order_by = 'e.timestamp DESC, e.id DESC'
+        keyset = order != 'relevance' or not search
+        
+        if search:
+            match = build_match_query(search) if self.fts_enabled else None
+            if match:
+                source = 'events_fts JOIN events e ON e.id = events_fts.rowid'
+                where.append('events_fts MATCH ?')
+                params.append(match)
+                if not keyset:
+                    order_by = f'bm25(events_fts, {", ".join(map(str, FTS_WEIGHTS))}), e.timestamp DESC'
             else:
-                cursor = conn.execute('''
-                    SELECT id, timestamp, event_type, event_name, description, 
-                           zone_id, severity, metadata, image_path, thumbnail_base64
-                    FROM events
-                    ORDER BY timestamp DESC
-                    LIMIT ? OFFSET ?
-                ''', (limit, offset))
+                # Sin FTS5, o sin palabras que buscar (p. ej. "***"): LIKE en
+                # nombre, descripción y zona
+                where.append('(e.event_name LIKE ? OR e.description LIKE ? OR e.zone_id LIKE ?)')
+                params.extend([f'%{search}%'] * 3)
+        
+        for column, value in (('event_type', event_type), ('zone_id', zone_id), ('severity', severity)):
+            if value:
+                where.append(f'e.{column} = ?')
+                params.append(value)
+        if since:
+            where.append('e.timestamp >= datetime(?)')
+            params.append(since)
+        if until:
+            where.append('e.timestamp < datetime(?)')
+            params.append(until)
+        if cursor and keyset:
+            where.append('(e.timestamp, e.id) < (?, ?)')
+            params.extend(decode_cursor(cursor))
+            offset = 0
+        
+        with self._get_connection() as conn:
+            rows = conn.execute(f'''
+                SELECT e.id, e.timestamp, e.event_type, e.event_name, e.description,
+                       e.zone_id, e.severity, e.metadata, e.image_path, e.thumbnail_hash
+                FROM {source}
+                {'WHERE ' + ' AND '.join(where) if where else ''}
+                ORDER BY {order_by}
+                LIMIT ? OFFSET ?
+            ''', (*params, limit, offset)).fetchall()
             
             events = []
-            for row in cursor:
+            for row in rows:
                 # Formatear hora para el frontend
                 timestamp = datetime.fromisoformat(row['timestamp'])
                 
@@ -154,69 +789,125 @@ class EventLogger:
                     'zone_id': row['zone_id'],
                     'metadata': json.loads(row['metadata']) if row['metadata'] else None,
                     'image_path': row['image_path'],
-                    'thumbnail': row['thumbnail_base64'],
-                    'has_image': bool(row['image_path'] or row['thumbnail_base64'])
+                    'thumbnail_hash': row['thumbnail_hash'],
+                    'thumbnail_url': f"/api/thumbnails/{row['thumbnail_hash']}" if row['thumbnail_hash'] else None,
+                    'has_image': bool(row['image_path'] or row['thumbnail_hash'])
                 })
-                
-            return events
             
-    def get_events_by_type(self, event_type: str, limit: int = 50) -> List[Dict]:
-        """Obtiene eventos filtrados por tipo"""
+            next_cursor = None
+            if keyset and rows and len(rows) == limit:
+                next_cursor = encode_cursor(rows[-1]['timestamp'], rows[-1]['id'])
+            return {'events': events, 'next_cursor': next_cursor}
+    
+    def _get_events_by_column(self, column: str, value: str, limit: int, cursor: str = None) -> List[Dict]:
+        """Eventos con column = value, más nuevos primero (índice (column, timestamp))"""
+        keyset = ''
+        params: list = [value]
+        if cursor:
+            keyset = 'AND (timestamp, id) < (?, ?)'
+            params.extend(decode_cursor(cursor))
         with self._get_connection() as conn:
-            cursor = conn.execute('''
+            rows = conn.execute(f'''
                 SELECT * FROM events
-                WHERE event_type = ?
-                ORDER BY timestamp DESC
+                WHERE {column} = ? {keyset}
+                ORDER BY timestamp DESC, id DESC
                 LIMIT ?
-            ''', (event_type, limit))
+            ''', (*params, limit))
+            return [dict(row) for row in rows]
             
-            return [dict(row) for row in cursor]
-            
-    def get_events_by_zone(self, zone_id: str, limit: int = 50) -> List[Dict]:
-        """Obtiene eventos de una zona específica"""
-        with self._get_connection() as conn:
-            cursor = conn.execute('''
-                SELECT * FROM events
-                WHERE zone_id = ?
-                ORDER BY timestamp DESC
-                LIMIT ?
-            ''', (zone_id, limit))
+    def get_events_by_type(self, event_type: str, limit: int = 50, cursor: str = None) -> List[Dict]:
+        """
+        Obtiene eventos filtrados por tipo
+        
+        cursor: encode_cursor(timestamp, id) del último evento de la página anterior
+        """
+        return self._get_events_by_column('event_type', event_type, limit, cursor)
             
-            return [dict(row) for row in cursor]
+    def get_events_by_zone(self, zone_id: str, limit: int = 50, cursor: str = None) -> List[Dict]:
+        """
+        Obtiene eventos de una zona específica
+        
+        cursor: encode_cursor(timestamp, id) del último evento de la página anterior
+        """
+        return self._get_events_by_column('zone_id', zone_id, limit, cursor)
             
     def get_event_stats(self) -> Dict:
-        """Obtiene estadísticas de eventos"""
+        """Obtiene estadísticas de eventos (desde los agregados)"""
         with self._get_connection() as conn:
-            # Total de eventos
-            total = conn.execute('SELECT COUNT(*) as count FROM events').fetchone()['count']
-            
-            # Eventos por tipo
-            by_type = conn.execute('''
-                SELECT event_type, COUNT(*) as count
-                FROM events
-                GROUP BY event_type
-            ''').fetchall()
-            
-            # Eventos por severidad
-            by_severity = conn.execute('''
-                SELECT severity, COUNT(*) as count
-                FROM events
-                GROUP BY severity
+            rows = conn.execute('''
+                SELECT event_type, severity, SUM(count) as count
+                FROM events_rollup_daily
+                GROUP BY event_type, severity
             ''').fetchall()
             
-            # Eventos de las últimas 24 horas
+            # Eventos de las últimas 24 horas (24 buckets horarios)
             last_24h = conn.execute('''
-                SELECT COUNT(*) as count
-                FROM events
-                WHERE timestamp > datetime('now', '-1 day')
+                SELECT COALESCE(SUM(count), 0) as count
+                FROM events_rollup_hourly
+                WHERE bucket_start >= strftime('%Y-%m-%d %H:00:00', 'now', '-23 hours')
             ''').fetchone()['count']
+        
+        by_type: Dict[str, int] = {}
+        by_severity: Dict[str, int] = {}
+        for row in rows:
+            by_type[row['event_type']] = by_type.get(row['event_type'], 0) + row['count']
+        for row in rows:
+            by_severity[row['severity']] = by_severity.get(row['severity'], 0) + row['count']
+        
+        return {
+            'total': sum(by_type.values()),
+            'by_type': by_type,
+            'by_severity': by_severity,
+            'last_24h': last_24h
+        }
+    
+    def get_rollup(self, granularity: str = 'hour', since: str = None, until: str = None,
+                   zone_id: str = None, event_type: str = None, group_by: tuple = ()) -> List[Dict]:
+        """
+        Serie temporal de eventos desde los agregados
+        
+        Args:
+            granularity: 'hour' o 'day'
+            since: Desde esta fecha/hora ISO (UTC si no indica zona)
+            until: Hasta esta fecha/hora ISO (excluida)
+            zone_id: Filtrar por zona
+            event_type: Filtrar por tipo de evento
+            group_by: Columnas adicionales por las que desglosar
+                      ('zone_id', 'event_type', 'severity')
             
-            return {
-                'total': total,
-                'by_type': {row['event_type']: row['count'] for row in by_type},
-                'by_severity': {row['severity']: row['count'] for row in by_severity},
-                'last_24h': last_24h
-            }
+        Returns:
+            Lista de {'bucket_start', [columnas], 'count', 'duration_sum'}
+        """
+        table = {'hour': 'events_rollup_hourly', 'day': 'events_rollup_daily'}.get(granularity)
+        if table is None:
+            raise ValueError(f"Granularidad inválida: {granularity}")
+        columns = [c for c in group_by if c in ('zone_id', 'event_type', 'severity')]
+        
+        where = []
+        params: list = []
+        if since:
+            where.append("bucket_start >= " + ROLLUP_TABLES[table].format(ts='datetime(?)'))
+            params.append(since)
+        if until:
+            where.append('bucket_start < datetime(?)')
+            params.append(until)
+        if zone_id:
+            where.append('zone_id = ?')
+            params.append(zone_id)
+        if event_type:
+            where.append('event_type = ?')
+            params.append(event_type)
+        
+        select = ', '.join(['bucket_start', *columns])
+        with self._get_connection() as conn:
+            rows = conn.execute(f'''
+                SELECT {select}, SUM(count) as count, SUM(duration_sum) as duration_sum
+                FROM {table}
+                {'WHERE ' + ' AND '.join(where) if where else ''}
+                GROUP BY {select}
+                ORDER BY bucket_start
+            ''', params).fetchall()
+        return [dict(row) for row in rows]
             
     def get_events_by_hour(self, hour: int) -> List[Dict]:
         """
@@ -229,12 +920,13 @@ class EventLogger:
             Lista de eventos de esa hora
         """
         with self._get_connection() as conn:
+            # Rango sobre timestamp (usa idx_events_ts, sin strftime por fila)
             cursor = conn.execute('''
                 SELECT * FROM events
-                WHERE strftime('%H', timestamp) = ? 
-                AND date(timestamp) = date('now')
+                WHERE timestamp >= datetime('now', 'start of day', ? || ' hours')
+                AND timestamp < datetime('now', 'start of day', ? || ' hours')
                 ORDER BY timestamp DESC
-            ''', (str(hour).zfill(2),))
+            ''', (f'+{hour}', f'+{hour + 1}'))
             
             return [dict(row) for row in cursor]
     
@@ -249,13 +941,14 @@ class EventLogger:
             Diccionario con hora (0-23) como clave y cantidad de eventos como valor
         """
         with self._get_connection() as conn:
+            # Desde los agregados horarios: O(buckets) en lugar de O(eventos)
             cursor = conn.execute('''
-                SELECT strftime('%H', timestamp) as hour, COUNT(*) as count
-                FROM events
-                WHERE timestamp > datetime('now', '-{} days')
+                SELECT substr(bucket_start, 12, 2) as hour, SUM(count) as count
+                FROM events_rollup_hourly
+                WHERE bucket_start >= strftime('%Y-%m-%d %H:00:00', 'now', ?)
                 GROUP BY hour
                 ORDER BY hour
-            '''.format(days))
+            ''', (f'-{days * 24 - 1} hours',))
             
             # Inicializar todas las horas con 0
             hourly_stats = {i: 0 for i in range(24)}
@@ -274,6 +967,7 @@ class EventLogger:
                 DELETE FROM events
                 WHERE timestamp < datetime('now', '-{} days')
             '''.format(days))
+        self._notify(None)
             
 # Eventos predefinidos para fácil uso
 class EventTypes:
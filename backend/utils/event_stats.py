@@ -0,0 +1,150 @@
+"""
+Estadísticas de Eventos en Memoria
+Se siembran desde la base de datos al arrancar y se actualizan de forma
+incremental en cada log_event, de modo que el dashboard no recorre la
+tabla de eventos en cada consulta
+"""
+
+import logging
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Ventana de actividad reciente (igual que get_hourly_stats(days=1))
+WINDOW_SECONDS = 24 * 3600
+
+# Segundos entre re-siembras en workers de API: los eventos los escribe el
+# proceso de inferencia y no pasan por el listener de este proceso
+RESEED_SECONDS = 15
+
+
+class EventStatistics:
+    """
+    Contadores de eventos: totales históricos por tipo y severidad, y
+    buckets por minuto de las últimas 24 horas
+
+    Las horas se calculan en UTC, como los timestamps de la tabla events
+    (CURRENT_TIMESTAMP). Se puede llamar desde cualquier hilo.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.total = 0
+        self.by_type: Counter = Counter()
+        self.by_severity: Counter = Counter()
+        # minuto epoch → {event_type: count}
+        self._minutes: Dict[int, Counter] = {}
+        self.version = 0
+        self.seeded = False
+        self._event_logger = None
+
+    # ==================== SIEMBRA ====================
+
+    def attach(self, event_logger):
+        """Sembrar desde la base de datos y suscribirse a log_event (bloqueante)"""
+        self._event_logger = event_logger
+        self.seed()
+        event_logger.add_listener(self.record)
+
+    def seed(self):
+        """Recalcular todos los contadores desde la base de datos"""
+        if self._event_logger is None:
+            return
+        start = time.perf_counter()
+        with self._event_logger._get_connection() as conn:
+            # Totales históricos desde los agregados diarios (O(días))
+            by_type = conn.execute(
+                'SELECT event_type, severity, SUM(count) FROM events_rollup_daily GROUP BY event_type, severity'
+            ).fetchall()
+            recent = conn.execute('''
+                SELECT CAST(strftime('%s', timestamp) AS INTEGER) / 60 AS minute, event_type, COUNT(*)
+                FROM events
+                WHERE timestamp > datetime('now', '-1 day')
+                GROUP BY minute, event_type
+            ''').fetchall()
+
+        with self._lock:
+            self.total = 0
+            self.by_type = Counter()
+            self.by_severity = Counter()
+            for event_type, severity, count in by_type:
+                self.total += count
+                self.by_type[event_type] += count
+                self.by_severity[severity] += count
+            self._minutes = {}
+            for minute, event_type, count in recent:
+                self._minutes.setdefault(minute, Counter())[event_type] += count
+            self.version += 1
+            self.seeded = True
+
+        logger.info(f"Estadísticas de eventos sembradas: {self.total} eventos "
+                    f"en {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    # ==================== ACTUALIZACIÓN ====================
+
+    def record(self, event: Optional[Dict]):
+        """
+        Listener de EventLogger
+
+        Args:
+            event: Dict con 'event_type', 'severity' y 'timestamp' (epoch),
+                   o None si hubo un cambio masivo (p. ej. borrado) y hay
+                   que volver a sembrar
+        """
+        if event is None:
+            self.seed()
+            return
+
+        minute = int(event.get('timestamp', time.time())) // 60
+        with self._lock:
+            self.total += 1
+            self.by_type[event['event_type']] += 1
+            self.by_severity[event.get('severity') or 'info'] += 1
+            self._minutes.setdefault(minute, Counter())[event['event_type']] += 1
+            self.version += 1
+
+    def _prune(self, now: float):
+        """Descartar buckets fuera de la ventana (con el lock tomado)"""
+        oldest = int(now - WINDOW_SECONDS) // 60
+        for minute in [m for m in self._minutes if m <= oldest]:
+            del self._minutes[minute]
+
+    # ==================== CONSULTAS ====================
+
+    def get_event_stats(self) -> Dict:
+        """Mismo formato que EventLogger.get_event_stats"""
+        with self._lock:
+            self._prune(time.time())
+            return {
+                'total': self.total,
+                'by_type': dict(self.by_type),
+                'by_severity': dict(self.by_severity),
+                'last_24h': sum(sum(c.values()) for c in self._minutes.values())
+            }
+
+    def get_hourly_stats(self) -> Dict[int, int]:
+        """Eventos de las últimas 24 horas por hora UTC (como get_hourly_stats(days=1))"""
+        hourly = {i: 0 for i in range(24)}
+        with self._lock:
+            self._prune(time.time())
+            for minute, counts in self._minutes.items():
+                hour = datetime.fromtimestamp(minute * 60, tz=timezone.utc).hour
+                hourly[hour] += sum(counts.values())
+        return hourly
+
+    def get_recent_by_type(self) -> Dict[str, int]:
+        """Eventos de las últimas 24 horas por tipo"""
+        totals: Counter = Counter()
+        with self._lock:
+            self._prune(time.time())
+            for counts in self._minutes.values():
+                totals.update(counts)
+        return dict(totals)
+
+
+# Instancia global
+event_stats = EventStatistics()
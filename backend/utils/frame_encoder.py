@@ -0,0 +1,208 @@
+"""
+Codificación Compartida de Frames y Adaptación por Cliente
+Un JPEG por (cámara, frame, tier, calidad, overlay) compartido entre todos
+los clientes, y un controlador por cliente que elige tier y frame rate según
+la latencia de envío medida
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Optional, Tuple
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Tiers de codificación compartidos: nombre → escala de resolución
+ENCODE_TIERS: Dict[str, float] = {
+    'full': 1.0,
+    'half': 0.5,
+    'quarter': 0.25
+}
+TIER_ORDER = ('full', 'half', 'quarter')
+
+
+class SharedFrameEncoder:
+    """
+    Caché de JPEGs codificados por cámara
+
+    La clave incluye el número de secuencia del frame de la cámara, de modo
+    que N clientes viendo el mismo frame con el mismo tier y overlay pagan
+    una sola codificación. Solo se guardan las últimas entradas por cámara.
+    """
+
+    def __init__(self, max_entries_per_camera: int = 16):
+        self.max_entries = max_entries_per_camera
+        self._cache: Dict[str, "OrderedDict[Tuple, bytes]"] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def encode(self, camera_id: str, frame_seq: int, render: Callable[[], np.ndarray],
+               tier: str = 'full', quality: int = 70, overlay_key: Hashable = None,
+               width: Optional[int] = None) -> bytes:
+        """
+        Obtener el JPEG de un frame, codificándolo solo si no está en caché
+
+        Args:
+            camera_id: ID de la cámara
+            frame_seq: Secuencia del frame en la cámara (CameraStream.frame_count)
+            render: Devuelve el frame a codificar (ya anotado); solo se llama si falla la caché
+            tier: Tier de resolución (ver ENCODE_TIERS)
+            quality: Calidad JPEG
+            overlay_key: Firma de lo dibujado sobre el frame (detecciones, escala eco)
+            width: Ancho exacto de salida (manteniendo aspecto); sustituye al tier
+        """
+        key = (frame_seq, tier, int(quality), overlay_key, width)
+        with self._lock:
+            entries = self._cache.get(camera_id)
+            if entries is not None and key in entries:
+                entries.move_to_end(key)
+                self.hits += 1
+                return entries[key]
+
+        frame = render()
+        scale = ENCODE_TIERS.get(tier, 1.0)
+        if width:
+            scale = min(1.0, width / frame.shape[1])
+        if scale < 1.0:
+            height, width = frame.shape[:2]
+            size = (max(2, int(width * scale)) & ~1, max(2, int(height * scale)) & ~1)
+            frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+
+        ok, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, int(quality)])
+        if not ok:
+            raise RuntimeError(f"No se pudo codificar el frame de {camera_id}")
+        data = buffer.tobytes()
+
+        with self._lock:
+            self.misses += 1
+            entries = self._cache.setdefault(camera_id, OrderedDict())
+            entries[key] = data
+            while len(entries) > self.max_entries:
+                entries.popitem(last=False)
+        return data
+
+    def invalidate(self, camera_id: str):
+        """Olvidar los frames de una cámara (eliminada o reconfigurada)"""
+        with self._lock:
+            self._cache.pop(camera_id, None)
+
+    def get_metrics(self) -> dict:
+        """Aciertos de caché (codificaciones ahorradas)"""
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / total, 3) if total else 0.0,
+            'cameras': len(self._cache)
+        }
+
+
+class ViewerRateController:
+    """
+    Adapta tier y frame rate de un cliente según su latencia de envío
+
+    Si la latencia media supera high_ratio del intervalo entre frames se
+    baja primero el tier y después el frame rate; si cae por debajo de
+    low_ratio se recupera en orden inverso. Los cambios respetan un
+    cooldown para evitar oscilaciones.
+    """
+
+    def __init__(self, min_fps: float = 2.0, high_ratio: float = 0.8, low_ratio: float = 0.3,
+                 ema_alpha: float = 0.3, cooldown_seconds: float = 2.0,
+                 tiers: Tuple[str, ...] = TIER_ORDER, adaptive: bool = True):
+        self.adaptive = adaptive
+        self.min_fps = min_fps
+        self.high_ratio = high_ratio
+        self.low_ratio = low_ratio
+        self.ema_alpha = ema_alpha
+        self.cooldown_seconds = cooldown_seconds
+        self.tiers = tuple(t for t in tiers if t in ENCODE_TIERS) or ('full',)
+
+        self.tier_index = 0
+        self.fps_divisor = 1
+        self.latency_ema: Optional[float] = None
+        self.last_change = time.monotonic()
+
+        # Métricas
+        self.frames_sent = 0
+        self.frames_skipped = 0
+        self.bytes_sent = 0
+        self.max_latency = 0.0
+
+    @property
+    def tier(self) -> str:
+        return self.tiers[self.tier_index]
+
+    def frame_interval(self, base_interval: float) -> float:
+        """Intervalo entre frames para este cliente a partir del del Modo Eco"""
+        interval = base_interval * self.fps_divisor
+        return min(interval, max(base_interval, 1.0 / self.min_fps))
+
+    def record_skipped(self, count: int):
+        """Frames de la cámara que este cliente no recibió"""
+        if count > 0:
+            self.frames_skipped += count
+
+    def record_send(self, seconds: float, size: int, interval: float):
+        """
+        Registrar un envío y ajustar tier / frame rate
+
+        Args:
+            seconds: Duración del envío (incluye la espera por backpressure)
+            size: Bytes enviados
+            interval: Intervalo entre frames vigente para el cliente
+        """
+        self.frames_sent += 1
+        self.bytes_sent += size
+        self.max_latency = max(self.max_latency, seconds)
+        if self.latency_ema is None:
+            self.latency_ema = seconds
+        else:
+            self.latency_ema += self.ema_alpha * (seconds - self.latency_ema)
+
+        now = time.monotonic()
+        if not self.adaptive or now - self.last_change < self.cooldown_seconds:
+            return
+
+        if self.latency_ema > interval * self.high_ratio:
+            if self.tier_index < len(self.tiers) - 1:
+                self.tier_index += 1
+            elif interval < 1.0 / self.min_fps:
+                self.fps_divisor *= 2
+            else:
+                return
+            logger.debug(f"Cliente lento ({self.latency_ema * 1000:.0f} ms): "
+                         f"tier={self.tier}, fps/{self.fps_divisor}")
+            self.last_change = now
+
+        elif self.latency_ema < interval * self.low_ratio:
+            if self.fps_divisor > 1:
+                self.fps_divisor //= 2
+            elif self.tier_index > 0:
+                self.tier_index -= 1
+            else:
+                return
+            logger.debug(f"Cliente recuperado ({self.latency_ema * 1000:.0f} ms): "
+                         f"tier={self.tier}, fps/{self.fps_divisor}")
+            self.last_change = now
+
+    def get_metrics(self) -> dict:
+        """Estado de adaptación del cliente"""
+        return {
+            'tier': self.tier,
+            'fps_divisor': self.fps_divisor,
+            'latency_ms': round((self.latency_ema or 0.0) * 1000, 1),
+            'max_latency_ms': round(self.max_latency * 1000, 1),
+            'frames_sent': self.frames_sent,
+            'frames_skipped': self.frames_skipped,
+            'bytes_sent': self.bytes_sent
+        }
+
+
+# Instancia global
+frame_encoder = SharedFrameEncoder()
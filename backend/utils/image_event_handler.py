@@ -15,16 +15,16 @@ class ImageEventHandler:
         self.save_dir = save_dir
         os.makedirs(save_dir, exist_ok=True)
     
-    def capture_frame_thumbnail(self, frame: np.ndarray, max_size: Tuple[int, int] = (320, 240)) -> str:
+    def capture_frame_thumbnail_jpeg(self, frame: np.ndarray, max_size: Tuple[int, int] = (320, 240)) -> Optional[bytes]:
         """
-        Captura un frame y lo convierte a thumbnail base64
+        Captura un frame y lo convierte a thumbnail JPEG
         
         Args:
             frame: Frame de OpenCV (numpy array)
             max_size: Tamaño máximo del thumbnail (ancho, alto)
             
         Returns:
-            String base64 del thumbnail
+            Bytes JPEG del thumbnail
         """
         if frame is None:
             return None
@@ -36,16 +36,18 @@ class ImageEventHandler:
             # Crear thumbnail manteniendo aspecto
             image.thumbnail(max_size, Image.Resampling.LANCZOS)
             
-            # Convertir a base64
             buffer = io.BytesIO()
             image.save(buffer, format='JPEG', quality=70)
-            img_base64 = base64.b64encode(buffer.getvalue()).decode('utf-8')
-            
-            return img_base64
+            return buffer.getvalue()
         except Exception as e:
             print(f"Error creando thumbnail: {e}")
             return None
     
+    def capture_frame_thumbnail(self, frame: np.ndarray, max_size: Tuple[int, int] = (320, 240)) -> str:
+        """Igual que capture_frame_thumbnail_jpeg, pero en base64"""
+        data = self.capture_frame_thumbnail_jpeg(frame, max_size)
+        return base64.b64encode(data).decode('utf-8') if data else None
+    
     def save_event_image(self, frame: np.ndarray, event_id: int, event_type: str) -> Optional[str]:
         """
         Guarda la imagen completa del evento
@@ -0,0 +1,226 @@
+"""
+Escáner de Red Asíncrono para Cámaras IP
+Sondeos con asyncio.open_connection y límite de concurrencia, subredes
+configurables, resultados en streaming y caché con TTL por host
+"""
+
+import asyncio
+import ipaddress
+import logging
+import os
+import socket
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Indicadores de Hikvision en la respuesta HTTP (cabeceras o cuerpo)
+HIKVISION_INDICATORS = ('hikvision', 'hik', 'dvr', 'nvr', 'app-webs', 'dnvrs-webs')
+
+# Límite de hosts por escaneo (evita barrer una /16 por error)
+MAX_HOSTS = 4096
+
+
+@dataclass
+class HostResult:
+    """Resultado del sondeo de un host"""
+    ip: str
+    rtsp_open: bool
+    http_port: Optional[int] = None
+    confirmed_hikvision: bool = False
+    checked_at: float = field(default_factory=time.time)
+
+    def to_camera(self, rtsp_port: int, cached: bool = False) -> dict:
+        """Formato de cámara encontrada (compatible con /api/cameras/scan)"""
+        return {
+            "ip": self.ip,
+            "rtsp_port": rtsp_port,
+            "rtsp_open": self.rtsp_open,
+            "http_port": self.http_port,
+            "confirmed_hikvision": self.confirmed_hikvision,
+            "name": f"Cámara {self.ip}",
+            "cached": cached
+        }
+
+
+def get_local_network() -> ipaddress.IPv4Network:
+    """Red /24 de la interfaz con salida a internet (o 192.168.1.0/24)"""
+    try:
+        s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        s.connect(("8.8.8.8", 80))
+        local_ip = s.getsockname()[0]
+        s.close()
+        return ipaddress.ip_network(f"{local_ip}/24", strict=False)
+    except Exception:
+        return ipaddress.ip_network("192.168.1.0/24")
+
+
+def parse_networks(subnets: Optional[str] = None) -> List[ipaddress.IPv4Network]:
+    """
+    Subredes a escanear
+
+    Args:
+        subnets: Lista separada por comas ("192.168.1.0/24,10.0.5.0/25"); si
+                 no se indica se usa YOMJAI_SCAN_SUBNETS o la red local /24
+    """
+    subnets = subnets or os.environ.get('YOMJAI_SCAN_SUBNETS', '')
+    networks = [
+        ipaddress.ip_network(subnet.strip(), strict=False)
+        for subnet in subnets.split(',') if subnet.strip()
+    ]
+    return networks or [get_local_network()]
+
+
+class NetworkScanner:
+    """
+    Escáner asíncrono de puertos RTSP / HTTP
+
+    Un escaneo no bloquea el event loop: cada sondeo es una corrutina y un
+    semáforo limita las conexiones simultáneas. Los hosts sondeados hace
+    menos de cache_ttl segundos no se vuelven a sondear.
+    """
+
+    def __init__(self, concurrency: int = 128, connect_timeout: float = 0.5,
+                 http_timeout: float = 1.0, cache_ttl: float = 300.0,
+                 rtsp_port: int = 554, http_ports: Tuple[int, ...] = (80, 8080)):
+        self.concurrency = concurrency
+        self.connect_timeout = connect_timeout
+        self.http_timeout = http_timeout
+        self.cache_ttl = cache_ttl
+        self.rtsp_port = rtsp_port
+        self.http_ports = http_ports
+        self.cache: Dict[str, HostResult] = {}
+        self.scanning = False
+        self._scan_lock = asyncio.Lock()
+
+    async def _port_open(self, ip: str, port: int) -> bool:
+        """Comprobar si un puerto TCP acepta conexiones"""
+        try:
+            _, writer = await asyncio.wait_for(
+                asyncio.open_connection(ip, port), self.connect_timeout
+            )
+        except (OSError, asyncio.TimeoutError):
+            return False
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except OSError:
+            pass
+        return True
+
+    async def _check_hikvision_http(self, ip: str) -> Tuple[bool, Optional[int]]:
+        """Buscar indicadores de Hikvision en la página HTTP del dispositivo"""
+        first_open = None
+        for port in self.http_ports:
+            try:
+                reader, writer = await asyncio.wait_for(
+                    asyncio.open_connection(ip, port), self.connect_timeout
+                )
+            except (OSError, asyncio.TimeoutError):
+                continue
+
+            first_open = first_open or port
+            try:
+                writer.write(f"GET / HTTP/1.0\r\nHost: {ip}\r\n\r\n".encode())
+                await writer.drain()
+                response = await asyncio.wait_for(reader.read(65536), self.http_timeout)
+                if any(indicator in response.decode('latin-1').lower() for indicator in HIKVISION_INDICATORS):
+                    return True, port
+            except (OSError, asyncio.TimeoutError):
+                pass
+            finally:
+                writer.close()
+
+        return False, first_open
+
+    async def probe_host(self, ip: str) -> HostResult:
+        """Sondear un host: RTSP y, si está abierto, HTTP"""
+        if not await self._port_open(ip, self.rtsp_port):
+            return HostResult(ip=ip, rtsp_open=False)
+        is_hik, http_port = await self._check_hikvision_http(ip)
+        return HostResult(ip=ip, rtsp_open=True, http_port=http_port, confirmed_hikvision=is_hik)
+
+    def _fresh(self, ip: str, now: float) -> Optional[HostResult]:
+        result = self.cache.get(ip)
+        if result and now - result.checked_at < self.cache_ttl:
+            return result
+        return None
+
+    async def scan(self, networks: List[ipaddress.IPv4Network], force: bool = False,
+                   on_found: Optional[Callable[[dict], Awaitable[None]]] = None,
+                   on_progress: Optional[Callable[[int, int], Awaitable[None]]] = None) -> dict:
+        """
+        Escanear subredes
+
+        Args:
+            networks: Subredes a escanear
+            force: Ignorar la caché y sondear todos los hosts
+            on_found: Corrutina llamada con cada cámara en cuanto se encuentra
+            on_progress: Corrutina llamada con (sondeados, total) periódicamente
+
+        Returns:
+            Dict con 'cameras', 'networks', 'total_hosts', 'probed', 'cached'
+        """
+        # Comprobar el tamaño antes de generar la lista (una /8 son 16M hosts)
+        if sum(network.num_addresses for network in networks) > MAX_HOSTS:
+            raise ValueError(f"Demasiados hosts para escanear (máximo {MAX_HOSTS})")
+        hosts = [str(ip) for network in networks for ip in network.hosts()]
+
+        async with self._scan_lock:
+            self.scanning = True
+            start = time.time()
+            cameras: List[dict] = []
+            semaphore = asyncio.Semaphore(self.concurrency)
+            done = 0
+            probed = 0
+
+            async def report(camera: dict):
+                cameras.append(camera)
+                if on_found:
+                    await on_found(camera)
+
+            # Hosts con resultado reciente: no se vuelven a sondear
+            pending = []
+            for ip in hosts:
+                cached = None if force else self._fresh(ip, start)
+                if cached is None:
+                    pending.append(ip)
+                    continue
+                done += 1
+                if cached.rtsp_open:
+                    await report(cached.to_camera(self.rtsp_port, cached=True))
+
+            async def probe(ip: str):
+                nonlocal done, probed
+                async with semaphore:
+                    result = await self.probe_host(ip)
+                self.cache[ip] = result
+                done += 1
+                probed += 1
+                if result.rtsp_open:
+                    logger.info(f"Cámara encontrada en {ip}")
+                    await report(result.to_camera(self.rtsp_port))
+                if on_progress and (done % 32 == 0 or done == len(hosts)):
+                    await on_progress(done, len(hosts))
+
+            try:
+                await asyncio.gather(*(probe(ip) for ip in pending))
+            finally:
+                self.scanning = False
+
+            elapsed = time.time() - start
+            logger.info(f"Escaneo completado en {elapsed:.1f}s: {len(cameras)} cámaras, "
+                        f"{probed} hosts sondeados, {len(hosts) - probed} desde caché")
+            return {
+                "cameras": sorted(cameras, key=lambda c: ipaddress.ip_address(c['ip'])),
+                "networks": [str(network) for network in networks],
+                "total_hosts": len(hosts),
+                "probed": probed,
+                "cached": len(hosts) - probed,
+                "elapsed_seconds": round(elapsed, 2)
+            }
+
+
+# Instancia global
+network_scanner = NetworkScanner()
@@ -0,0 +1,311 @@
+"""
+Retención de Eventos
+Borrado por lotes con plazos por severidad, archivo mensual comprimido de
+lo que se borra, limpieza de imágenes y thumbnails huérfanos y
+recuperación de espacio con incremental_vacuum
+"""
+
+import gzip
+import json
+import logging
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Días que se conserva cada severidad (el resto usa default_days)
+DEFAULT_DAYS_BY_SEVERITY = {
+    'critical': 365,
+    'error': 180,
+    'warning': 90,
+    'info': 30,
+    'success': 30,
+}
+
+# Páginas liberadas por cada PRAGMA incremental_vacuum (4 MB con páginas de 4 KB)
+VACUUM_PAGES_PER_STEP = 1024
+
+# Formato de TIMESTAMP_FORMAT de event_logger (UTC)
+_TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+class RetentionEngine:
+    """
+    Motor de retención de la base de datos de eventos
+
+    Cada lote se borra en su propia transacción corta y entre lotes se cede
+    la base de datos, de modo que el escritor de eventos no se bloquea.
+    Los agregados (events_rollup_*) no se tocan: son el histórico.
+    """
+
+    def __init__(self, event_logger, days_by_severity: Optional[Dict[str, int]] = None,
+                 default_days: int = 30, batch_size: int = 500, batch_pause: float = 0.05,
+                 archive: bool = True,
+                 archive_dir: str = "/Users/Shared/yolo11_project/database/archive",
+                 archive_keep_months: int = 24,
+                 images_dir: str = "/Users/Shared/yolo11_project/event_images",
+                 interval_hours: float = 6.0):
+        """
+        Args:
+            event_logger: EventLogger cuya base de datos se mantiene
+            days_by_severity: Días de retención por severidad
+            default_days: Días para severidades no listadas
+            batch_size: Eventos por transacción de borrado
+            batch_pause: Segundos de pausa entre lotes
+            archive: Guardar los eventos borrados en archivos mensuales .jsonl.gz
+            archive_dir: Directorio de los archivos
+            archive_keep_months: Meses de archivos que se conservan (0 = todos)
+            images_dir: Directorio de imágenes de eventos
+            interval_hours: Horas entre ejecuciones programadas
+        """
+        self.event_logger = event_logger
+        self.days_by_severity = dict(days_by_severity or DEFAULT_DAYS_BY_SEVERITY)
+        self.default_days = default_days
+        self.batch_size = batch_size
+        self.batch_pause = batch_pause
+        self.archive = archive
+        self.archive_dir = Path(archive_dir)
+        self.archive_keep_months = archive_keep_months
+        self.images_dir = Path(images_dir)
+        self.interval_hours = interval_hours
+
+        self.running = False
+        self.last_run: Optional[Dict] = None
+
+    # ==================== EJECUCIÓN ====================
+
+    def run_once(self) -> Dict:
+        """
+        Ejecutar una pasada completa de retención (bloqueante, usar en executor)
+
+        Returns:
+            Resumen con eventos borrados y archivados, imágenes, thumbnails,
+            archivos antiguos eliminados y páginas recuperadas
+        """
+        if self.running:
+            return {'skipped': True, 'reason': 'ya en ejecución'}
+        self.running = True
+        start = time.time()
+        summary = {
+            'events_deleted': 0,
+            'events_archived': 0,
+            'images_deleted': 0,
+            'thumbnails_deleted': 0,
+            'archives_deleted': 0,
+            'pages_freed': 0,
+        }
+        try:
+            now = datetime.now(timezone.utc)
+            for severity, cutoff in self._cutoffs(now):
+                deleted, archived, images = self._purge(severity, cutoff)
+                summary['events_deleted'] += deleted
+                summary['events_archived'] += archived
+                summary['images_deleted'] += images
+
+            summary['thumbnails_deleted'] = self._purge_orphan_thumbnails()
+            summary['images_deleted'] += self._purge_orphan_images(now)
+            summary['archives_deleted'] = self._purge_old_archives(now)
+            summary['pages_freed'] = self._reclaim_space()
+
+            if summary['events_deleted']:
+                # Los contadores en memoria se vuelven a sembrar
+                self.event_logger._notify(None)
+        except Exception as e:
+            logger.error(f"Error en retención de eventos: {e}")
+            summary['error'] = str(e)
+        finally:
+            self.running = False
+
+        summary['elapsed_seconds'] = round(time.time() - start, 2)
+        summary['finished_at'] = datetime.now(timezone.utc).isoformat()
+        self.last_run = summary
+        logger.info(f"Retención de eventos: {summary}")
+        return summary
+
+    def _cutoffs(self, now: datetime) -> List[tuple]:
+        """(severidad o None para el resto, timestamp límite)"""
+        cutoffs = [
+            (severity, (now - timedelta(days=days)).strftime(_TIMESTAMP_FORMAT))
+            for severity, days in self.days_by_severity.items()
+        ]
+        cutoffs.append((None, (now - timedelta(days=self.default_days)).strftime(_TIMESTAMP_FORMAT)))
+        return cutoffs
+
+    # ==================== EVENTOS ====================
+
+    def _purge(self, severity: Optional[str], cutoff: str) -> tuple:
+        """Borrar por lotes los eventos de una severidad anteriores a cutoff"""
+        if severity is None:
+            placeholders = ', '.join('?' for _ in self.days_by_severity)
+            condition = f"(severity IS NULL OR severity NOT IN ({placeholders}))" if placeholders else '1'
+            params = list(self.days_by_severity)
+        else:
+            condition = 'severity = ?'
+            params = [severity]
+
+        deleted = archived = images = 0
+        while True:
+            with self.event_logger._get_connection() as conn:
+                rows = conn.execute(f'''
+                    SELECT id, timestamp, event_type, event_name, description, zone_id,
+                           severity, metadata, image_path, thumbnail_hash
+                    FROM events
+                    WHERE {condition} AND timestamp < ?
+                    ORDER BY timestamp
+                    LIMIT ?
+                ''', (*params, cutoff, self.batch_size)).fetchall()
+                if not rows:
+                    break
+
+                # Archivar antes de borrar: si falla, no se borra nada
+                if self.archive:
+                    archived += self._archive_rows([dict(row) for row in rows])
+                conn.executemany('DELETE FROM events WHERE id = ?', [(row['id'],) for row in rows])
+
+            deleted += len(rows)
+            images += self._delete_images([row['image_path'] for row in rows if row['image_path']])
+            if len(rows) < self.batch_size:
+                break
+            time.sleep(self.batch_pause)
+
+        if deleted:
+            logger.info(f"Retención: {deleted} eventos '{severity or 'otros'}' anteriores a {cutoff} borrados")
+        return deleted, archived, images
+
+    def _archive_rows(self, rows: List[Dict]) -> int:
+        """Añadir eventos al archivo comprimido de su mes (events-AAAA-MM.jsonl.gz)"""
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        by_month: Dict[str, List[Dict]] = {}
+        for row in rows:
+            by_month.setdefault(row['timestamp'][:7], []).append(row)
+
+        for month, month_rows in by_month.items():
+            # Cada append es un miembro gzip nuevo; gzip.open los lee como uno solo
+            with gzip.open(self.archive_dir / f'events-{month}.jsonl.gz', 'at', encoding='utf-8') as archive:
+                for row in month_rows:
+                    archive.write(json.dumps(row, ensure_ascii=False) + '\n')
+        return len(rows)
+
+    # ==================== IMÁGENES Y THUMBNAILS ====================
+
+    def _delete_images(self, paths: List[str]) -> int:
+        """Borrar imágenes de eventos (solo dentro de images_dir)"""
+        deleted = 0
+        root = self.images_dir.resolve()
+        for path in paths:
+            file_path = Path(path).resolve()
+            if root not in file_path.parents:
+                continue
+            try:
+                file_path.unlink()
+                deleted += 1
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning(f"No se pudo borrar {file_path}: {e}")
+        return deleted
+
+    def _purge_orphan_thumbnails(self) -> int:
+        """Borrar por lotes los thumbnails que ya no referencia ningún evento"""
+        deleted = 0
+        while True:
+            with self.event_logger._get_connection() as conn:
+                cursor = conn.execute('''
+                    DELETE FROM thumbnails WHERE hash IN (
+                        SELECT t.hash FROM thumbnails t
+                        WHERE NOT EXISTS (SELECT 1 FROM events e WHERE e.thumbnail_hash = t.hash)
+                        LIMIT ?
+                    )
+                ''', (self.batch_size,))
+            deleted += cursor.rowcount
+            if cursor.rowcount < self.batch_size:
+                return deleted
+            time.sleep(self.batch_pause)
+
+    def _purge_orphan_images(self, now: datetime) -> int:
+        """
+        Borrar imágenes más antiguas que la retención más larga que ningún
+        evento referencia (p. ej. de eventos borrados a mano)
+        """
+        if not self.images_dir.is_dir():
+            return 0
+        max_days = max([self.default_days, *self.days_by_severity.values()])
+        oldest = (now - timedelta(days=max_days)).timestamp()
+        candidates = [
+            entry.path for entry in os.scandir(self.images_dir)
+            if entry.is_file() and entry.stat().st_mtime < oldest
+        ]
+        if not candidates:
+            return 0
+
+        with self.event_logger._get_connection() as conn:
+            referenced = {
+                row[0] for row in conn.execute('SELECT image_path FROM events WHERE image_path IS NOT NULL')
+            }
+        return self._delete_images([path for path in candidates if path not in referenced])
+
+    def _purge_old_archives(self, now: datetime) -> int:
+        """Borrar archivos mensuales más antiguos que archive_keep_months"""
+        if not self.archive_keep_months or not self.archive_dir.is_dir():
+            return 0
+        month_index = now.year * 12 + now.month - 1 - self.archive_keep_months
+        oldest = f'{month_index // 12:04d}-{month_index % 12 + 1:02d}'
+        deleted = 0
+        for path in self.archive_dir.glob('events-*.jsonl.gz'):
+            if path.name[len('events-'):len('events-') + 7] < oldest:
+                path.unlink()
+                deleted += 1
+        return deleted
+
+    # ==================== ESPACIO ====================
+
+    def _reclaim_space(self) -> int:
+        """
+        Devolver al sistema las páginas libres (incremental_vacuum) y
+        truncar el WAL
+
+        Las bases creadas antes de auto_vacuum=INCREMENTAL no liberan
+        páginas hasta que se convierten al arrancar
+        (EventLogger.enable_incremental_vacuum); aquí nunca se hace un
+        VACUUM completo, que bloquearía al escritor de eventos.
+        """
+        freed = 0
+        with self.event_logger._get_connection() as conn:
+            incremental = conn.execute('PRAGMA auto_vacuum').fetchone()[0] == 2
+        if not incremental:
+            # incremental_vacuum no hace nada en este modo: el bucle no acabaría
+            logger.warning("auto_vacuum incremental no activo en la base de eventos; "
+                           "se activará en el próximo arranque")
+
+        while incremental:
+            with self.event_logger._get_connection() as conn:
+                free = conn.execute('PRAGMA freelist_count').fetchone()[0]
+                if not free:
+                    break
+                step = min(free, VACUUM_PAGES_PER_STEP)
+                conn.execute(f'PRAGMA incremental_vacuum({step})').fetchall()
+                remaining = conn.execute('PRAGMA freelist_count').fetchone()[0]
+            if remaining >= free:
+                logger.warning(f"incremental_vacuum no liberó páginas ({free} libres)")
+                break
+            freed += free - remaining
+            time.sleep(self.batch_pause)
+
+        with self.event_logger._get_connection() as conn:
+            conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        return freed
+
+    def get_status(self) -> Dict:
+        """Configuración y resultado de la última ejecución"""
+        return {
+            'running': self.running,
+            'interval_hours': self.interval_hours,
+            'days_by_severity': self.days_by_severity,
+            'default_days': self.default_days,
+            'archive': self.archive,
+            'archive_dir': str(self.archive_dir),
+            'last_run': self.last_run,
+        }
@@ -0,0 +1,150 @@
+"""
+Pool de Conexiones SQLite
+Una conexión persistente por hilo (y por proceso) con WAL y PRAGMAs
+ajustados, en lugar de abrir y cerrar una conexión en cada operación
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# PRAGMAs por defecto: lectores y escritor no se bloquean (WAL), fsync solo
+# en checkpoints (NORMAL), lecturas por mmap y 16 MB de caché de páginas
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -16000,
+    'temp_store': 'MEMORY',
+}
+
+
+class SQLitePool:
+    """
+    Conexiones SQLite persistentes, una por hilo
+
+    sqlite3 no permite compartir una conexión entre hilos sin serializar,
+    así que cada hilo (event loop, executors, workers) mantiene la suya.
+    Las sentencias preparadas se reutilizan vía cached_statements. Las
+    conexiones de hilos terminados se cierran al crear nuevas.
+    """
+
+    def __init__(self, db_path: str, row_factory=sqlite3.Row, foreign_keys: bool = False,
+                 pragmas: Optional[Dict] = None, cached_statements: int = 256,
+                 timeout: float = 5.0):
+        """
+        Args:
+            db_path: Ruta de la base de datos
+            row_factory: row_factory de las conexiones (None para tuplas)
+            foreign_keys: Activar PRAGMA foreign_keys
+            pragmas: PRAGMAs adicionales o que sustituyen a DEFAULT_PRAGMAS
+            cached_statements: Sentencias preparadas cacheadas por conexión
+            timeout: Segundos de espera si la base de datos está bloqueada
+        """
+        self.db_path = db_path
+        self.row_factory = row_factory
+        self.foreign_keys = foreign_keys
+        # Los PRAGMAs propios van primero: auto_vacuum debe fijarse antes de
+        # que journal_mode=WAL inicialice una base nueva
+        pragmas = dict(pragmas or {})
+        self.pragmas = {**pragmas, **{k: v for k, v in DEFAULT_PRAGMAS.items() if k not in pragmas}}
+        self.cached_statements = cached_statements
+        self.timeout = timeout
+        self._local = threading.local()
+        self._connections: Dict[Tuple[int, int], sqlite3.Connection] = {}
+        self._lock = threading.Lock()
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.timeout,
+            cached_statements=self.cached_statements,
+            check_same_thread=False  # close_all() puede cerrarla desde otro hilo
+        )
+        if self.row_factory is not None:
+            conn.row_factory = self.row_factory
+        for name, value in self.pragmas.items():
+            conn.execute(f'PRAGMA {name}={value}')
+        if self.foreign_keys:
+            conn.execute('PRAGMA foreign_keys = ON')
+        return conn
+
+    def _acquire(self) -> sqlite3.Connection:
+        """Conexión del hilo actual (se crea la primera vez)"""
+        key = (os.getpid(), threading.get_ident())
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and getattr(self._local, 'key', None) == key:
+            return conn
+
+        # Primera vez en este hilo, o proceso hijo tras un fork
+        conn = self._connect()
+        self._local.conn = conn
+        self._local.key = key
+        self._local.depth = 0
+        with self._lock:
+            self._prune_dead_threads()
+            self._connections[key] = conn
+        return conn
+
+    def _prune_dead_threads(self):
+        """Cerrar conexiones de hilos que ya terminaron (con el lock tomado)"""
+        pid = os.getpid()
+        alive = {thread.ident for thread in threading.enumerate()}
+        for key in [k for k in self._connections if k[0] != pid or k[1] not in alive]:
+            conn = self._connections.pop(key)
+            if key[0] == pid:
+                try:
+                    conn.close()
+                except sqlite3.Error:
+                    pass
+
+    @contextmanager
+    def connection(self):
+        """
+        Conexión del hilo con commit al salir y rollback si hay excepción
+
+        Los usos anidados en el mismo hilo comparten la transacción; solo
+        el nivel exterior hace commit o rollback.
+        """
+        conn = self._acquire()
+        self._local.depth += 1
+        try:
+            yield conn
+            if self._local.depth == 1:
+                conn.commit()
+        except Exception:
+            if self._local.depth == 1:
+                conn.rollback()
+            raise
+        finally:
+            self._local.depth -= 1
+
+    def close_all(self):
+        """Cerrar todas las conexiones del proceso (apagado)"""
+        pid = os.getpid()
+        with self._lock:
+            for key, conn in list(self._connections.items()):
+                if key[0] == pid:
+                    try:
+                        conn.close()
+                    except sqlite3.Error:
+                        pass
+            self._connections.clear()
+        self._local = threading.local()
+
+    def get_status(self) -> dict:
+        """Conexiones abiertas y PRAGMAs aplicados"""
+        with self._lock:
+            open_connections = sum(1 for key in self._connections if key[0] == os.getpid())
+        return {
+            'db_path': self.db_path,
+            'connections': open_connections,
+            'pragmas': dict(self.pragmas)
+        }
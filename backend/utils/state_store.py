@@ -0,0 +1,371 @@
+"""
+Almacén de Estado Compartido para YOMJAI
+Permite separar workers de inferencia y de API en procesos distintos:
+los timers se replican de forma atómica y los cambios/comandos viajan
+por pub/sub
+
+Implementaciones:
+- memory: en proceso (comportamiento actual, un solo worker)
+- sqlite: archivo local en modo WAL, pub/sub por tabla outbox
+- redis:  servidor Redis (perfil 'cache' de docker-compose), requiere redis-py
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Canales de pub/sub
+CHANNEL_TIMERS = "timers"
+CHANNEL_COMMANDS = "alerts.commands"
+
+# Roles de proceso (YOMJAI_ROLE)
+ROLE_ALL = "all"              # Inferencia + API (un solo worker, por defecto)
+ROLE_INFERENCE = "inference"  # Cámaras, YOLO y AlertManager
+ROLE_API = "api"              # REST/WebSocket leyendo del almacén compartido
+
+
+class StateStore(ABC):
+    """
+    Interfaz del almacén de estado
+
+    apply_timer_change() aplica un cambio de timer (mismo formato que
+    AlertManager._emit_timer_change), guarda la versión y lo publica en
+    CHANNEL_TIMERS en una sola operación atómica.
+    """
+
+    # Indica si el estado es visible desde otros procesos
+    shared = False
+
+    def __init__(self):
+        self._subscribers: Dict[str, List[tuple]] = {}
+        self._lock = threading.Lock()
+
+    # ---- Timers ----
+
+    @abstractmethod
+    def apply_timer_change(self, change: Dict):
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_timers(self) -> List[Dict]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_timer_version(self) -> int:
+        raise NotImplementedError
+
+    # ---- Pub/Sub ----
+
+    @abstractmethod
+    def publish(self, channel: str, message: Dict):
+        raise NotImplementedError
+
+    def subscribe(self, channel: str) -> asyncio.Queue:
+        """Suscribirse a un canal; los mensajes llegan a la cola en el loop actual"""
+        queue = asyncio.Queue()
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            self._subscribers.setdefault(channel, []).append((loop, queue))
+        self._on_subscribe(channel)
+        return queue
+
+    def unsubscribe(self, channel: str, queue: asyncio.Queue):
+        """Cancelar una suscripción"""
+        with self._lock:
+            self._subscribers[channel] = [
+                entry for entry in self._subscribers.get(channel, []) if entry[1] is not queue
+            ]
+
+    def _on_subscribe(self, channel: str):
+        """Hook para implementaciones que necesitan arrancar un listener"""
+
+    def _deliver(self, channel: str, message: Dict):
+        """Entregar un mensaje a los suscriptores locales (seguro desde cualquier thread)"""
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, []))
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, message)
+            except RuntimeError:
+                # Loop cerrado: descartar suscriptor
+                self.unsubscribe(channel, queue)
+
+    def close(self):
+        """Liberar recursos"""
+
+
+def _apply_change_to_dict(timers: Dict[str, Dict], change: Dict):
+    """Aplicar un cambio de timer a un diccionario door_id → timer"""
+    event = change.get('event')
+    if event == 'cancelled':
+        timers.pop(change.get('door_id'), None)
+    elif event == 'cleared':
+        timers.clear()
+    elif change.get('timer'):
+        timers[change['door_id']] = change['timer']
+
+
+class InMemoryStateStore(StateStore):
+    """Almacén en proceso (un único worker)"""
+
+    shared = False
+
+    def __init__(self):
+        super().__init__()
+        self._timers: Dict[str, Dict] = {}
+        self._version = 0
+
+    def apply_timer_change(self, change: Dict):
+        with self._lock:
+            _apply_change_to_dict(self._timers, change)
+            self._version = change.get('version', self._version + 1)
+        self._deliver(CHANNEL_TIMERS, change)
+
+    def get_timers(self) -> List[Dict]:
+        with self._lock:
+            return list(self._timers.values())
+
+    def get_timer_version(self) -> int:
+        return self._version
+
+    def publish(self, channel: str, message: Dict):
+        self._deliver(channel, message)
+
+
+class SQLiteStateStore(StateStore):
+    """
+    Almacén compartido en SQLite (WAL) para procesos de la misma máquina
+
+    Las escrituras usan BEGIN IMMEDIATE; el pub/sub se implementa con una
+    tabla outbox que cada proceso sondea desde un thread propio.
+    """
+
+    shared = True
+
+    def __init__(self, db_path: str = "/Users/Shared/yolo11_project/database/yomjai_state.db",
+                 poll_interval: float = 0.1, retention_seconds: float = 60.0):
+        super().__init__()
+        self.db_path = db_path
+        self.poll_interval = poll_interval
+        self.retention_seconds = retention_seconds
+        self._poller: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._init_database()
+
+    def _init_database(self):
+        """Crear tablas de estado y outbox"""
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+
+        with self._get_connection() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS timers (
+                    door_id TEXT PRIMARY KEY,
+                    data TEXT NOT NULL
+                )
+            ''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS kv (
+                    key TEXT PRIMARY KEY,
+                    value TEXT
+                )
+            ''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS outbox (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    channel TEXT NOT NULL,
+                    message TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+            ''')
+
+    @contextmanager
+    def _get_connection(self):
+        """Context manager para conexiones a la base de datos"""
+        conn = sqlite3.connect(self.db_path, timeout=5.0)
+        conn.execute('PRAGMA synchronous=NORMAL')
+        try:
+            yield conn
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            raise e
+        finally:
+            conn.close()
+
+    def _insert_outbox(self, conn, channel: str, message: Dict):
+        conn.execute(
+            'INSERT INTO outbox (channel, message, created_at) VALUES (?, ?, ?)',
+            (channel, json.dumps(message), time.time())
+        )
+
+    def apply_timer_change(self, change: Dict):
+        event = change.get('event')
+        with self._get_connection() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            if event == 'cancelled':
+                conn.execute('DELETE FROM timers WHERE door_id = ?', (change.get('door_id'),))
+            elif event == 'cleared':
+                conn.execute('DELETE FROM timers')
+            elif change.get('timer'):
+                conn.execute(
+                    'INSERT OR REPLACE INTO timers (door_id, data) VALUES (?, ?)',
+                    (change['door_id'], json.dumps(change['timer']))
+                )
+            conn.execute(
+                "INSERT OR REPLACE INTO kv (key, value) VALUES ('timer_version', ?)",
+                (json.dumps(change.get('version', 0)),)
+            )
+            self._insert_outbox(conn, CHANNEL_TIMERS, change)
+
+    def get_timers(self) -> List[Dict]:
+        with self._get_connection() as conn:
+            return [json.loads(row[0]) for row in conn.execute('SELECT data FROM timers')]
+
+    def get_timer_version(self) -> int:
+        with self._get_connection() as conn:
+            row = conn.execute("SELECT value FROM kv WHERE key = 'timer_version'").fetchone()
+        return json.loads(row[0]) if row else 0
+
+    def publish(self, channel: str, message: Dict):
+        with self._get_connection() as conn:
+            self._insert_outbox(conn, channel, message)
+
+    def _on_subscribe(self, channel: str):
+        """Arrancar el thread de sondeo del outbox (uno por proceso)"""
+        with self._lock:
+            if self._poller is not None:
+                return
+            self._poller = threading.Thread(target=self._poll_outbox, daemon=True)
+        self._poller.start()
+
+    def _poll_outbox(self):
+        """Leer mensajes nuevos del outbox y entregarlos a los suscriptores"""
+        with self._get_connection() as conn:
+            row = conn.execute('SELECT MAX(id) FROM outbox').fetchone()
+        last_id = row[0] or 0
+        last_prune = time.time()
+
+        while not self._stop.wait(self.poll_interval):
+            try:
+                with self._get_connection() as conn:
+                    rows = conn.execute(
+                        'SELECT id, channel, message FROM outbox WHERE id > ? ORDER BY id',
+                        (last_id,)
+                    ).fetchall()
+
+                    # Limpiar mensajes antiguos (cualquier proceso puede hacerlo)
+                    if time.time() - last_prune > 10:
+                        conn.execute('DELETE FROM outbox WHERE created_at < ?',
+                                     (time.time() - self.retention_seconds,))
+                        last_prune = time.time()
+
+                for message_id, channel, message in rows:
+                    last_id = message_id
+                    self._deliver(channel, json.loads(message))
+            except Exception as e:
+                logger.error(f"Error leyendo outbox de estado: {e}")
+
+    def close(self):
+        self._stop.set()
+
+
+class RedisStateStore(StateStore):
+    """Almacén compartido en Redis (varios hosts)"""
+
+    shared = True
+
+    def __init__(self, url: str = "redis://localhost:6379/0", prefix: str = "yomjai"):
+        super().__init__()
+        import redis  # Dependencia opcional
+
+        self._redis = redis.Redis.from_url(url, decode_responses=True)
+        self._prefix = prefix
+        self._pubsub = None
+        self._pubsub_thread = None
+
+    def _key(self, name: str) -> str:
+        return f"{self._prefix}:{name}"
+
+    def apply_timer_change(self, change: Dict):
+        event = change.get('event')
+        pipe = self._redis.pipeline(transaction=True)
+        if event == 'cancelled':
+            pipe.hdel(self._key('timers'), change.get('door_id'))
+        elif event == 'cleared':
+            pipe.delete(self._key('timers'))
+        elif change.get('timer'):
+            pipe.hset(self._key('timers'), change['door_id'], json.dumps(change['timer']))
+        pipe.set(self._key('timer_version'), change.get('version', 0))
+        pipe.publish(self._key(CHANNEL_TIMERS), json.dumps(change))
+        pipe.execute()
+
+    def get_timers(self) -> List[Dict]:
+        return [json.loads(value) for value in self._redis.hvals(self._key('timers'))]
+
+    def get_timer_version(self) -> int:
+        return int(self._redis.get(self._key('timer_version')) or 0)
+
+    def publish(self, channel: str, message: Dict):
+        self._redis.publish(self._key(channel), json.dumps(message))
+
+    def _on_subscribe(self, channel: str):
+        """Suscribir el canal en el listener de Redis (thread propio)"""
+        def handler(raw):
+            self._deliver(channel, json.loads(raw['data']))
+
+        with self._lock:
+            if self._pubsub is None:
+                self._pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+                self._pubsub.subscribe(**{self._key(channel): handler})
+                self._pubsub_thread = self._pubsub.run_in_thread(sleep_time=0.01, daemon=True)
+            else:
+                self._pubsub.subscribe(**{self._key(channel): handler})
+
+    def close(self):
+        if self._pubsub_thread:
+            self._pubsub_thread.stop()
+
+
+def get_process_role() -> str:
+    """Rol de este proceso según YOMJAI_ROLE (all, inference, api)"""
+    role = os.environ.get('YOMJAI_ROLE', ROLE_ALL).lower()
+    if role not in (ROLE_ALL, ROLE_INFERENCE, ROLE_API):
+        logger.warning(f"YOMJAI_ROLE desconocido '{role}', usando '{ROLE_ALL}'")
+        role = ROLE_ALL
+    return role
+
+
+def create_state_store(backend: Optional[str] = None) -> StateStore:
+    """
+    Crear el almacén según YOMJAI_STATE_STORE (memory, sqlite, redis)
+
+    Variables opcionales: YOMJAI_STATE_DB (ruta SQLite) y YOMJAI_REDIS_URL
+    """
+    backend = (backend or os.environ.get('YOMJAI_STATE_STORE', 'memory')).lower()
+
+    if backend == 'sqlite':
+        db_path = os.environ.get('YOMJAI_STATE_DB', "/Users/Shared/yolo11_project/database/yomjai_state.db")
+        logger.info(f"Almacén de estado compartido: SQLite ({db_path})")
+        return SQLiteStateStore(db_path)
+
+    if backend == 'redis':
+        url = os.environ.get('YOMJAI_REDIS_URL', "redis://localhost:6379/0")
+        try:
+            store = RedisStateStore(url)
+            logger.info(f"Almacén de estado compartido: Redis ({url})")
+            return store
+        except ImportError:
+            logger.error("redis-py no instalado, usando almacén en memoria")
+
+    return InMemoryStateStore()
@@ -0,0 +1,189 @@
+"""
+Protocolo Binario v2 del Stream de Cámaras
+Cabecera fija de 16 bytes + detecciones empaquetadas + JPEG. El estado de
+zonas y del Modo Eco solo viaja cuando cambia, así que el coste por frame
+baja de kilobytes de JSON a unas decenas de bytes
+
+Formato (big-endian):
+    [cabecera 16 B]   version(B) flags(B) n_det(H) seq(I) timestamp(d)
+    [n_det × 11 B]    class_id(B) confidence(H, ×1/65535) x1 y1 x2 y2 (H)
+    [bloques]         por cada flag de bloque activo, en orden
+                      CLASSES, ZONES, ECO: longitud(I) + JSON UTF-8
+    [resto]           JPEG
+
+El protocolo v1 empieza con la longitud de la metadata en 4 bytes, cuyo
+primer byte es 0 en la práctica; el v2 empieza con la versión (2), por lo
+que el cliente puede distinguirlos por el primer byte.
+"""
+
+import json
+import struct
+import time
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+PROTOCOL_VERSION = 2
+
+HEADER = struct.Struct('!BBHId')
+DETECTION = struct.Struct('!BHHHHH')
+BLOCK_LENGTH = struct.Struct('!I')
+
+# Flags de la cabecera
+FLAG_ZONES = 0x01      # Incluye bloque de estado de zonas
+FLAG_ECO = 0x02        # Incluye bloque de estado del Modo Eco
+FLAG_CLASSES = 0x04    # Incluye tabla de clases (lista de nombres)
+FLAG_KEYFRAME = 0x08   # Primer mensaje o refresco completo del estado
+
+# Orden de los bloques dentro del mensaje
+BLOCK_ORDER = (FLAG_CLASSES, FLAG_ZONES, FLAG_ECO)
+
+# Refresco completo periódico (campos volátiles como last_seen)
+STATE_REFRESH_SECONDS = 10.0
+
+_MAX_COORD = 0xFFFF
+
+
+def _clamp(value: int) -> int:
+    return min(max(int(value), 0), _MAX_COORD)
+
+
+def _json_block(value: Any) -> bytes:
+    data = json.dumps(value, separators=(',', ':')).encode('utf-8')
+    return BLOCK_LENGTH.pack(len(data)) + data
+
+
+class StreamEncoderV2:
+    """
+    Codificador por conexión del protocolo v2
+
+    Recuerda la última versión enviada del estado de zonas y del Modo Eco;
+    los getters solo se llaman (y se serializan) cuando la clave cambia o
+    vence el refresco periódico.
+    """
+
+    def __init__(self, refresh_seconds: float = STATE_REFRESH_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self.seq = 0
+        self.class_ids: Dict[str, int] = {}
+        self._classes_sent = 0
+        self._zones_key: Optional[Hashable] = None
+        self._eco_key: Optional[Hashable] = None
+        self._last_refresh = 0.0
+
+        # Métricas
+        self.frames = 0
+        self.overhead_bytes = 0
+
+    def _class_id(self, class_name: str) -> int:
+        class_id = self.class_ids.get(class_name)
+        if class_id is None:
+            class_id = len(self.class_ids)
+            if class_id > 0xFF:
+                raise ValueError("Demasiadas clases para el protocolo v2")
+            self.class_ids[class_name] = class_id
+        return class_id
+
+    def encode(self, jpeg, detections: List[dict],
+               zones_key: Hashable = None, get_zones: Optional[Callable[[], Any]] = None,
+               eco_key: Hashable = None, get_eco: Optional[Callable[[], Any]] = None) -> bytes:
+        """
+        Construir un mensaje v2
+
+        Args:
+            jpeg: Bytes (o buffer) del JPEG codificado
+            detections: Detecciones con 'class_name', 'confidence' y 'bbox'
+            zones_key: Versión del estado de zonas; si cambia se envía get_zones()
+            get_zones: Getter del estado de zonas
+            eco_key: Firma del estado del Modo Eco; si cambia se envía get_eco()
+            get_eco: Getter del estado del Modo Eco
+        """
+        now = time.time()
+        flags = 0
+
+        refresh = now - self._last_refresh >= self.refresh_seconds
+        if refresh:
+            self._last_refresh = now
+            flags |= FLAG_KEYFRAME
+
+        packed = []
+        for det in detections:
+            bbox = det['bbox']
+            packed.append(DETECTION.pack(
+                self._class_id(det['class_name']),
+                int(round(min(max(det['confidence'], 0.0), 1.0) * 0xFFFF)),
+                _clamp(bbox['x1']), _clamp(bbox['y1']),
+                _clamp(bbox['x2']), _clamp(bbox['y2'])
+            ))
+
+        blocks: Dict[int, bytes] = {}
+        if self.class_ids and (refresh or len(self.class_ids) != self._classes_sent):
+            names = sorted(self.class_ids, key=self.class_ids.get)
+            blocks[FLAG_CLASSES] = _json_block(names)
+            self._classes_sent = len(names)
+        if get_zones is not None and (refresh or zones_key != self._zones_key):
+            blocks[FLAG_ZONES] = _json_block(get_zones())
+            self._zones_key = zones_key
+        if get_eco is not None and (refresh or eco_key != self._eco_key):
+            blocks[FLAG_ECO] = _json_block(get_eco())
+            self._eco_key = eco_key
+
+        for flag in blocks:
+            flags |= flag
+
+        self.seq = (self.seq + 1) & 0xFFFFFFFF
+        parts = [HEADER.pack(PROTOCOL_VERSION, flags, len(packed), self.seq, now)]
+        parts.extend(packed)
+        parts.extend(blocks[flag] for flag in BLOCK_ORDER if flag in blocks)
+
+        overhead = sum(len(part) for part in parts)
+        self.frames += 1
+        self.overhead_bytes += overhead
+
+        parts.append(jpeg)
+        return b''.join(parts)
+
+    def get_metrics(self) -> dict:
+        """Bytes de cabecera/metadata por frame enviados en esta conexión"""
+        return {
+            'frames': self.frames,
+            'avg_overhead_bytes': round(self.overhead_bytes / self.frames, 1) if self.frames else 0.0
+        }
+
+
+def decode_frame(data: bytes, class_names: Optional[List[str]] = None) -> dict:
+    """
+    Decodificar un mensaje v2 (referencia del cliente y pruebas)
+
+    Args:
+        data: Mensaje completo
+        class_names: Tabla de clases recibida previamente (se actualiza si
+                     el mensaje trae un bloque CLASSES)
+    """
+    version, flags, n_det, seq, timestamp = HEADER.unpack_from(data, 0)
+    if version != PROTOCOL_VERSION:
+        raise ValueError(f"Versión de protocolo no soportada: {version}")
+
+    offset = HEADER.size
+    raw_detections = []
+    for _ in range(n_det):
+        raw_detections.append(DETECTION.unpack_from(data, offset))
+        offset += DETECTION.size
+
+    message = {'version': version, 'flags': flags, 'seq': seq, 'timestamp': timestamp}
+    for flag, key in ((FLAG_CLASSES, 'classes'), (FLAG_ZONES, 'zones'), (FLAG_ECO, 'eco_mode')):
+        if flags & flag:
+            (length,) = BLOCK_LENGTH.unpack_from(data, offset)
+            offset += BLOCK_LENGTH.size
+            message[key] = json.loads(bytes(data[offset:offset + length]).decode('utf-8'))
+            offset += length
+
+    names = message.get('classes') or class_names or []
+    message['detections'] = [
+        {
+            'class_name': names[class_id] if class_id < len(names) else str(class_id),
+            'confidence': confidence / 0xFFFF,
+            'bbox': {'x1': x1, 'y1': y1, 'x2': x2, 'y2': y2}
+        }
+        for class_id, confidence, x1, y1, x2, y2 in raw_detections
+    ]
+    message['jpeg'] = data[offset:]
+    return message
@@ -0,0 +1,136 @@
+"""
+Registro de Zonas, Cámaras, Puertas y Temporizadores
+Índices exactos (O(1)) compartidos por CameraManager, AlertManager y el
+stream de cámaras, en lugar de búsquedas lineales por substring
+"""
+
+import logging
+from typing import Dict, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+
+class ZoneRegistry:
+    """
+    Índices camera → zona → puertas → timers y zona → nombre
+
+    Se construye desde la configuración (cámaras y 'zones' de alert_config)
+    y se actualiza de forma incremental. Todas las operaciones se hacen
+    desde el event loop principal.
+    """
+
+    def __init__(self):
+        self.camera_zone: Dict[str, str] = {}
+        self.camera_names: Dict[str, str] = {}
+        self.zone_cameras: Dict[str, Set[str]] = {}
+        self.zone_names: Dict[str, str] = {}
+        self.door_camera: Dict[str, str] = {}
+        self.door_zone: Dict[str, str] = {}
+        self.camera_doors: Dict[str, Set[str]] = {}
+        self.camera_timers: Dict[str, Set[str]] = {}
+        self.timer_camera: Dict[str, str] = {}
+
+    # ==================== CÁMARAS Y ZONAS ====================
+
+    def set_camera(self, camera_id: str, zone_id: Optional[str], name: Optional[str] = None):
+        """Registrar (o actualizar) la zona y el nombre de una cámara"""
+        previous = self.camera_zone.pop(camera_id, None)
+        if previous is not None:
+            cameras = self.zone_cameras.get(previous, set())
+            cameras.discard(camera_id)
+            if not cameras:
+                self.zone_cameras.pop(previous, None)
+        if zone_id:
+            self.camera_zone[camera_id] = zone_id
+            self.zone_cameras.setdefault(zone_id, set()).add(camera_id)
+        if name:
+            self.camera_names[camera_id] = name
+
+    def remove_camera(self, camera_id: str):
+        """Olvidar una cámara y sus puertas"""
+        self.set_camera(camera_id, None)
+        self.camera_names.pop(camera_id, None)
+        for door_id in self.camera_doors.pop(camera_id, set()):
+            self.door_camera.pop(door_id, None)
+            self.door_zone.pop(door_id, None)
+
+    def set_zone_names(self, zones: Dict[str, dict]):
+        """Cargar nombres de zona desde la sección 'zones' de la configuración"""
+        self.zone_names = {
+            zone_id: zone.get('name', zone_id)
+            for zone_id, zone in (zones or {}).items()
+        }
+
+    # ==================== PUERTAS ====================
+
+    def register_door(self, camera_id: str, zone_id: str, door_id: str):
+        """Asociar una puerta (door_id del tracker) a su cámara y zona"""
+        if self.door_camera.get(door_id) == camera_id:
+            return
+        self.door_camera[door_id] = camera_id
+        self.door_zone[door_id] = zone_id
+        self.camera_doors.setdefault(camera_id, set()).add(door_id)
+
+    # ==================== TEMPORIZADORES ====================
+
+    def add_timer(self, door_id: str, camera_id: str):
+        """Indexar un timer activo por cámara"""
+        self.timer_camera[door_id] = camera_id
+        self.camera_timers.setdefault(camera_id, set()).add(door_id)
+
+    def remove_timer(self, door_id: str):
+        """Quitar un timer del índice"""
+        camera_id = self.timer_camera.pop(door_id, None)
+        if camera_id is not None:
+            self.camera_timers.get(camera_id, set()).discard(door_id)
+
+    def clear_timers(self):
+        """Quitar todos los timers del índice"""
+        self.timer_camera.clear()
+        self.camera_timers.clear()
+
+    def timers_for_camera(self, camera_id: str) -> Set[str]:
+        """door_ids con timer activo en una cámara"""
+        return set(self.camera_timers.get(camera_id, ()))
+
+    # ==================== CONSULTAS ====================
+
+    def get_camera_id(self, zone_or_door_id: str) -> Optional[str]:
+        """Cámara de una puerta o zona (coincidencia exacta)"""
+        camera_id = self.door_camera.get(zone_or_door_id) or self.timer_camera.get(zone_or_door_id)
+        if camera_id:
+            return camera_id
+        cameras = self.zone_cameras.get(zone_or_door_id)
+        if cameras:
+            return next(iter(cameras))
+        return None
+
+    def get_zone_id(self, door_id: str) -> str:
+        """Zona de una puerta (o el propio id si ya es una zona)"""
+        return self.door_zone.get(door_id, door_id)
+
+    def get_zone_name(self, zone_or_door_id: str) -> str:
+        """Nombre amigable: zona configurada, zona de la puerta o nombre de la cámara"""
+        name = self.zone_names.get(zone_or_door_id)
+        if name:
+            return name
+        zone_id = self.door_zone.get(zone_or_door_id)
+        if zone_id and zone_id in self.zone_names:
+            return self.zone_names[zone_id]
+        camera_id = self.get_camera_id(zone_or_door_id)
+        if camera_id and camera_id in self.camera_names:
+            return self.camera_names[camera_id]
+        return zone_or_door_id
+
+    def get_status(self) -> dict:
+        """Estado del registro (para diagnóstico)"""
+        return {
+            'cameras': dict(self.camera_zone),
+            'zones': {zone: sorted(cams) for zone, cams in self.zone_cameras.items()},
+            'doors': {cam: sorted(doors) for cam, doors in self.camera_doors.items()},
+            'timers': {cam: sorted(doors) for cam, doors in self.camera_timers.items() if doors}
+        }
+
+
+# Instancia global
+zone_registry = ZoneRegistry()
@@ -29,6 +29,7 @@ class DatasetCapture:
         
         session = aiohttp.ClientSession()
         frame_count = 0
+        last_etags = {}
         
         try:
             while True:
@@ -39,26 +40,26 @@ class DatasetCapture:
                 
                 for cam_id, cam_info in cameras.items():
                     if cam_info.get('connected'):
-                        # Obtener frame actual
-                        async with session.get(f"{self.api_url}/api/cameras/{cam_id}/stream") as response:
+                        # Obtener frame actual (JPEG binario; 304 si no hay frame nuevo)
+                        headers = {}
+                        if cam_id in last_etags:
+                            headers['If-None-Match'] = last_etags[cam_id]
+                        
+                        async with session.get(f"{self.api_url}/api/cameras/{cam_id}/snapshot.jpg",
+                                               headers=headers) as response:
+                            if response.status == 304:
+                                print(f"⏭️  Sin frame nuevo en {cam_id}")
+                                continue
                             if response.status == 200:
-                                frame_data = await response.json()
+                                img_bytes = await response.read()
+                                last_etags[cam_id] = response.headers.get('ETag', '')
                                 
-                                # Decodificar imagen base64
-                                import base64
-                                import numpy as np
-                                
-                                img_data = frame_data['image'].split(',')[1]
-                                img_bytes = base64.b64decode(img_data)
-                                nparr = np.frombuffer(img_bytes, np.uint8)
-                                img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-                                
-                                # Guardar imagen
+                                # Guardar imagen (ya viene codificada como JPEG)
                                 timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
                                 filename = f"{cam_id}_{timestamp}_{frame_count:04d}.jpg"
                                 filepath = self.output_dir / filename
                                 
-                                cv2.imwrite(str(filepath), img)
+                                filepath.write_bytes(img_bytes)
                                 frame_count += 1
                                 
                                 print(f"✅ Capturado: {filename} - Frame #{frame_count}")
@@ -78,6 +78,8 @@ function App() {
   // Referencias
   const wsRef = useRef(null);
   const fileInputRef = useRef(null);
+  // Estado versionado de temporizadores (el servidor solo envía cambios)
+  const timerStateRef = useRef({ version: -1, byId: {}, clockOffset: 0, telegram: {} });
 
   // Modos de análisis
   const analysisModes = {
@@ -162,12 +164,84 @@ function App() {
     return () => clearInterval(interval);
   }, []);
 
+  // Calcular cuenta atrás localmente desde first_detected_ts y delay_seconds
+  const refreshTimers = () => {
+    const state = timerStateRef.current;
+    const now = (Date.now() + state.clockOffset) / 1000;
+    setTimers(Object.values(state.byId).map((timer) => {
+      const elapsed = Math.max(0, now - timer.first_detected_ts);
+      const percent = timer.delay_seconds > 0 ? (elapsed / timer.delay_seconds) * 100 : 100;
+      const telegram = state.telegram[timer.door_id];
+      return {
+        ...timer,
+        time_elapsed: elapsed,
+        time_remaining: Math.max(0, timer.delay_seconds - elapsed),
+        progress_percent: Math.min(100, percent),
+        current_phase: percent < 50 ? 'friendly' : percent < 90 ? 'moderate' : 'critical',
+        telegram_active: Boolean(telegram),
+        telegram_send_count: telegram ? telegram.send_count : 0,
+        telegram_next_in: telegram ? telegram.next_in : 0
+      };
+    }));
+  };
+
+  const requestTimerResync = () => {
+    if (wsRef.current && wsRef.current.readyState === WebSocket.OPEN) {
+      wsRef.current.send(JSON.stringify({ type: 'timer_resync' }));
+    }
+  };
+
+  const applyTimerDelta = (delta) => {
+    const state = timerStateRef.current;
+    if (delta.version <= state.version) return;  // Ya incluido en el snapshot
+    if (delta.version > state.version + 1) {
+      // Hueco de versión: pedir estado completo
+      requestTimerResync();
+      return;
+    }
+    if (delta.event === 'cancelled') {
+      delete state.byId[delta.door_id];
+    } else if (delta.event === 'cleared') {
+      state.byId = {};
+    } else if (delta.timer) {
+      state.byId[delta.door_id] = delta.timer;
+    }
+    state.version = delta.version;
+    setAlarmActive(delta.alarm_active);
+    refreshTimers();
+  };
+
+  // Refrescar cuentas atrás mientras haya temporizadores
+  useEffect(() => {
+    const interval = setInterval(() => {
+      if (Object.keys(timerStateRef.current.byId).length > 0) {
+        refreshTimers();
+      }
+    }, 500);
+    return () => clearInterval(interval);
+  }, []);
+
   // Manejar mensajes WebSocket
   const handleWebSocketMessage = (message) => {
+    const timerState = timerStateRef.current;
     switch (message.type) {
-      case 'timer_update':
-        setTimers(message.data.timers);
+      case 'timer_snapshot':
+        timerState.version = message.data.version;
+        timerState.byId = Object.fromEntries(message.data.timers.map(t => [t.door_id, t]));
+        timerState.clockOffset = message.data.server_time * 1000 - Date.now();
         setAlarmActive(message.data.alarm_active);
+        refreshTimers();
+        break;
+      case 'timer_delta':
+        applyTimerDelta(message.data);
+        break;
+      case 'timer_tick':
+        timerState.clockOffset = message.data.server_time * 1000 - Date.now();
+        timerState.telegram = message.data.telegram || {};
+        setAlarmActive(message.data.alarm_active);
+        if (message.data.version !== timerState.version) {
+          requestTimerResync();
+        }
         break;
       case 'detection':
         setDetections(message.data.detections);
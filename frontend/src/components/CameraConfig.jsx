@@ -62,27 +62,41 @@ export default function CameraConfig() {
     }
   };
 
-  // Función para escanear la red
-  const scanNetwork = async () => {
+  // Función para escanear la red (resultados en streaming por WebSocket)
+  const scanNetwork = () => {
     setIsScanning(true);
     setScanResults([]);
     setShowScanResults(true);
     
-    try {
-      const response = await axios.post(`${API_URL}/api/cameras/scan`);
-      setScanResults(response.data.cameras || []);
-      
-      if (response.data.cameras.length === 0) {
-        toast.error('No se encontraron cámaras en la red');
-      } else {
-        toast.success(`${response.data.cameras.length} cámara(s) encontrada(s)`);
+    const ws = new WebSocket(`${API_URL.replace('http', 'ws')}/ws/cameras/scan`);
+    
+    ws.onmessage = (event) => {
+      const message = JSON.parse(event.data);
+      if (message.type === 'camera_found') {
+        setScanResults(prev => [...prev, message.camera]);
+      } else if (message.type === 'scan_complete') {
+        setScanResults(message.cameras || []);
+        if (message.cameras.length === 0) {
+          toast.error('No se encontraron cámaras en la red');
+        } else {
+          toast.success(`${message.cameras.length} cámara(s) encontrada(s)`);
+        }
+        setIsScanning(false);
+      } else if (message.type === 'scan_error') {
+        toast.error(`Error escaneando la red: ${message.error}`);
+        setIsScanning(false);
       }
-    } catch (error) {
+    };
+    
+    ws.onerror = (error) => {
       toast.error('Error escaneando la red');
       console.error(error);
-    } finally {
       setIsScanning(false);
-    }
+    };
+    
+    ws.onclose = () => {
+      setIsScanning(false);
+    };
   };
 
   // Usar cámara encontrada en el formulario
@@ -312,11 +326,11 @@ export default function CameraConfig() {
               </button>
             </div>
 
-            {isScanning ? (
+            {isScanning && scanResults.length === 0 ? (
               <div className="text-center py-8">
                 <Loader className="w-12 h-12 animate-spin mx-auto text-purple-400 mb-4" />
                 <p className="text-gray-400">Escaneando red local...</p>
-                <p className="text-sm text-gray-500 mt-2">Esto puede tomar 1-2 minutos</p>
+                <p className="text-sm text-gray-500 mt-2">Las cámaras aparecerán a medida que se encuentren</p>
               </div>
             ) : scanResults.length > 0 ? (
               <div className="grid grid-cols-1 md:grid-cols-2 gap-4">
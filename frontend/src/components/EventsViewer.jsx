@@ -28,21 +28,30 @@ const EventsViewer = () => {
   };
 
   useEffect(() => {
-    loadEvents();
+    // La búsqueda se hace en el servidor (índice full-text); esperar a que
+    // el usuario deje de escribir antes de consultar
+    const timeout = setTimeout(loadEvents, searchTerm ? 250 : 0);
     // Recargar eventos cada 30 segundos
     const interval = setInterval(loadEvents, 30000);
-    return () => clearInterval(interval);
-  }, []);
+    return () => {
+      clearTimeout(timeout);
+      clearInterval(interval);
+    };
+  }, [searchTerm, filterType]);
 
   useEffect(() => {
     filterEvents();
-  }, [events, searchTerm, filterType, dateFilter]);
+  }, [events, filterType, dateFilter]);
 
   const loadEvents = async () => {
     try {
       setLoading(true);
       const response = await axios.get('/api/events/recent', {
-        params: { limit: 100 }
+        params: {
+          limit: 100,
+          search: searchTerm || undefined,
+          event_type: filterType !== 'all' ? filterType : undefined
+        }
       });
       setEvents(response.data.events || []);
     } catch (error) {
@@ -56,15 +65,6 @@ const EventsViewer = () => {
   const filterEvents = () => {
     let filtered = [...events];
 
-    // Filtrar por búsqueda
-    if (searchTerm) {
-      filtered = filtered.filter(event => 
-        event.event.toLowerCase().includes(searchTerm.toLowerCase()) ||
-        (event.description && event.description.toLowerCase().includes(searchTerm.toLowerCase())) ||
-        (event.zone_id && event.zone_id.toLowerCase().includes(searchTerm.toLowerCase()))
-      );
-    }
-
     // Filtrar por tipo
     if (filterType !== 'all') {
       filtered = filtered.filter(event => event.event_type === filterType);
@@ -344,12 +344,13 @@ const EventsViewer = () => {
               {/* Contenido del modal */}
               <div className="p-6 overflow-y-auto max-h-[60vh]">
                 {/* Imagen del evento si existe */}
-                {selectedEvent.thumbnail && (
+                {selectedEvent.thumbnail_url && (
                   <div className="mb-6">
                     <h4 className="text-sm font-medium text-gray-400 mb-3">Captura del Evento</h4>
                     <div className="bg-black rounded-lg overflow-hidden">
                       <img 
-                        src={`data:image/jpeg;base64,${selectedEvent.thumbnail}`}
+                        src={selectedEvent.thumbnail_url}
+                        loading="lazy"
                         alt="Captura del evento"
                         className="w-full"
                       />
@@ -40,21 +40,35 @@ export default function VideoContext({ timer, onClose }) {
     setIsLoading(true);
     try {
       const eventTime = new Date(timer.first_detected).toISOString();
-      const response = await axios.get(
-        `${API_URL}/api/cameras/${timer.camera_id}/context`,
-        {
-          params: {
-            event_time: eventTime,
-            before_seconds: 30,
-            after_seconds: 30
-          }
-        }
-      );
+      const params = {
+        event_time: eventTime,
+        before_seconds: 30,
+        after_seconds: 30,
+        target_fps: 10
+      };
       
-      setContextFrames(response.data.frames);
+      // Índice paginado: solo timestamps y URLs, las imágenes se piden al mostrarlas
+      let offset = 0;
+      let frames = [];
+      while (offset !== null) {
+        const response = await axios.get(
+          `${API_URL}/api/cameras/${timer.camera_id}/context/index`,
+          { params: { ...params, offset, limit: 200 } }
+        );
+        frames = frames.concat(response.data.frames.map(f => ({
+          timestamp: f.timestamp,
+          image: `${API_URL}${f.url}`
+        })));
+        offset = response.data.next_offset;
+        
+        if (frames.length > 0) {
+          setContextFrames(frames);
+          setIsLoading(false);
+        }
+      }
       
       // Encontrar frame más cercano al evento
-      const eventIndex = response.data.frames.findIndex(
+      const eventIndex = frames.findIndex(
         f => new Date(f.timestamp) >= new Date(eventTime)
       );
       setFrameIndex(eventIndex > 0 ? eventIndex : 0);
@@ -7,6 +7,7 @@ import {
   Leaf, AlertTriangle, Zap
 } from 'lucide-react';
 import MjpegStream from './MjpegStream';
+import { createStreamState, parseStreamMessage, STREAM_PROTOCOL_VERSION } from '../utils/streamProtocol';
 
 export default function VideoStream({ 
   cameraId, 
@@ -29,6 +30,7 @@ export default function VideoStream({
   const [detections, setDetections] = useState([]);
   const [showBoundingBoxes, setShowBoundingBoxes] = useState(true);
   const reconnectAttempts = useRef(0);
+  const streamState = useRef(createStreamState());
   
   // Estadísticas
   const frameCount = useRef(0);
@@ -50,8 +52,9 @@ export default function VideoStream({
     setIsLoading(true);
     setError(null);
 
-    const ws = new WebSocket(`ws://localhost:8889/ws/camera/${cameraId}`);
+    const ws = new WebSocket(`ws://localhost:8889/ws/camera/${cameraId}?protocol=${STREAM_PROTOCOL_VERSION}`);
     ws.binaryType = 'arraybuffer';
+    streamState.current = createStreamState();
     
     ws.onopen = () => {
       console.log(`WebSocket conectado para cámara ${cameraId}`);
@@ -62,29 +65,17 @@ export default function VideoStream({
 
     ws.onmessage = async (event) => {
       try {
-        // El backend envía metadata + frame en formato binario
-        const arrayBuffer = event.data;
-        const dataView = new DataView(arrayBuffer);
-        
-        // Leer longitud de metadata (primeros 4 bytes)
-        const metadataLength = dataView.getUint32(0);
-        
-        // Extraer metadata JSON
-        const metadataBytes = new Uint8Array(arrayBuffer, 4, metadataLength);
-        const metadataJson = new TextDecoder().decode(metadataBytes);
-        const metadata = JSON.parse(metadataJson);
+        // El backend envía cabecera binaria (v2) o metadata JSON (v1) + frame
+        const message = parseStreamMessage(event.data, streamState.current);
         
         // Actualizar detecciones
-        if (metadata.detections) {
-          setDetections(metadata.detections);
-          if (onDetection && metadata.detections.length > 0) {
-            onDetection(metadata.detections);
-          }
+        setDetections(message.detections);
+        if (onDetection && message.detections.length > 0) {
+          onDetection(message.detections);
         }
         
-        // Extraer frame JPEG (ya tiene las detecciones dibujadas por el backend)
-        const frameStart = 4 + metadataLength;
-        const frameBlob = new Blob([arrayBuffer.slice(frameStart)], { type: 'image/jpeg' });
+        // Frame JPEG (ya tiene las detecciones dibujadas por el backend)
+        const frameBlob = new Blob([message.frame], { type: 'image/jpeg' });
         const imageUrl = URL.createObjectURL(frameBlob);
         
         const img = new Image();
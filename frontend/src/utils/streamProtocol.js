@@ -0,0 +1,98 @@
+// Decodificación de mensajes del stream de cámaras (/ws/camera/{id})
+// v2: cabecera fija de 16 bytes + detecciones empaquetadas + bloques de
+// estado solo cuando cambian + JPEG (ver backend/utils/stream_protocol.py)
+// v1: [longitud(4 bytes)][metadata JSON][JPEG]
+
+export const STREAM_PROTOCOL_VERSION = 2;
+
+const HEADER_SIZE = 16;
+const DETECTION_SIZE = 11;
+
+const FLAG_ZONES = 0x01;
+const FLAG_ECO = 0x02;
+const FLAG_CLASSES = 0x04;
+const FLAG_KEYFRAME = 0x08;
+
+const decoder = new TextDecoder();
+
+// Estado por conexión: tabla de clases y último estado de zonas/eco
+export function createStreamState() {
+  return { classes: [], zones: null, ecoMode: null };
+}
+
+function readBlock(arrayBuffer, view, offset) {
+  const length = view.getUint32(offset);
+  const bytes = new Uint8Array(arrayBuffer, offset + 4, length);
+  return [JSON.parse(decoder.decode(bytes)), offset + 4 + length];
+}
+
+function parseV1(arrayBuffer, view, state) {
+  const metadataLength = view.getUint32(0);
+  const metadataBytes = new Uint8Array(arrayBuffer, 4, metadataLength);
+  const metadata = JSON.parse(decoder.decode(metadataBytes));
+
+  if (metadata.zones) state.zones = metadata.zones;
+  if (metadata.eco_mode) state.ecoMode = metadata.eco_mode;
+
+  return {
+    version: 1,
+    timestamp: metadata.timestamp,
+    detections: metadata.detections || [],
+    zones: state.zones,
+    ecoMode: state.ecoMode,
+    stateChanged: true,
+    frame: arrayBuffer.slice(4 + metadataLength)
+  };
+}
+
+function parseV2(arrayBuffer, view, state) {
+  const flags = view.getUint8(1);
+  const count = view.getUint16(2);
+  const seq = view.getUint32(4);
+  const timestamp = view.getFloat64(8);
+
+  let offset = HEADER_SIZE;
+  const raw = [];
+  for (let i = 0; i < count; i++) {
+    raw.push([
+      view.getUint8(offset),
+      view.getUint16(offset + 1) / 0xFFFF,
+      view.getUint16(offset + 3),
+      view.getUint16(offset + 5),
+      view.getUint16(offset + 7),
+      view.getUint16(offset + 9)
+    ]);
+    offset += DETECTION_SIZE;
+  }
+
+  if (flags & FLAG_CLASSES) [state.classes, offset] = readBlock(arrayBuffer, view, offset);
+  if (flags & FLAG_ZONES) [state.zones, offset] = readBlock(arrayBuffer, view, offset);
+  if (flags & FLAG_ECO) [state.ecoMode, offset] = readBlock(arrayBuffer, view, offset);
+
+  const detections = raw.map(([classId, confidence, x1, y1, x2, y2]) => ({
+    class_name: state.classes[classId] ?? String(classId),
+    confidence,
+    bbox: { x1, y1, x2, y2 }
+  }));
+
+  return {
+    version: 2,
+    seq,
+    timestamp,
+    keyframe: Boolean(flags & FLAG_KEYFRAME),
+    detections,
+    zones: state.zones,
+    ecoMode: state.ecoMode,
+    stateChanged: Boolean(flags & (FLAG_ZONES | FLAG_ECO)),
+    frame: arrayBuffer.slice(offset)
+  };
+}
+
+// Decodificar un mensaje binario; el primer byte distingue v2 (2) de v1 (0)
+export function parseStreamMessage(arrayBuffer, state) {
+  const view = new DataView(arrayBuffer);
+  if (view.getUint8(0) === STREAM_PROTOCOL_VERSION) {
+    return parseV2(arrayBuffer, view, state);
+  }
+  return parseV1(arrayBuffer, view, state);
+}
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Benchmark de las consultas de eventos
+Siembra una base de datos temporal con N eventos (1 millón por defecto),
+muestra el EXPLAIN QUERY PLAN de cada consulta y compara la paginación por
+OFFSET con la paginación por cursor (timestamp, id)
+"""
+
+import argparse
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from backend.utils.event_logger import EventLogger, TIMESTAMP_FORMAT, encode_cursor
+
+EVENT_TYPES = ['door_open', 'door_close', 'alarm', 'alarm_ack', 'detection', 'system', 'camera']
+SEVERITIES = ['info', 'warning', 'critical', 'success']
+ZONES = [f'puerta_{i}' for i in range(1, 13)]
+
+
+def seed_events(db_path: str, count: int):
+    """Insertar count eventos repartidos en el último año"""
+    print(f"🌱 Sembrando {count:,} eventos en {db_path}...")
+    start = time.perf_counter()
+    now = datetime.now(timezone.utc)
+    conn = sqlite3.connect(db_path)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=OFF')
+    batch = []
+    for i in range(count):
+        zone = random.choice(ZONES)
+        event_type = random.choice(EVENT_TYPES)
+        timestamp = now - timedelta(seconds=random.randint(0, 365 * 24 * 3600))
+        batch.append((
+            timestamp.strftime(TIMESTAMP_FORMAT),
+            event_type,
+            f"{zone} {event_type}",
+            f"Evento {event_type} en {zone} #{i}",
+            zone,
+            random.choice(SEVERITIES)
+        ))
+        if len(batch) == 50000:
+            conn.executemany('''
+                INSERT INTO events (timestamp, event_type, event_name, description, zone_id, severity)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', batch)
+            batch.clear()
+    if batch:
+        conn.executemany('''
+            INSERT INTO events (timestamp, event_type, event_name, description, zone_id, severity)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', batch)
+    conn.commit()
+    conn.execute('ANALYZE')
+    conn.close()
+    print(f"   Listo en {time.perf_counter() - start:.1f}s")
+
+
+def explain(conn, title: str, sql: str, params: tuple):
+    """Imprimir el plan de una consulta"""
+    print(f"\n📋 {title}")
+    for row in conn.execute(f'EXPLAIN QUERY PLAN {sql}', params):
+        print(f"   {row[3]}")
+
+
+def timed(label: str, func, repeat: int = 5):
+    """Mediana de repeat ejecuciones en ms"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    print(f"   {label:<45} {samples[len(samples) // 2]:8.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de consultas de eventos")
+    parser.add_argument('--events', type=int, default=1_000_000, help="Eventos a sembrar")
+    parser.add_argument('--db', help="Base de datos a usar (por defecto una temporal)")
+    parser.add_argument('--page-size', type=int, default=50)
+    args = parser.parse_args()
+
+    db_path = args.db or str(Path(tempfile.mkdtemp()) / 'benchmark_events.db')
+    # Crear el esquema (tablas, índices, FTS y triggers)
+    event_logger = EventLogger(db_path, async_writes=False)
+    existing = event_logger.get_event_stats()['total']
+    if existing < args.events:
+        seed_events(db_path, args.events - existing)
+
+    conn = sqlite3.connect(db_path)
+    page = args.page_size
+    zone = ZONES[0]
+
+    print("\n" + "=" * 60)
+    print("PLANES DE CONSULTA")
+    print("=" * 60)
+    explain(conn, "Recientes (OFFSET)",
+            'SELECT id FROM events ORDER BY timestamp DESC, id DESC LIMIT ? OFFSET ?', (page, 10000))
+    explain(conn, "Recientes (cursor)",
+            'SELECT id FROM events WHERE (timestamp, id) < (?, ?) ORDER BY timestamp DESC, id DESC LIMIT ?',
+            ('2025-01-01 00:00:00', 0, page))
+    explain(conn, "Por zona (cursor)",
+            'SELECT * FROM events WHERE zone_id = ? AND (timestamp, id) < (?, ?) '
+            'ORDER BY timestamp DESC, id DESC LIMIT ?', (zone, '2025-01-01 00:00:00', 0, page))
+    explain(conn, "Por tipo y rango de fechas",
+            'SELECT * FROM events WHERE event_type = ? AND timestamp >= ? AND timestamp < ? '
+            'ORDER BY timestamp DESC, id DESC LIMIT ?', ('alarm', '2025-01-01', '2025-02-01', page))
+    if event_logger.fts_enabled:
+        explain(conn, "Búsqueda full-text con zona",
+                'SELECT e.id FROM events_fts JOIN events e ON e.id = events_fts.rowid '
+                'WHERE events_fts MATCH ? AND e.zone_id = ? ORDER BY e.timestamp DESC, e.id DESC LIMIT ?',
+                ('"alarm"*', zone, page))
+
+    print("\n" + "=" * 60)
+    print("TIEMPOS (mediana)")
+    print("=" * 60)
+    for depth in (0, 100, 1000, 10000):
+        offset = depth * page
+        timed(f"Página {depth} con OFFSET {offset:,}",
+              lambda: event_logger.get_recent_events(limit=page, offset=offset))
+
+    # Posición de la página profunda para medir el cursor equivalente
+    deep = conn.execute(
+        'SELECT timestamp, id FROM events ORDER BY timestamp DESC, id DESC LIMIT 1 OFFSET ?',
+        (10000 * page - 1,)
+    ).fetchone()
+    if deep:
+        cursor = encode_cursor(*deep)
+        timed("Página 10000 con cursor",
+              lambda: event_logger.get_events_page(limit=page, cursor=cursor))
+        timed("Zona, página profunda con cursor",
+              lambda: event_logger.get_events_by_zone(zone, limit=page, cursor=cursor))
+
+    timed("Zona + tipo + mes",
+          lambda: event_logger.get_recent_events(limit=page, zone_id=zone, event_type='alarm',
+                                                 since=(datetime.now(timezone.utc) - timedelta(days=30)).isoformat()))
+    timed("Búsqueda 'puer' (prefijo)",
+          lambda: event_logger.get_recent_events(limit=page, search='puer'))
+    timed("Búsqueda 'alarm puerta_3' con severidad",
+          lambda: event_logger.get_recent_events(limit=page, search='alarm puerta_3', severity='critical'))
+
+    conn.close()
+    event_logger.close()
+    print(f"\n✅ Benchmark completado ({db_path})")
+
+
+if __name__ == "__main__":
+    main()
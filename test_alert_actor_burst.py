@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Script de prueba de throughput del AlertManager (modelo actor)
+Envía ráfagas de detecciones concurrentes y mide latencia de cola
+"""
+
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+from alerts.alert_manager_v2_simple import AlertManager
+
+
+async def test_alert_actor_burst():
+    """Ráfaga de detecciones desde varias cámaras a la vez"""
+
+    print("=== PRUEBA DE RÁFAGA DEL ALERT MANAGER ===\n")
+
+    # Journal en una base temporal, nunca la de producción
+    journal_path = Path(tempfile.mkdtemp()) / 'timers.db'
+    manager = AlertManager(journal_path=str(journal_path))
+    manager.config['timer_delays']['default'] = 1
+    manager.config['clean_all_on_close'] = False
+
+    cameras = [f"cam_{i:02d}" for i in range(8)]
+    frames_per_camera = 500
+
+    async def camera_burst(camera_id: str):
+        detections = [{'class_name': 'gate_open', 'door_id': f"{camera_id}_door_0", 'confidence': 0.9}]
+        for _ in range(frames_per_camera):
+            await manager.process_detection(detections, camera_id=camera_id)
+
+    # Escenario 1: ráfaga concurrente de puertas abiertas
+    print("Escenario 1: Ráfaga concurrente")
+    print("-" * 50)
+    start = time.perf_counter()
+    await asyncio.gather(*(camera_burst(c) for c in cameras))
+    elapsed = time.perf_counter() - start
+
+    total = len(cameras) * frames_per_camera
+    metrics = manager.get_actor_metrics()
+    print(f"Mensajes: {total} en {elapsed:.3f}s ({total / elapsed:.0f} msg/s)")
+    print(f"Latencia de cola media: {metrics['avg_queue_latency_ms']:.3f} ms")
+    print(f"Latencia de cola máxima: {metrics['max_queue_latency_ms']:.3f} ms")
+    print(f"Timers activos: {len(manager.door_timers)} (debe ser {len(cameras)})")
+
+    # Escenario 2: los vencimientos disparan alarmas sin hilos
+    print("\nEscenario 2: Vencimiento de temporizadores")
+    print("-" * 50)
+    await asyncio.sleep(1.2)
+    triggered = sum(1 for t in manager.door_timers.values() if t.alarm_triggered)
+    print(f"Alarmas disparadas: {triggered} (debe ser {len(cameras)})")
+
+    # Escenario 3: reconocer y detener todo a través del actor
+    print("\nEscenario 3: Reconocimiento y stop-all")
+    print("-" * 50)
+    acknowledged = await manager.acknowledge_alarm(f"{cameras[0]}_door_0")
+    print(f"Reconocida: {acknowledged}, timers restantes: {len(manager.door_timers)}")
+    await manager.stop_all_alarms()
+    print(f"Tras stop-all: {len(manager.door_timers)} timers, alarma activa: {manager.alarm_active}")
+
+    print(f"\nMétricas del actor: {manager.get_actor_metrics()}")
+
+    # Vaciar el journal (incluido el clear de stop-all) antes de salir
+    await manager.shutdown()
+    print(f"Journal tras shutdown: {manager.timer_journal.load() if manager.timer_journal else None}")
+    print("\n=== PRUEBA COMPLETADA ===")
+
+
+if __name__ == "__main__":
+    asyncio.run(test_alert_actor_burst())
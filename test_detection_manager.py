@@ -6,6 +6,7 @@ Script de prueba para el sistema de deduplicación de alarmas
 import asyncio
 import time
 from backend.utils.detection_manager import DetectionManager
+from backend.utils.zone_registry import zone_registry
 
 
 async def test_detection_manager():
@@ -117,6 +118,67 @@ async def test_detection_manager():
     
     print(f"\nEstado de zonas: {dm.get_zone_states()}")
     
+    # Escenario 5: Filtro temporal (3 de 5 votos con histéresis)
+    print("\n\nEscenario 5: Detecciones intermitentes con filtro temporal")
+    print("-" * 50)
+    
+    dm_filtered = DetectionManager(
+        state_timeout=2.0,
+        min_confidence=0.75,
+        temporal_filter={
+            'window': 5,
+            'votes_required': 3,
+            'ema_alpha': 0.5,
+            'open_threshold': 0.6,
+            'close_threshold': 0.4
+        }
+    )
+    
+    sequence = ['gate_open', 'gate_closed', 'gate_open', 'gate_open', 'gate_closed', 'gate_closed']
+    for i, class_name in enumerate(sequence, 1):
+        frame_detections = [{
+            'class_name': class_name,
+            'confidence': 0.90,
+            'door_id': 'door_1',
+            'bbox': {'x1': 100, 'y1': 100, 'x2': 200, 'y2': 200}
+        }]
+        actions = dm_filtered.process_frame_detections(frame_detections, 'cam_001')
+        print(f"Frame {i} ({class_name}) - Acciones: {[a['action'] for a in actions]}")
+    
+    print("(debe crear la alerta en el frame 4 y cancelarla en el frame 6)")
+    
+    # Escenario 6: Filtro por zona configurada (las puertas llegan con su door_id)
+    print("\n\nEscenario 6: Filtro sobrescrito para la zona de la puerta")
+    print("-" * 50)
+    
+    dm_zones = DetectionManager(
+        state_timeout=2.0,
+        min_confidence=0.75,
+        temporal_filter={
+            'window': 5,
+            'votes_required': 3,
+            'ema_alpha': 0.5,
+            'open_threshold': 0.6,
+            'close_threshold': 0.4,
+            'zones': {'emergency': {'window': 1, 'votes_required': 1}}
+        }
+    )
+    zone_registry.register_door('cam_e', 'emergency', 'cam_e_door_0')
+    zone_registry.set_camera('cam_f', 'emergency')
+    zone_registry.set_camera('cam_l', 'loading')
+    
+    for door_id, camera_id in (('cam_e_door_0', 'cam_e'), ('cam_f_door_0', 'cam_f'), ('cam_l_door_0', 'cam_l')):
+        frame_detections = [{
+            'class_name': 'gate_open',
+            'confidence': 0.90,
+            'door_id': door_id,
+            'bbox': {'x1': 100, 'y1': 100, 'x2': 200, 'y2': 200}
+        }]
+        actions = dm_zones.process_frame_detections(frame_detections, camera_id)
+        print(f"{door_id} - Acciones tras 1 frame: {[a['action'] for a in actions]}")
+    
+    print("(emergency por puerta y por cámara: create_alert; loading: ninguna)")
+    
     print("\n=== PRUEBA COMPLETADA ===")
 
 
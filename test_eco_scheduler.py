@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Script de prueba del planificador predictivo del Modo Eco
+Horas muertas con y sin histórico, desfases de media hora y
+conversión de la configuración recibida por la API
+"""
+
+from datetime import datetime
+from backend.utils.eco_scheduler import EcoScheduler
+
+
+class FakeEcoManager:
+    """Registra el último plan aplicado"""
+
+    def __init__(self):
+        self.schedule = None
+
+    def set_schedule(self, floor=None, aggressive_idle=False, reason=None):
+        self.schedule = (floor, aggressive_idle, reason)
+
+
+def test_eco_scheduler():
+    """Prueba el cálculo de horas muertas y la actualización de configuración"""
+
+    print("=== PRUEBA DE ECO SCHEDULER ===\n")
+
+    eco_manager = FakeEcoManager()
+    scheduler = EcoScheduler(eco_manager)
+    scheduler._local_utc_offset_minutes = lambda: 0
+
+    # Escenario 1: base de eventos vacía (24 horas a cero)
+    print("Escenario 1: Histórico vacío")
+    print("-" * 50)
+    scheduler.refresh({}, {hour: 0 for hour in range(24)})
+    plan = scheduler.evaluate(datetime(2025, 1, 1, 3, 0))
+    print(f"Horas muertas: {sorted(scheduler.dead_hours)} (debe ser [])")
+    print(f"Plan a las 03:00: {plan} (debe ser normal)")
+    print(f"IDLE agresivo: {eco_manager.schedule[1]} (debe ser False)")
+
+    # Escenario 2: histórico insuficiente
+    print("\nEscenario 2: Histórico con pocos eventos")
+    print("-" * 50)
+    scheduler.refresh({}, {**{hour: 0 for hour in range(24)}, 9: 3})
+    print(f"Horas muertas: {sorted(scheduler.dead_hours)} (debe ser [])")
+
+    # Escenario 3: histórico suficiente, actividad de 8 a 18
+    print("\nEscenario 3: Histórico suficiente")
+    print("-" * 50)
+    stats = {hour: (40 if 8 <= hour < 18 else 0) for hour in range(24)}
+    scheduler.refresh({}, stats)
+    plan = scheduler.evaluate(datetime(2025, 1, 1, 3, 0))
+    print(f"Horas muertas: {sorted(scheduler.dead_hours)}")
+    print(f"Plan a las 03:00: {plan} (debe ser dead_hours)")
+    print(f"Plan a las 12:00: {scheduler.evaluate(datetime(2025, 1, 1, 12, 0))} (debe ser prewarm)")
+
+    # Escenario 4: desfase de +5:30 (las 18:30 UTC son las 00:00 locales)
+    print("\nEscenario 4: Desfase de media hora")
+    print("-" * 50)
+    scheduler._local_utc_offset_minutes = lambda: 330
+    stats = {hour: (40 if hour == 19 else 1) for hour in range(24)}
+    scheduler.refresh({}, stats)
+    peaks = [w.to_dict()['start'] for w in scheduler.windows]
+    print(f"Horas pico locales: {peaks} (debe ser ['00:00', '01:00'])")
+
+    # Escenario 5: valores de la API como texto
+    print("\nEscenario 5: Configuración desde la API")
+    print("-" * 50)
+    scheduler.update_config({'aggressive_idle': 'false', 'enabled': 'true', 'prewarm_minutes': '20'})
+    print(f"aggressive_idle: {scheduler.config['aggressive_idle']} (debe ser False)")
+    print(f"enabled: {scheduler.config['enabled']} (debe ser True)")
+    print(f"prewarm_minutes: {scheduler.config['prewarm_minutes']} (debe ser 20)")
+    try:
+        scheduler.update_config({'enabled': 'quizas'})
+        print("Valor inválido aceptado (ERROR)")
+    except ValueError as e:
+        print(f"Valor inválido rechazado: {e}")
+
+    print("\n=== PRUEBA COMPLETADA ===")
+
+
+if __name__ == "__main__":
+    test_eco_scheduler()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Script de prueba del almacenamiento de eventos sobre una base temporal
+Escritura por lotes, paginación por cursor, agregados y retención con archivo
+"""
+
+import gzip
+import json
+import sqlite3
+import tempfile
+import threading
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from backend.utils.event_logger import EventLogger, TIMESTAMP_FORMAT
+from backend.utils.retention import RetentionEngine
+
+
+def test_event_storage():
+    """Recorre el ciclo de vida de los eventos en una base temporal"""
+
+    print("=== PRUEBA DE ALMACENAMIENTO DE EVENTOS ===\n")
+
+    workdir = Path(tempfile.mkdtemp())
+    event_logger = EventLogger(str(workdir / 'events.db'))
+    event_logger.configure_writer(flush_interval=0.01)
+
+    # Escenario 1: escritura por lotes
+    print("Escenario 1: Registro por lotes y flush")
+    print("-" * 50)
+    zones = ['puerta_1', 'puerta_2', 'puerta_3']
+    ids = [
+        event_logger.log_event(
+            event_type='door_open' if i % 4 else 'alarm',
+            event_name=f"Evento {i}",
+            zone_id=zones[i % len(zones)],
+            severity='info' if i % 4 else 'critical'
+        )
+        for i in range(120)
+    ]
+    event_logger.flush()
+    with event_logger._get_connection() as conn:
+        stored = conn.execute('SELECT COUNT(*) FROM events').fetchone()[0]
+    print(f"Eventos escritos: {stored} (debe ser 120)")
+    print(f"Pendientes tras flush: {len(event_logger._pending)} (debe ser 0)")
+    print(f"IDs únicos: {len(set(ids))} (debe ser 120)")
+
+    # Escenario 2: paginación por cursor
+    print("\nEscenario 2: Paginación por cursor")
+    print("-" * 50)
+    seen = []
+    cursor = None
+    pages = 0
+    while True:
+        page = event_logger.get_events_page(limit=50, cursor=cursor)
+        seen.extend(event['id'] for event in page['events'])
+        pages += 1
+        cursor = page['next_cursor']
+        if not cursor:
+            break
+    print(f"Páginas: {pages} (debe ser 3)")
+    print(f"Eventos recorridos: {len(seen)}, sin repetir: {len(set(seen)) == len(seen)} (debe ser 120, True)")
+    print(f"Orden descendente: {seen == sorted(seen, reverse=True)} (debe ser True)")
+    zone_page = event_logger.get_events_page(limit=100, zone_id='puerta_1')
+    print(f"Página de puerta_1: {len(zone_page['events'])} (debe ser 40)")
+
+    # Escenario 3: agregados
+    print("\nEscenario 3: Agregados por hora y zona")
+    print("-" * 50)
+    hourly = event_logger.get_rollup('hour')
+    print(f"Total en agregados horarios: {sum(row['count'] for row in hourly)} (debe ser 120)")
+    by_zone = {}
+    for row in event_logger.get_rollup('day', group_by=('zone_id',)):
+        by_zone[row['zone_id']] = by_zone.get(row['zone_id'], 0) + row['count']
+    print(f"Por zona: {by_zone} (40 cada una)")
+    stats = event_logger.get_event_stats()
+    print(f"Total en estadísticas: {stats['total']} (debe ser 120)")
+
+    # Escenario 4: retención con archivo mensual
+    print("\nEscenario 4: Retención y archivo")
+    print("-" * 50)
+    now = datetime.now(timezone.utc)
+    with event_logger._get_connection() as conn:
+        conn.executemany(
+            'INSERT INTO events (timestamp, event_type, event_name, zone_id, severity) VALUES (?, ?, ?, ?, ?)',
+            [((now - timedelta(days=days)).strftime(TIMESTAMP_FORMAT), 'door_open', f"Antiguo {days}", 'puerta_1', severity)
+             for days, severity in [(400 + i, 'info') for i in range(10)] + [(100 + i, 'critical') for i in range(5)]]
+        )
+    engine = RetentionEngine(
+        event_logger,
+        archive_dir=str(workdir / 'archive'),
+        images_dir=str(workdir / 'images'),
+        batch_size=4,
+        batch_pause=0
+    )
+    summary = engine.run_once()
+    print(f"Borrados: {summary['events_deleted']}, archivados: {summary['events_archived']} (debe ser 10, 10)")
+
+    archived = []
+    for path in sorted((workdir / 'archive').glob('events-*.jsonl.gz')):
+        with gzip.open(path, 'rt', encoding='utf-8') as archive:
+            archived.extend(json.loads(line) for line in archive)
+    print(f"Líneas en el archivo: {len(archived)} (debe ser 10)")
+    print(f"Todas 'info': {all(row['severity'] == 'info' for row in archived)} (debe ser True)")
+
+    with event_logger._get_connection() as conn:
+        remaining = conn.execute('SELECT COUNT(*) FROM events').fetchone()[0]
+    print(f"Eventos restantes: {remaining} (debe ser 125: los critical se conservan 365 días)")
+    hourly = event_logger.get_rollup('hour')
+    print(f"Agregados tras la retención: {sum(row['count'] for row in hourly)} (debe ser 135, son histórico)")
+
+    event_logger.close()
+
+    # Escenario 5: retención en una base sin auto_vacuum incremental
+    print("\nEscenario 5: Retención sin auto_vacuum incremental")
+    print("-" * 50)
+    legacy_path = workdir / 'legacy.db'
+    conn = sqlite3.connect(str(legacy_path))
+    conn.execute('CREATE TABLE filler (data BLOB)')
+    conn.executemany('INSERT INTO filler VALUES (?)', [(b'x' * 4000,) for _ in range(1000)])
+    conn.commit()
+    conn.execute('DROP TABLE filler')  # deja páginas en la freelist
+    conn.commit()
+    conn.close()
+
+    legacy_logger = EventLogger(str(legacy_path), async_writes=False)
+    with legacy_logger._get_connection() as conn:
+        mode = conn.execute('PRAGMA auto_vacuum').fetchone()[0]
+        free = conn.execute('PRAGMA freelist_count').fetchone()[0]
+    print(f"auto_vacuum: {mode} (no incremental), páginas libres: {free}")
+
+    legacy_engine = RetentionEngine(
+        legacy_logger,
+        archive_dir=str(workdir / 'legacy_archive'),
+        images_dir=str(workdir / 'images'),
+        batch_pause=0
+    )
+    runner = threading.Thread(target=legacy_engine.run_once, daemon=True)
+    runner.start()
+    runner.join(timeout=10)
+    print(f"Retención terminada: {not runner.is_alive()} (debe ser True)")
+    print(f"Páginas recuperadas: {legacy_engine.last_run and legacy_engine.last_run['pages_freed']} (debe ser 0)")
+    print(f"Motor libre para la siguiente pasada: {not legacy_engine.running} (debe ser True)")
+    legacy_logger.close()
+
+    print("\n=== PRUEBA COMPLETADA ===")
+
+
+if __name__ == "__main__":
+    test_event_storage()
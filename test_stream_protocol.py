@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Script de prueba del protocolo binario v2 del stream de cámaras
+"""
+
+import json
+
+from backend.utils.detection_manager import DetectionManager
+from backend.utils.stream_protocol import StreamEncoderV2, decode_frame
+
+
+def test_stream_protocol():
+    """Compara el overhead por frame de v1 y v2"""
+
+    print("=== PRUEBA DE PROTOCOLO DE STREAM v2 ===\n")
+
+    detections = [
+        {'class_name': 'gate_open', 'confidence': 0.91,
+         'bbox': {'x1': 10, 'y1': 20, 'x2': 300, 'y2': 400}, 'door_id': 'dock_door_0'},
+        {'class_name': 'gate_closed', 'confidence': 0.88,
+         'bbox': {'x1': 400, 'y1': 20, 'x2': 620, 'y2': 400}, 'door_id': 'dock_door_1'}
+    ]
+    zones = {
+        f'dock_door_{i}': {'zone_id': f'dock_door_{i}', 'last_state': 'gate_open', 'alert_active': True,
+                           'detection_count': 42, 'average_confidence': 0.9, 'open_score': 0.81,
+                           'open_votes': 3, 'window': 5, 'last_seen': 0.2}
+        for i in range(4)
+    }
+    eco = {'state': 'active', 'config': {'fps': 15, 'jpeg_quality': 60, 'detection_interval': 1.0},
+           'time_since_motion': 1.2, 'time_since_detection': 0.4}
+    jpeg = b'\xff\xd8' + b'\x00' * 30000
+
+    # Escenario 1: overhead del protocolo v1 (JSON completo en cada frame)
+    print("Escenario 1: Protocolo v1")
+    print("-" * 50)
+    metadata = {"type": "frame", "timestamp": "2025-06-02T12:00:00", "detections": detections,
+                "frame_size": len(jpeg), "zones": zones, "eco_mode": eco}
+    print(f"Overhead v1: {len(json.dumps(metadata)) + 4} bytes/frame")
+
+    # Escenario 2: v2 con estado sin cambios
+    print("\nEscenario 2: Protocolo v2")
+    print("-" * 50)
+    encoder = StreamEncoderV2()
+    first = encoder.encode(jpeg, detections, 1, lambda: zones, ('active',), lambda: eco)
+    steady = encoder.encode(jpeg, detections, 1, lambda: zones, ('active',), lambda: eco)
+    print(f"Primer frame (keyframe): {len(first) - len(jpeg)} bytes")
+    print(f"Frames siguientes: {len(steady) - len(jpeg)} bytes")
+
+    # Escenario 3: decodificación y cambio de estado
+    print("\nEscenario 3: Decodificar y cambiar zonas")
+    print("-" * 50)
+    decoded = decode_frame(first)
+    changed = decode_frame(encoder.encode(jpeg, detections, 2, lambda: zones, ('active',), lambda: eco),
+                           decoded['classes'])
+    print(f"Detecciones: {[(d['class_name'], round(d['confidence'], 2)) for d in decoded['detections']]}")
+    print(f"Zonas reenviadas tras cambio: {'zones' in changed} / eco reenviado: {'eco_mode' in changed}")
+    print(f"JPEG intacto: {changed['jpeg'] == jpeg}")
+
+    # Escenario 4: detecciones repetidas sin cambio de estado
+    print("\nEscenario 4: Zonas solo ante transiciones")
+    print("-" * 50)
+    manager = DetectionManager(state_timeout=2.0, min_confidence=0.75)
+    encoder = StreamEncoderV2()
+    classes = None
+    sent = []
+    for class_name in ['gate_open'] * 6 + ['gate_closed'] * 3:
+        frame_detections = [{**detections[0], 'class_name': class_name}]
+        manager.process_frame_detections(frame_detections, 'cam_dock')
+        frame = decode_frame(
+            encoder.encode(jpeg, frame_detections, manager.state_version, manager.get_zone_states),
+            classes
+        )
+        classes = frame.get('classes', classes)
+        sent.append('zones' in frame)
+    print(f"Bloque de zonas por frame: {sent}")
+    print("(debe enviarse en el primero y al cerrar la puerta, no en los repetidos)")
+
+    print("\n=== PRUEBA COMPLETADA ===")
+
+
+if __name__ == "__main__":
+    test_stream_protocol()
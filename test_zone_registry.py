@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Script de prueba del registro de zonas/cámaras/puertas/timers
+"""
+
+from backend.utils.zone_registry import ZoneRegistry
+
+
+def test_zone_registry():
+    """Prueba los índices exactos del registro"""
+
+    print("=== PRUEBA DE ZONE REGISTRY ===\n")
+
+    registry = ZoneRegistry()
+    registry.set_zone_names({'door_1': {'name': 'Puerta Secundaria'}, 'loading': {'name': 'Zona de Carga'}})
+    registry.set_camera('cam_a', 'door_1', 'Cámara A')
+    registry.set_camera('cam_b', 'door_10', 'Cámara B')
+    registry.set_camera('cam_c', 'loading', 'Cámara C')
+
+    # Escenario 1: door_1 no debe coincidir con door_10
+    print("Escenario 1: Coincidencia exacta de zonas")
+    print("-" * 50)
+    registry.add_timer('door_1_door_0', 'cam_a')
+    registry.add_timer('door_10_door_0', 'cam_b')
+    print(f"Timers cam_a: {registry.timers_for_camera('cam_a')} (solo door_1_door_0)")
+    print(f"Cámara de door_10: {registry.get_camera_id('door_10')} (debe ser cam_b)")
+
+    # Escenario 2: nombres de zona para puertas del tracker
+    print("\nEscenario 2: Nombres de zona")
+    print("-" * 50)
+    registry.register_door('cam_c', 'loading', 'loading_door_1')
+    print(f"loading_door_1 → {registry.get_zone_name('loading_door_1')} (Zona de Carga)")
+    print(f"door_10_door_0 → {registry.get_zone_name('door_10_door_0')} (Cámara B)")
+
+    # Escenario 3: actualización incremental
+    print("\nEscenario 3: Mover y eliminar cámaras")
+    print("-" * 50)
+    registry.set_camera('cam_b', 'loading')
+    print(f"Cámaras de door_10: {registry.zone_cameras.get('door_10')} (vacío)")
+    registry.remove_camera('cam_c')
+    registry.remove_timer('door_1_door_0')
+    print(f"Estado: {registry.get_status()}")
+
+    print("\n=== PRUEBA COMPLETADA ===")
+
+
+if __name__ == "__main__":
+    test_zone_registry()